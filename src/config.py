@@ -28,6 +28,16 @@ INPUT_CIRCULAR_FILE_NAME = 'input_circ.csv'
 TRAJ_PLATFORM_FILE_NAME = 'traj_platform.csv' # xyzrpy
 TRAJ_JOINTS_FILE_NAME = 'traj_joints.csv' # joint angles
 
+TRAJ_JOINTS_CACHE_DIR = 'trajectory_cache/' # remapped solo motor trajectories (.npy) keyed by hash of joints csv
+TRAJ_STREAM_CHUNK_SIZE = 10000 # rows per chunk when converting and streaming joint trajectories (2 chunks are held in memory)
+
+IK_RESIDUAL_THRESHOLD = 1e-4 # max distance (m) between leg end and target at which PyBullet stops iterating
+IK_RESIDUAL_TOLERANCE = 1e-7 # change of residual (m) between iteration blocks at which warm-started inverse kinematics has converged
+IK_JOINT_DAMPING = 0.001 # joint damping of warm-started inverse kinematics, PyBullet's default (0.1) needs ~10x more iterations per sample
+IK_BLOCK_ITERATIONS = 10 # iterations per PyBullet call of warm-started inverse kinematics, residual is checked between blocks
+IK_MAX_ITERATIONS = 10000 # iterations per sample of inverse kinematics
+IK_REPORT_FILE_NAME = 'ik_report.csv' # iterations and residual per sample of warm-started inverse kinematics
+
 # TRAJ_PLATFORM_FILE_NAME = 'traj_platform_solo.csv' # xyzrpy
 # TRAJ_JOINTS_FILE_NAME = 'traj_joints_solo.csv' # joint angles
 
@@ -36,7 +46,11 @@ TRAJ_JOINTS_FILE_NAME = 'traj_joints.csv' # joint angles
 
 # FINAL OUTPUT FILES
 PYBULLET_DATA_OUTPUT_FILE_NAME = 'pybu_data.csv'
+PYBULLET_FARM_SUMMARY_FILE_NAME = 'pybu_farm_summary.csv' # tracking summary of sequences simulated by the PyBullet farm
 SOLO_DATA_OUTPUT_FILE_NAME = 'solo_data.csv'
+SOLO_DATA_LOG_FILE_NAME = 'solo_data.npy' # binary log written during solo control, converted to SOLO_DATA_OUTPUT_FILE_NAME
+SOLO_EVENT_LOG_FILE_NAME = 'solo_events.jsonl' # status events of solo control, one json object per line
+FREE_SOLO_EVENT_LOG_FILE_NAME = 'free_solo_events.jsonl' # status events of free solo control, one json object per line
 
 PYBULLET_CALCULATED_FILE_NAME = 'pybu_calculated.csv'
 SOLO_CALCULATED_FILE_NAME = 'solo_calculated.csv'
@@ -50,6 +64,25 @@ LANDING_POS_FILE = 'solo_landing_pos.csv'
 # TIME FOR INTERPOLATINS IN SOLO CONTROL 
 TIME_INTERPOLATE_HOME = 1000 # ms
 TIME_INTERPOLATE_LANDING = 2000 # ms
+TRANSITION_PROFILE_HOME = 'linear' # 'linear', 'cubic' or 'quintic' (minimum jerk)
+TRANSITION_PROFILE_LANDING = 'linear' # 'linear', 'cubic' or 'quintic' (minimum jerk)
+
+# STATUS OUTPUT IN SOLO CONTROL
+STATUS_RATE_LIMITS = { # minimum time in seconds between two console outputs of an event, all events are written to the event log
+    'sequence_run_time': 10.0,
+    'index_found': 0.5,
+    'motors_fighting': 1.0,
+    'adc_trigger': 1.0,
+}
+
+# REAL-TIME PROFILE FOR SOLO AND FREE SOLO CONTROL (opt-in, also with -rt flag)
+REALTIME_PROFILE = False # pin control thread, SCHED_FIFO, mlockall, no garbage collection during the sequence
+REALTIME_CPUS = None # CPUs for the control thread, None for the isolated CPUs of the kernel (isolcpus)
+REALTIME_PRIORITY = 80 # SCHED_FIFO priority (1-99)
+
+# MOTOR FIGHTING DETECTION IN SOLO CONTROL
+MOTOR_FIGHTING_DEBOUNCE = 50 # ms, consecutive ticks before motors count as fighting
+MOTOR_FIGHTING_LANDING = False # land early when motors are fighting during the sequence (opt-in, tune diff threshold on hardware first), the fault is reported either way
 
 # THRESHOLDS FOR TRAJECTORY GENERATION
 THRESHOLD_FREQUENCY = 5 # Hz
@@ -60,13 +93,14 @@ THRESHOLD_AMPLITUDE = 35 # mm/deg
 
 # ------ DO NOT EDIT BELOW -------------------------------------------------------------- #
 def generate_unique_name(name=''):
-    return str(name)[:-4] + '-' + UNIQUE_FILE_ID + '.csv'
+    return str(name)[:-4] + '-' + UNIQUE_FILE_ID + str(name)[-4:]
 
 TRAJ_PLATFORM_FILE_UNIQUE = generate_unique_name(TRAJ_PLATFORM_FILE_NAME)
 TRAJ_JOINTS_FILE_UNIQUE = generate_unique_name(TRAJ_JOINTS_FILE_NAME)
 
 PYBULLET_DATA_OUTPUT_FILE_UNIQUE = generate_unique_name(PYBULLET_DATA_OUTPUT_FILE_NAME)
 SOLO_DATA_OUTPUT_FILE_UNIQUE = generate_unique_name(SOLO_DATA_OUTPUT_FILE_NAME)
+SOLO_DATA_LOG_FILE_UNIQUE = generate_unique_name(SOLO_DATA_LOG_FILE_NAME)
 PYBULLET_CALCULATED_FILE_UNIQUE = generate_unique_name(PYBULLET_CALCULATED_FILE_NAME)
 SOLO_CALCULATED_FILE_UNIQUE = generate_unique_name(SOLO_CALCULATED_FILE_NAME)
 # --------------------------------------------------------------------------------------- #
\ No newline at end of file
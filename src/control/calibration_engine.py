@@ -0,0 +1,373 @@
+"""
+    Vectorized index calibration sweep for solo control.
+"""
+
+import math
+import time
+import argparse
+import numpy as np
+from platform_trajectory_generation.transition_trajectory import *
+from control.status_channel import *
+from control.solo_controller import *
+from control.masterboard_simulator import *
+
+CALIBRATION_MOTOR_GROUPS = ([0, 1, 6, 7], [2, 4, 8, 10], [3, 5, 9, 11]) # hips, lower legs, upper legs, calibrated one after the other
+
+
+class CalibrationEngineClass():
+
+    def __init__(self,
+        phase,
+        zero_position,
+        groups = CALIBRATION_MOTOR_GROUPS,
+        step_value = 0.000001, # rad/ms at motor
+        min_angle_in_degrees = -25, # leg angle
+        max_angle_in_degrees = 25, # leg angle
+        reset_steps = 2000, # ms
+        gear_ratio = 9,
+        post = print_event,
+    ):
+        """
+            Calibration sweep for motor groups. The offset of the target position of a group grows by step_value every tick, first towards the maximum angle, then towards the minimum angle.
+            After the sweep, or as soon as all indices of the group are found, the motors move back to zero position and the next group starts.
+            Sweep steps, bounds, and index masks are kept as arrays, so one tick is a few masked array operations.
+
+            :param phase: Calibration phase 1 or 2. In phase 2 the target position is reset to zero position when the next group starts.
+            :type phase: int.
+            :param zero_position: Zero position of motors.
+            :type zero_position: list[float].
+            :param groups: Motor ids of groups. Motors at even positions in a group move in positive direction, motors at odd positions in negative direction.
+            :type groups: list[list[int]].
+            :param step_value: Increment of sweep offset per tick in rad at motor.
+            :type step_value: float.
+            :param min_angle_in_degrees: Minimum leg angle of sweep.
+            :type min_angle_in_degrees: float.
+            :param max_angle_in_degrees: Maximum leg angle of sweep.
+            :type max_angle_in_degrees: float.
+            :param reset_steps: Duration of movement back to zero position in ticks.
+            :type reset_steps: int.
+            :param gear_ratio: Gear ratio between motor and leg.
+            :type gear_ratio: float.
+            :param post: Function for status output, StatusChannelClass.post in control loops.
+            :type post: function(event, message, **fields).
+        """
+        self.phase = phase
+        self.zero_position = zero_position
+        self.n_motors = len(zero_position)
+        self.groups = [np.array(group) for group in groups]
+        self.n_groups = len(self.groups)
+        self.leading_motors = [group[0::2].tolist() for group in self.groups] # motors whose angles end the sweep
+        self.sweep_steps = np.zeros((self.n_groups, self.n_motors))
+        for group_index, group in enumerate(self.groups):
+            self.sweep_steps[group_index, group[0::2]] = step_value
+            self.sweep_steps[group_index, group[1::2]] = -step_value
+        self.max_motor_angle = math.radians(max_angle_in_degrees) * gear_ratio
+        self.min_motor_angle = math.radians(min_angle_in_degrees) * gear_ratio
+        self.reset_steps = reset_steps
+        self.post = post
+
+        self.index_found = np.zeros(self.n_motors, dtype=bool)
+        self.pending_motors = list(range(self.n_motors)) # motors whose index has not been found yet
+        self.group_index_found = [False] * self.n_groups # all indices of group found
+        self.index_positions = np.zeros(self.n_motors)
+        self.timeline = [] # (tick, motor id, position) of index detections
+        self.group_calibrated = np.zeros(self.n_groups, dtype=bool)
+        self.group_index = 0
+        self.complete = False
+
+        self.offset = np.zeros(self.n_motors)
+        self.move_in_max_dir = True
+        self.reset_complete = True
+        self.reset_counter = 0
+        self.reset_trajectory = None
+        self.target_position = zero_position
+        self.tick = 0
+
+
+    def step(self, robot_if):
+        """
+            Runs one calibration tick: detects motor indices and advances sweep of current group. In phase 1 the sweep stops as soon as all indices are found.
+
+            :param robot_if: Masterboard interface.
+            :type robot_if: MasterBoardInterface.
+            :return: True if a new index was found in this tick.
+            :rtype: Bool.
+        """
+        self.tick += 1
+        if not self.reset_complete:
+            self.reset_counter += 1
+
+        new_index_found = self.detect_indices(robot_if)
+        if not (self.phase == 1 and not self.pending_motors):
+            self.sweep(robot_if)
+        return new_index_found
+
+
+    def detect_indices(self, robot_if):
+        """
+            Polls index detection of motors whose index has not been found yet and stores their positions.
+
+            :param robot_if: Masterboard interface.
+            :type robot_if: MasterBoardInterface.
+            :return: True if a new index was found.
+            :rtype: Bool.
+        """
+        new_index_found = False
+        for i in self.pending_motors:
+            motor = robot_if.GetMotor(i)
+            if motor.HasIndexBeenDetected():
+                self.index_found[i] = True
+                self.index_positions[i] = motor.GetPosition() # in rad
+                self.timeline.append((self.tick, i, self.index_positions[i]))
+                new_index_found = True
+        if new_index_found:
+            self.pending_motors = np.flatnonzero(~self.index_found).tolist()
+            self.group_index_found = [bool(self.index_found[group].all()) for group in self.groups]
+        return new_index_found
+
+
+    def sweep(self, robot_if):
+        """
+            Advances sweep of current group. When a group is calibrated the next group starts in the same tick.
+
+            :param robot_if: Masterboard interface.
+            :type robot_if: MasterBoardInterface.
+            :return: None.
+            :rtype: None.
+        """
+        if self.group_index == self.n_groups:
+            return
+        group_index = self.group_index
+        self.sweep_group(robot_if)
+        if self.group_index != group_index and self.group_index < self.n_groups:
+            if self.phase == 2:
+                self.target_position = self.zero_position
+            self.sweep_group(robot_if)
+        self.complete = self.group_index == self.n_groups
+
+
+    def sweep_group(self, robot_if):
+        """
+            Moves target position of current group one step in sweep direction, or back to zero position if the sweep is done.
+
+            :param robot_if: Masterboard interface.
+            :type robot_if: MasterBoardInterface.
+            :return: None.
+            :rtype: None.
+        """
+        if not self.reset_complete:
+            self.reset_group(robot_if)
+            return
+        self.reset_counter = -1
+
+        if self.group_index_found[self.group_index]:
+            self.post('calibration_sweep', "Motor indices array is complete")
+            self.reset_complete = False
+
+        leading_angles = [robot_if.GetMotor(i).GetPosition() for i in self.leading_motors[self.group_index]]
+
+        if self.move_in_max_dir:
+            if min(leading_angles) < self.max_motor_angle:
+                self.offset += self.sweep_steps[self.group_index]
+                self.target_position = np.add(self.target_position, self.offset)
+            else:
+                self.post('calibration_sweep', 'All motor anges > max')
+                self.move_in_max_dir = False
+                self.offset[:] = 0
+        else:
+            if max(leading_angles) > self.min_motor_angle:
+                self.offset -= self.sweep_steps[self.group_index]
+                self.target_position = np.add(self.target_position, self.offset)
+            else:
+                self.post('calibration_sweep', 'All motor anges < min')
+                self.reset_complete = False
+
+
+    def reset_group(self, robot_if):
+        """
+            Moves target position back to zero position along a smooth trajectory. Marks current group as calibrated at the end.
+
+            :param robot_if: Masterboard interface.
+            :type robot_if: MasterBoardInterface.
+            :return: None.
+            :rtype: None.
+        """
+        if self.reset_counter == 0 and self.reset_trajectory is None:
+            self.post('calibration_sweep', "Interpolated smooth reset calibration.")
+            motor_positions = [robot_if.GetMotor(i).GetPosition() for i in range(self.n_motors)]
+            self.reset_trajectory = TransitionTrajectoryClass(motor_positions, self.zero_position, self.reset_steps)
+
+        if (self.reset_counter != len(self.reset_trajectory)-1) or (self.reset_counter == 0):
+            self.target_position = self.reset_trajectory[self.reset_counter]
+            return
+
+        self.reset_complete = True
+        self.reset_trajectory = None
+        self.group_calibrated[self.group_index] = True
+        self.post('calibration_status', "{status}\n---", status=self.get_status_text())
+        self.group_index += 1
+        self.move_in_max_dir = True
+        self.offset[:] = 0
+        self.reset_counter = -1
+
+
+    def get_index_array(self):
+        """
+            Returns found index positions.
+
+            :return: Index position of each motor, None if not found yet.
+            :rtype: list[float or None].
+        """
+        return [position if found else None for position, found in zip(self.index_positions.tolist(), self.index_found.tolist())]
+
+
+    def get_status_text(self):
+        """
+            Returns calibration status for hips, upper, and lower legs.
+
+            :return: Status text.
+            :rtype: str.
+        """
+        return "\n".join([
+            "Hips Calibrated       : " + str(bool(self.group_calibrated[0])),
+            "Upper Legs Calibrated : " + str(bool(self.group_calibrated[2])),
+            "Lower Legs Calibrated : " + str(bool(self.group_calibrated[1])),
+        ])
+
+
+    def print_status(self):
+        """
+            Prints calibration status for hips, upper, and lower legs.
+
+            :return: None.
+            :rtype: None.
+        """
+        print(self.get_status_text())
+
+
+    def get_timeline_text(self):
+        """
+            Returns index detection timeline.
+
+            :return: Timeline text.
+            :rtype: str.
+        """
+        lines = ["Phase " + str(self.phase) + " index detection timeline:", "    Tick        Motor    Position"]
+        for tick, motor, position in self.timeline:
+            lines.append("    %8d    %5d    %.6f" % (tick, motor, position))
+        return "\n".join(lines)
+
+
+    def print_timeline(self):
+        """
+            Prints index detection timeline.
+
+            :return: None.
+            :rtype: None.
+        """
+        print(self.get_timeline_text())
+
+
+def run_calibration(robot_if, engine, controller, max_ticks = 1000000):
+    """
+        Runs a calibration phase against a masterboard interface without the solo lifecycle and without waiting for the control period.
+        Every tick parses sensor data, steps the calibration engine, and applies the calibration PD/PID controller.
+
+        :param robot_if: Initialized masterboard interface, usually SimulatedMasterBoardInterfaceClass.
+        :type robot_if: MasterBoardInterface.
+        :param engine: Calibration engine.
+        :type engine: CalibrationEngineClass.
+        :param controller: Controller for all motors.
+        :type controller: SoloControllerClass.
+        :param max_ticks: Maximum number of ticks.
+        :type max_ticks: int.
+        :return: Number of ticks and seconds spent in engine.step.
+        :rtype: int, float.
+    """
+    engine_time = 0.0
+    n_ticks = 0
+    while n_ticks < max_ticks:
+        n_ticks += 1
+        robot_if.ParseSensorData()
+
+        start_time = time.perf_counter()
+        engine.step(robot_if)
+        engine_time += time.perf_counter() - start_time
+        if engine.complete or (engine.phase == 1 and engine.index_found.all()):
+            break
+
+        for i in range(controller.n_motors):
+            controller.motor_pos[i] = robot_if.GetMotor(i).GetPosition()
+            controller.motor_vel[i] = robot_if.GetMotor(i).GetVelocity()
+        currents = controller.compute(engine.target_position, ControllerMode.CALIBRATION, engine.phase == 2)
+        for i in range(controller.n_motors):
+            robot_if.GetMotor(i).SetCurrentReference(currents[i])
+        robot_if.SendCommand()
+    return n_ticks, engine_time
+
+
+def benchmark_calibration(phase = 2, n_runs = 3, seed = 0, step_value = 0.000001, print_timeline = True):
+    """
+        Runs calibration phase against the masterboard simulator and prints ticks until completion and time per tick.
+
+        :param phase: Calibration phase 1 or 2.
+        :type phase: int.
+        :param n_runs: Number of runs, simulator seed is seed + run.
+        :type n_runs: int.
+        :param seed: Seed of first run.
+        :type seed: int.
+        :param step_value: Increment of sweep offset per tick in rad at motor.
+        :type step_value: float.
+        :param print_timeline: Print index detection timeline of each run.
+        :type print_timeline: Bool.
+        :return: None.
+        :rtype: None.
+    """
+    for run in range(n_runs):
+        robot_if = SimulatedMasterBoardInterfaceClass(seed=seed + run)
+        robot_if.Init()
+        for i in range(robot_if.n_slaves):
+            robot_if.GetDriver(i).motor1.Enable()
+            robot_if.GetDriver(i).motor2.Enable()
+            robot_if.GetDriver(i).Enable()
+        robot_if.SendInit()
+
+        engine = CalibrationEngineClass(phase, [0] * robot_if.n_motors, step_value=step_value)
+        controller = SoloControllerClass(np.ones(robot_if.n_motors))
+        start_time = time.perf_counter()
+        n_ticks, engine_time = run_calibration(robot_if, engine, controller)
+        total_time = time.perf_counter() - start_time
+
+        if print_timeline:
+            engine.print_timeline()
+        print("Run %d: %d ticks (%.1f s at 1 kHz), %d/%d indices found, engine: %.2f us per tick, total: %.2f us per tick" % (
+            run, n_ticks, n_ticks / 1000, engine.index_found.sum(), engine.n_motors, engine_time / n_ticks * 1e6, total_time / n_ticks * 1e6))
+        print('---')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Runs index calibration against the masterboard simulator.')
+    parser.add_argument('-p',
+                        '--phase',
+                        type=int,
+                        default=2,
+                        choices=[1, 2],
+                        help='Calibration phase')
+    parser.add_argument('-n',
+                        '--n-runs',
+                        type=int,
+                        default=3,
+                        help='Number of runs')
+    parser.add_argument('-s',
+                        '--seed',
+                        type=int,
+                        default=0,
+                        help='Simulator seed of first run')
+    parser.add_argument('--step-value',
+                        type=float,
+                        default=0.000001,
+                        help='Sweep offset increment per tick in rad at motor')
+    args = parser.parse_args()
+
+    benchmark_calibration(args.phase, args.n_runs, args.seed, args.step_value)
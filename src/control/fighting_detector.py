@@ -0,0 +1,193 @@
+"""
+    Vectorized detection of motors fighting against each other in solo control.
+"""
+
+import time
+import argparse
+import numpy as np
+
+
+class MotorFightingDetectorClass():
+
+    def __init__(self,
+        n_motors,
+        diff_threshold = 5.0,
+        ratio = 2.0,
+        release_threshold = 4.0,
+        release_ratio = 1.5,
+        debounce_ticks = 50,
+    ):
+        """
+            Detects motors whose absolute position error is much larger than the average absolute error of all other motors.
+            The average of the other motors is the total sum minus the motor's own term, so one tick is a few array operations on preallocated buffers.
+            A motor is fighting when |err i| > ratio * avg |err !i| and |err i| > diff_threshold for debounce_ticks consecutive ticks. It stays fighting until |err i| drops below max(release_ratio * avg |err !i|, release_threshold) (hysteresis).
+
+            :param n_motors: Number of motors.
+            :type n_motors: int.
+            :param diff_threshold: Minimum absolute position error of a fighting motor in rad at motor.
+            :type diff_threshold: float.
+            :param ratio: Minimum ratio between error of a fighting motor and average error of the other motors.
+            :type ratio: float.
+            :param release_threshold: Absolute position error below which a fighting motor is released.
+            :type release_threshold: float.
+            :param release_ratio: Ratio to average error of the other motors below which a fighting motor is released.
+            :type release_ratio: float.
+            :param debounce_ticks: Number of consecutive ticks before a motor is fighting.
+            :type debounce_ticks: int.
+        """
+        self.n_motors = n_motors
+        self.diff_threshold = diff_threshold
+        self.ratio = ratio
+        self.release_threshold = release_threshold
+        self.release_ratio = release_ratio
+        self.debounce_ticks = debounce_ticks
+        self.inv_n_other = 1 / (n_motors - 1)
+
+        self.abs_err = np.zeros(n_motors)
+        self.avg_err_not_i = np.zeros(n_motors)
+        self.enter_bound = np.zeros(n_motors)
+        self.release_bound = np.zeros(n_motors)
+        self.is_over = np.zeros(n_motors, dtype=bool) # fighting condition in this tick
+        self.is_held = np.zeros(n_motors, dtype=bool)
+        self.counter = np.zeros(n_motors, dtype=int) # consecutive ticks with fighting condition
+        self.active = np.zeros(n_motors, dtype=bool) # debounced fighting motors
+        self.new_active = np.zeros(n_motors, dtype=bool)
+        self.n_pending = 0 # motors with fighting condition in last tick
+        self.n_ticks = 0
+        self.fault = None # last fault event
+        self.faults = []
+
+
+    def update(self, p_err):
+        """
+            Runs one detection tick on position errors. Returns True when a motor starts fighting, the fault event is stored in fault.
+
+            :param p_err: Position errors of motors (target - measured) in rad at motor.
+            :type p_err: ndarray (n_motors,).
+            :return: True if a new fault was raised in this tick.
+            :rtype: Bool.
+        """
+        self.n_ticks += 1
+        np.abs(p_err, out=self.abs_err)
+        if self.n_pending == 0 and self.abs_err.max() <= self.diff_threshold:
+            return False # no motor can be fighting and nothing is debounced
+
+        np.subtract(self.abs_err.sum(), self.abs_err, out=self.avg_err_not_i)
+        self.avg_err_not_i *= self.inv_n_other
+
+        # |err i| > ratio * avg and |err i| > threshold  <=>  |err i| > max(ratio * avg, threshold)
+        np.multiply(self.avg_err_not_i, self.ratio, out=self.enter_bound)
+        np.maximum(self.enter_bound, self.diff_threshold, out=self.enter_bound)
+        np.greater(self.abs_err, self.enter_bound, out=self.is_over)
+
+        np.multiply(self.avg_err_not_i, self.release_ratio, out=self.release_bound)
+        np.maximum(self.release_bound, self.release_threshold, out=self.release_bound)
+        np.greater(self.abs_err, self.release_bound, out=self.is_held)
+        self.is_held &= self.active
+        self.is_over |= self.is_held
+
+        self.counter += 1
+        self.counter *= self.is_over # reset counter of motors without fighting condition
+        self.n_pending = int(np.count_nonzero(self.counter))
+
+        np.greater_equal(self.counter, self.debounce_ticks, out=self.new_active)
+        self.new_active, self.active = self.active, self.new_active # new_active holds previous state
+        np.greater(self.active, self.new_active, out=self.new_active) # motors that started fighting in this tick
+        if not self.new_active.any():
+            return False
+
+        self.fault = {
+            'tick': self.n_ticks,
+            'motors': np.flatnonzero(self.new_active).tolist(),
+            'fighting': self.active.tolist(),
+            'abs_err': self.abs_err.tolist(),
+            'avg_err_not_i': self.avg_err_not_i.tolist(),
+            'diff_threshold': self.diff_threshold,
+        }
+        self.faults.append(self.fault)
+        return True
+
+
+    def reset(self):
+        """
+            Clears debounce counters and fighting motors, recorded faults are kept.
+
+            :return: None.
+            :rtype: None.
+        """
+        self.counter[:] = 0
+        self.active[:] = False
+        self.n_pending = 0
+
+
+def reference_fighting_check(p_err, diff_threshold):
+    """
+        Reference check as implemented in SoloControlClass.check_motor_torques before vectorization (without debounce and hysteresis). Used to check MotorFightingDetectorClass.
+
+        :return: Fighting motors.
+        :rtype: list[Bool].
+    """
+    n_motors = len(p_err)
+    motors_fighting = []
+    for motor_i_to_check in range(n_motors):
+        offset_i = abs(p_err[motor_i_to_check])
+        offset_arr_not_i = list([abs(p_err[motor_j]) for motor_j in range(n_motors) if motor_j != motor_i_to_check])
+        avg_offset_not_i = np.average(offset_arr_not_i)
+        motors_fighting.append(bool(offset_i > 2 * avg_offset_not_i and offset_i > diff_threshold))
+    return motors_fighting
+
+
+def compare_detector(n_ticks=20000, diff_threshold=5.0):
+    """
+        Checks that MotorFightingDetectorClass without debounce and hysteresis finds the same motors as the reference check and prints per-tick cost of both.
+
+        :param n_ticks: Number of random ticks.
+        :type n_ticks: int.
+        :param diff_threshold: Minimum absolute position error of a fighting motor.
+        :type diff_threshold: float.
+        :return: True if all ticks give the same fighting motors.
+        :rtype: Bool.
+    """
+    rng = np.random.default_rng(0)
+    n_motors = 12
+    p_errs = rng.normal(scale=2, size=(n_ticks, n_motors))
+    spikes = rng.random((n_ticks, n_motors)) < 0.02
+    p_errs[spikes] *= 10 # some motors far away from target
+
+    start_time = time.perf_counter()
+    reference = [reference_fighting_check(p_err, diff_threshold) for p_err in p_errs]
+    reference_time = time.perf_counter() - start_time
+
+    detector = MotorFightingDetectorClass(n_motors, diff_threshold=diff_threshold, release_threshold=diff_threshold, release_ratio=2.0, debounce_ticks=1)
+    vectorized = []
+    start_time = time.perf_counter()
+    for p_err in p_errs:
+        detector.update(p_err)
+        vectorized.append(detector.active.tolist())
+    vectorized_time = time.perf_counter() - start_time
+
+    n_mismatches = sum(a != b for a, b in zip(reference, vectorized))
+    print("Ticks with fighting motors: %d, mismatches: %d" % (sum(any(r) for r in reference), n_mismatches))
+    print("Reference check:   %.2f us per tick" % (reference_time / n_ticks * 1e6))
+    print("Vectorized check:  %.2f us per tick" % (vectorized_time / n_ticks * 1e6))
+
+    quiet = MotorFightingDetectorClass(n_motors, diff_threshold=diff_threshold)
+    p_err = np.full(n_motors, 0.1)
+    start_time = time.perf_counter()
+    for _ in range(n_ticks):
+        quiet.update(p_err)
+    print("Vectorized check without fighting motors: %.2f us per tick" % ((time.perf_counter() - start_time) / n_ticks * 1e6))
+    return n_mismatches == 0
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Motor fighting detector check and microbenchmark.')
+    parser.add_argument('-n',
+                        '--n-ticks',
+                        type=int,
+                        default=20000,
+                        help='Number of ticks')
+    args = parser.parse_args()
+
+    compare_detector(args.n_ticks)
@@ -8,6 +8,11 @@ import csv
 import numpy as np
 from config import *
 import time
+from control.telemetry_writer import *
+from control.masterboard_simulator import *
+from control.periodic_scheduler import *
+from control.status_channel import *
+from control.realtime_profile import *
 
 try:
     import libmaster_board_sdk_pywrap as mbs
@@ -20,8 +25,12 @@ class FreeSoloClass():
         name_interface = 'enp9s0f1',
         n_slaves = 6,
         run_time_sec = None, # if None == run till ctrl+c is pressed
+        use_simulator = False, # use in-process masterboard simulator instead of libmaster_board_sdk_pywrap
+        realtime = REALTIME_PROFILE, # pin control thread, SCHED_FIFO, mlockall
     ):
         self.name_interface = name_interface
+        self.use_simulator = use_simulator
+        self.realtime = realtime
         self.n_slaves = n_slaves
         self.run_time_sec = run_time_sec
         self.dt = 1/1000
@@ -39,7 +48,15 @@ class FreeSoloClass():
 
         self.calibration_offsets = self.load_offsets()
 
-        self.main_loop()
+        self.landing_pos_telemetry = TelemetryWriterClass(self.write_landing_pos, self.n_slaves*2, n_slots=64, name='landing_pos')
+        self.status = StatusChannelClass(GLOBAL_OUTPUT_DIRECTORY+FREE_SOLO_EVENT_LOG_FILE_NAME, rate_limits=STATUS_RATE_LIMITS, name='free_solo') # console output from the control loop
+
+        try:
+            self.main_loop()
+        finally:
+            self.landing_pos_telemetry.close()
+            self.status.close()
+            self.scheduler.print_report()
 
         self.robot_if.Stop()  # Shut down the interface between the computer and the master board
 
@@ -51,58 +68,74 @@ class FreeSoloClass():
 
     
     def main_loop(self):
+        """
+            Main execution block. Runs at 1000 Hz with deadline based scheduler.
+
+            :return: None.
+            :rtype: None.
+        """
+        self.scheduler.start()
         while(1):
-            if ((time.time() - self.last) > self.dt):
-                self.last = time.time()
-
-                self.robot_if.ParseSensorData()
-
-                if (self.state == 0):  #  If the system is not ready
-                    self.state = 1
-                    # for all motors on a connected slave
-                    for i in self.motors_spi_connected_indexes:  # Check if all motors are enabled and ready
-                        if not (self.robot_if.GetMotor(i).IsEnabled() and self.robot_if.GetMotor(i).IsReady()):
-                            self.robot_if.SendInit()
-                            self.state = 0
-                        self.init_pos_motors[i] = self.robot_if.GetMotor(i).GetPosition()
-                
-                else:
-                    self.read_adc_trigger()
-                        
-                    for i in self.motors_spi_connected_indexes:
-                        self.global_i = i
-                        if i % 2 == 0 and self.robot_if.GetDriver(i // 2).GetErrorCode() == 0xf:
-                            #print("Transaction with SPI{} failed".format(i // 2))
-                            continue #user should decide what to do in that case, here we ignore that motor
-                                                    
-                        if self.robot_if.GetMotor(i).IsEnabled():
-
-                            if self.run_time_sec is None:
+            self.scheduler.wait()
+            self.last = time.time()
+
+            self.robot_if.ParseSensorData()
+
+            if (self.state == 0):  #  If the system is not ready
+                self.state = 1
+                # for all motors on a connected slave
+                for i in self.motors_spi_connected_indexes:  # Check if all motors are enabled and ready
+                    if not (self.robot_if.GetMotor(i).IsEnabled() and self.robot_if.GetMotor(i).IsReady()):
+                        self.robot_if.SendInit()
+                        self.state = 0
+                    self.init_pos_motors[i] = self.robot_if.GetMotor(i).GetPosition()
+            
+            else:
+                self.read_adc_trigger()
+                    
+                for i in self.motors_spi_connected_indexes:
+                    self.global_i = i
+                    if i % 2 == 0 and self.robot_if.GetDriver(i // 2).GetErrorCode() == 0xf:
+                        #print("Transaction with SPI{} failed".format(i // 2))
+                        continue #user should decide what to do in that case, here we ignore that motor
+                                                
+                    if self.robot_if.GetMotor(i).IsEnabled():
+
+                        if self.run_time_sec is None:
+                            self.free_controller()
+                        else:
+                            if (self.global_ctr <= self.run_time_sec*1000):
                                 self.free_controller()
                             else:
-                                if (self.global_ctr <= self.run_time_sec*1000):
-                                    self.free_controller()
-                                else:
-                                    self.robot_if.Stop()
-                                    exit()
+                                self.robot_if.Stop()
+                                exit()
 
             self.robot_if.SendCommand()
 
     
     def read_adc_trigger(self):
         if (self.robot_if.GetDriver(3).adc[0]) > self.adc_trigger_threshold:
-            self.save_offset(values_at_trigger=self.motor_pos)
+            self.landing_pos_telemetry.push(self.motor_pos) # saved on telemetry writer thread
             self.adc_triggered_ctr+=1
-            print('---------------------------------------------')
-            print("ADC Triggered Counter:", self.adc_trigger_threshold)
-            print("Motor Pos:",self.motor_pos)
-            print('---------------------------------------------')
+            self.status.post('adc_trigger', "---------------------------------------------\nADC Triggered Counter: {counter}\nMotor Pos: {motor_pos}\n---------------------------------------------", counter=self.adc_triggered_ctr, motor_pos=list(self.motor_pos))
             # returns in case other parts of program wants to read it
             return True, self.adc_triggered_ctr, self.motor_pos
         else:
             return False, self.adc_triggered_ctr, []
 
     
+    def write_landing_pos(self, values):
+        """
+            Saves landing position from telemetry slot. Called on telemetry writer thread.
+
+            :param values: Joint angles at trigger.
+            :type values: ndarray.
+            :return: None.
+            :rtype: None.
+        """
+        self.save_offset(values_at_trigger=values.tolist())
+
+
     def save_offset(self, f_name=GLOBAL_CALIBRATION_FILES_DIRECTORY+LANDING_POS_FILE, values_at_trigger=[]):
         """
             Saves calibration offsets into given file.
@@ -127,7 +160,14 @@ class FreeSoloClass():
             :rtype: None.
         """
         self.state = 0 # State of the system (ready (1) or not (0))
-        os.nice(-20)  #  Set the process to highest priority (from -20 highest to +20 lowest)
+        try:
+            os.nice(-20)  #  Set the process to highest priority (from -20 highest to +20 lowest)
+        except PermissionError:
+            if not self.use_simulator:
+                raise
+            print("Running simulator without raised process priority.")
+        self.realtime_profile = RealtimeProfileClass(enabled=self.realtime, cpus=REALTIME_CPUS, priority=REALTIME_PRIORITY, period=self.dt, name='free_solo_control')
+        self.realtime_profile.apply()
         self.init_motor_drivers()
 
     
@@ -143,7 +183,10 @@ class FreeSoloClass():
         self.motors_spi_connected_indexes = [] # indexes of the motors on each connected slaves
         self.motors_spi_connected_indexes_array = np.zeros(self.n_slaves*2) # 1 if motor at index is connected
 
-        self.robot_if = mbs.MasterBoardInterface(self.name_interface)
+        if self.use_simulator:
+            self.robot_if = SimulatedMasterBoardInterfaceClass(self.name_interface, n_slaves=self.n_slaves, dt=self.dt)
+        else:
+            self.robot_if = mbs.MasterBoardInterface(self.name_interface)
         self.robot_if.Init()  # Initialization of the interface between the computer and the master board
 
         for i in range(self.n_slaves):  #  We enable each controler driver and its two associated motors
@@ -155,12 +198,11 @@ class FreeSoloClass():
             self.robot_if.GetDriver(i).SetTimeout(5)
             self.robot_if.GetDriver(i).Enable()
 
-        self.last = time.time()
-
+        self.scheduler = PeriodicSchedulerClass(self.dt, name='free_solo')
         while (not self.robot_if.IsTimeout() and not self.robot_if.IsAckMsgReceived()):
-            if ((time.time() - self.last) > self.dt):
-                self.last = time.time()
-                self.robot_if.SendInit()
+            self.scheduler.wait()
+            self.robot_if.SendInit()
+        self.last = time.time()
 
         if self.robot_if.IsTimeout():
             print("Timeout while waiting for ack.")
@@ -225,9 +267,25 @@ class FreeSoloClass():
         return row 
 
 
+    def format_joint_angles(self, motor_pos):
+        """
+            Formats table of joint angles. Called by the render thread of the status channel.
+
+            :param motor_pos: Joint angles.
+            :type motor_pos: list[float].
+            :return: Table text.
+            :rtype: str.
+        """
+        lines = ["Motor No.        Motor Name.         Joint Angle"]
+        for i in range(len(motor_pos)):
+            lines.append("  "+str(i)+"              "+str(self.motor_mapping[i])+"             "+str(motor_pos[i]))
+        lines.append("---")
+        return "\n".join(lines)
+
+
     def free_controller(self):
         """
-            Controller with no PD parameters. Prints joint angles.
+            Controller with no PD parameters. Posts joint angles to the status channel every second.
 
             :return: None.
             :rtype: None.
@@ -236,12 +294,10 @@ class FreeSoloClass():
         if self.robot_if.GetMotor(self.global_i).IsEnabled():
             if self.global_i == 0:
                 if self.global_ctr % 1000 == 0: # for every second -> print
-                    print("Motor No.        Motor Name.         Joint Angle")
                     for i in range(self.n_slaves*2):
                         self.motor_pos[i] = self.robot_if.GetMotor(i).GetPosition() + self.calibration_offsets[i] # adding calibration ph2 offsets here
                         self.motor_vel[i] = self.robot_if.GetMotor(i).GetVelocity()
-                        print("  "+str(i)+"              "+str(self.motor_mapping[i])+"             "+str(self.motor_pos[i]))
-                    print("---")
+                    self.status.post('joint_angles', self.format_joint_angles, motor_pos=list(self.motor_pos))
                 self.global_ctr+=1
 
             for i in self.motors_spi_connected_indexes:
@@ -0,0 +1,233 @@
+"""
+    Per-phase latency instrumentation for control loops.
+"""
+
+import time
+import threading
+import numpy as np
+from control.realtime_profile import *
+
+perf_counter_ns = time.perf_counter_ns # avoid attribute lookup in the phase marks of the loop
+
+
+class LatencyProfilerClass():
+
+    def __init__(self,
+        phase_names,
+        period = 0.001,
+        bucket_width_ns = 1000,
+        n_buckets = 5000,
+        batch_size = 1000,
+        report_interval = None,
+        name = 'loop',
+    ):
+        """
+            Collects per-phase nanosecond timings of a control loop in fixed-bucket histograms.
+            The loop calls start_tick(timestamp_ns) at the start of a tick and mark(perf_counter_ns()) at the end of each phase, in the order of phase_names. Every phase has to be marked in every tick, a phase that does not run is marked with the timestamp of the previous mark. Both are the append method of the timestamp list, so they cost a C call each and no Python frame. Bind them to locals before the loop.
+            An accumulator thread takes the complete ticks from the front of the list every batch_size periods, adds them to the histograms, and prints the report if a report interval has passed. The control thread only pays for the calls.
+
+            :param phase_names: Names of phases in the order they run in one tick.
+            :type phase_names: list[str].
+            :param period: Loop period in seconds, ticks longer than the period are counted as overruns.
+            :type period: float.
+            :param bucket_width_ns: Width of histogram buckets in nanoseconds.
+            :type bucket_width_ns: int.
+            :param n_buckets: Number of histogram buckets, the last bucket collects all longer durations.
+            :type n_buckets: int.
+            :param batch_size: Number of loop periods between two accumulations.
+            :type batch_size: int.
+            :param report_interval: Optional interval in seconds for printing the report while running. None to only print on request.
+            :type report_interval: float or None.
+            :param name: Name used in the report.
+            :type name: str.
+        """
+        self.phase_names = list(phase_names) + ['total']
+        self.n_phases = len(phase_names)
+        self.n_marks = self.n_phases + 1 # tick start + end of each phase
+        self.period_ns = int(round(period * 1e9))
+        self.bucket_width_ns = bucket_width_ns
+        self.n_buckets = n_buckets
+        self.batch_size = batch_size
+        self.report_interval_ns = None if report_interval is None else int(report_interval * 1e9)
+        self.name = name
+
+        self.timestamps = [] # tick start and phase marks of ticks that are not accumulated yet, n_marks per tick
+        self.start_tick = self.timestamps.append # start_tick(timestamp_ns), e.g. wake up time of the scheduler
+        self.mark = self.timestamps.append # mark(perf_counter_ns()) at the end of each phase
+
+        self.histograms = np.zeros((len(self.phase_names), self.n_buckets), dtype=np.int64)
+        self.bucket_offsets = np.arange(len(self.phase_names), dtype=np.int64) * self.n_buckets
+        self.max_ns = np.zeros(len(self.phase_names), dtype=np.int64)
+        self.n_ticks = 0
+        self.n_overruns = 0
+        self.accumulate_time_ns = 0 # cpu time of accumulate()
+        self.last_report_ns = time.perf_counter_ns()
+
+        self.stop_event = threading.Event()
+        self.accumulator_thread = threading.Thread(target=self.accumulator_loop, name=self.name+'_latency', daemon=True)
+        self.accumulator_thread.start()
+
+
+    def take_ticks(self):
+        """
+            Removes complete ticks from the front of the timestamp list. The control thread only appends at the end, and slicing and deleting are atomic, so this is safe while the loop is running.
+
+            :return: Timestamps of complete ticks, n_marks per tick.
+            :rtype: list[int].
+        """
+        n_timestamps = len(self.timestamps) // self.n_marks * self.n_marks
+        ticks = self.timestamps[:n_timestamps]
+        del self.timestamps[:n_timestamps]
+        return ticks
+
+
+    def accumulator_loop(self):
+        """
+            Accumulator thread. Accumulates complete ticks every batch_size periods until the profiler is closed. Runs with normal scheduling even if the control thread is real-time.
+
+            :return: None.
+            :rtype: None.
+        """
+        set_thread_normal_priority()
+        while not self.stop_event.wait(self.batch_size * self.period_ns / 1e9):
+            self.accumulate(self.take_ticks())
+
+            if self.report_interval_ns is not None:
+                now_ns = time.perf_counter_ns()
+                if now_ns - self.last_report_ns > self.report_interval_ns:
+                    self.last_report_ns = now_ns
+                    self.print_report()
+
+
+    def accumulate(self, ticks):
+        """
+            Accumulates ticks into histograms.
+
+            :param ticks: Timestamps of complete ticks, n_marks per tick.
+            :type ticks: list[int].
+            :return: None.
+            :rtype: None.
+        """
+        if not ticks:
+            return
+        start_ns = time.thread_time_ns()
+        timestamps = np.array(ticks, dtype=np.int64).reshape(-1, self.n_marks)
+        n_rows = len(timestamps)
+
+        durations = np.empty((n_rows, len(self.phase_names)), dtype=np.int64)
+        durations[:, :-1] = np.diff(timestamps, axis=1)
+        durations[:, -1] = timestamps[:, -1] - timestamps[:, 0]
+
+        buckets = np.clip(durations // self.bucket_width_ns, 0, self.n_buckets - 1)
+        buckets += self.bucket_offsets # one bincount for all phases
+        self.histograms += np.bincount(buckets.ravel(), minlength=self.histograms.size).reshape(self.histograms.shape)
+        np.maximum(self.max_ns, durations.max(axis=0), out=self.max_ns)
+        self.n_overruns += int(np.count_nonzero(durations[:, -1] > self.period_ns))
+        self.n_ticks += n_rows
+        self.accumulate_time_ns += time.thread_time_ns() - start_ns
+
+
+    def get_percentile_ns(self, phase_index, percentile):
+        """
+            Returns percentile of phase duration from histogram (upper edge of bucket).
+
+            :param phase_index: Index of phase in phase_names, -1 for total tick duration.
+            :type phase_index: int.
+            :param percentile: Percentile between 0 and 100.
+            :type percentile: float.
+            :return: Duration in nanoseconds.
+            :rtype: int.
+        """
+        counts = np.cumsum(self.histograms[phase_index])
+        if counts[-1] == 0:
+            return 0
+        bucket = int(np.searchsorted(counts, counts[-1] * percentile / 100))
+        return min((bucket + 1) * self.bucket_width_ns, int(self.max_ns[phase_index]))
+
+
+    def get_report(self):
+        """
+            Returns p50, p99 and max duration in micro-seconds for all phases and total tick.
+
+            :return: Report per phase name and number of ticks and overruns.
+            :rtype: dict.
+        """
+        report = {'ticks': self.n_ticks, 'overruns': self.n_overruns}
+        for i, phase_name in enumerate(self.phase_names):
+            report[phase_name] = {
+                'p50_us': self.get_percentile_ns(i, 50) / 1000,
+                'p99_us': self.get_percentile_ns(i, 99) / 1000,
+                'max_us': self.max_ns[i] / 1000,
+            }
+        return report
+
+
+    def print_report(self):
+        """
+            Prints latency report.
+
+            :return: None.
+            :rtype: None.
+        """
+        report = self.get_report()
+        print("Latency", self.name+":", report['ticks'], "ticks,", report['overruns'], "overruns (> %.0f us)" % (self.period_ns / 1000))
+        print("    Phase                  p50 [us]    p99 [us]    max [us]")
+        for phase_name in self.phase_names:
+            print("    %-20s %10.1f  %10.1f  %10.1f" % (phase_name, report[phase_name]['p50_us'], report[phase_name]['p99_us'], report[phase_name]['max_us']))
+        if self.n_ticks > 0:
+            print("    accumulation: %.2f us per tick, off the control thread" % (self.accumulate_time_ns / self.n_ticks / 1000))
+
+
+    def measure_overhead(self, n_ticks=100000):
+        """
+            Measures cpu time of the control thread for one tick (start_tick() and one mark per phase) on this machine. Accumulation runs on the accumulator thread and is reported by print_report. Uses a separate profiler instance.
+
+            :param n_ticks: Number of ticks to measure.
+            :type n_ticks: int.
+            :return: Overhead per tick in micro-seconds.
+            :rtype: float.
+        """
+        profiler = LatencyProfilerClass(self.phase_names[:-1], batch_size=self.batch_size)
+        start_tick = profiler.start_tick
+        mark = profiler.mark
+        clock = perf_counter_ns
+        thread_time_ns = time.thread_time_ns
+        phases = range(self.n_phases)
+
+        start_ns = thread_time_ns()
+        for _ in range(n_ticks):
+            for _ in phases:
+                pass
+        loop_ns = thread_time_ns() - start_ns
+
+        start_ns = thread_time_ns()
+        for _ in range(n_ticks):
+            start_tick(start_ns)
+            for _ in phases:
+                mark(clock())
+        profiled_ns = thread_time_ns() - start_ns
+
+        profiler.close(print_report=False)
+        return (profiled_ns - loop_ns) / n_ticks / 1000
+
+
+    def close(self, print_report=True):
+        """
+            Stops accumulator thread, accumulates remaining ticks and prints report. Phases of a tick that was interrupted are counted with zero duration.
+
+            :param print_report: Print report.
+            :type print_report: Bool.
+            :return: None.
+            :rtype: None.
+        """
+        if self.accumulator_thread is None:
+            return
+        self.stop_event.set()
+        self.accumulator_thread.join()
+        self.accumulator_thread = None
+        n_missing = -len(self.timestamps) % self.n_marks
+        if n_missing > 0:
+            self.timestamps.extend([self.timestamps[-1]] * n_missing)
+        self.accumulate(self.take_ticks())
+        if print_report:
+            self.print_report()
@@ -0,0 +1,283 @@
+"""
+    Hardware-free stand-in for libmaster_board_sdk_pywrap.MasterBoardInterface.
+"""
+
+import math
+import numpy as np
+
+
+class SimulatedMotorClass():
+
+    def __init__(self,
+        index,
+        initial_position = 0.0,
+        index_position = 0.0,
+        torque_constant = 0.025,
+        inertia = 1e-5,
+        damping = 1e-3,
+    ):
+        """
+            Motor with second order model: inertia * acceleration = torque_constant * current - damping * velocity. Positions are in radians at the motor.
+
+            :param index: Motor index on masterboard.
+            :type index: int.
+            :param initial_position: Motor position at start.
+            :type initial_position: float.
+            :param index_position: Position of encoder index pulse, repeats every 2*pi.
+            :type index_position: float.
+            :param torque_constant: Torque constant in Nm/A.
+            :type torque_constant: float.
+            :param inertia: Inertia at motor in kg*m^2.
+            :type inertia: float.
+            :param damping: Viscous damping at motor in Nm*s/rad.
+            :type damping: float.
+        """
+        self.index = index
+        self.position = initial_position
+        self.velocity = 0.0
+        self.current = 0.0
+        self.current_reference = 0.0
+        self.index_position = index_position
+        self.torque_constant = torque_constant
+        self.inertia = inertia
+        self.damping = damping
+        self.enabled = False
+        self.ready = False
+        self.index_detected = False
+
+    def SetCurrentReference(self, current):
+        self.current_reference = float(current)
+
+    def Enable(self):
+        self.enabled = True
+
+    def Disable(self):
+        self.enabled = False
+        self.current_reference = 0.0
+
+    def IsEnabled(self):
+        return self.enabled
+
+    def IsReady(self):
+        return self.ready
+
+    def GetPosition(self):
+        return self.position
+
+    def GetVelocity(self):
+        return self.velocity
+
+    def GetCurrent(self):
+        return self.current
+
+    def HasIndexBeenDetected(self):
+        return self.index_detected
+
+    def step(self, dt):
+        """
+            Integrates motor model for one time step (semi-implicit Euler) and detects index pulse.
+
+            :param dt: Time step in seconds.
+            :type dt: float.
+            :return: None.
+            :rtype: None.
+        """
+        self.current = self.current_reference if self.enabled else 0.0
+        acceleration = (self.torque_constant * self.current - self.damping * self.velocity) / self.inertia
+        previous_position = self.position
+        self.velocity += acceleration * dt
+        self.position += self.velocity * dt
+
+        if not self.index_detected:
+            # index pulse is crossed if the number of index positions below the motor position changes
+            previous_turn = math.floor((previous_position - self.index_position) / (2 * math.pi))
+            turn = math.floor((self.position - self.index_position) / (2 * math.pi))
+            self.index_detected = previous_turn != turn
+
+
+class SimulatedMotorDriverClass():
+
+    def __init__(self, motor1, motor2, connected = True):
+        """
+            Motor driver (SPI slave) with two motors and ADC inputs.
+
+            :param motor1: First motor of driver.
+            :type motor1: SimulatedMotorClass.
+            :param motor2: Second motor of driver.
+            :type motor2: SimulatedMotorClass.
+            :param connected: Whether driver answers on SPI.
+            :type connected: Bool.
+        """
+        self.motor1 = motor1
+        self.motor2 = motor2
+        self.connected = connected
+        self.enabled = False
+        self.timeout = 0
+        self.adc = [0.0, 0.0]
+
+    def Enable(self):
+        self.enabled = True
+
+    def EnablePositionRolloverError(self):
+        pass
+
+    def SetTimeout(self, timeout):
+        self.timeout = timeout
+
+    def IsConnected(self):
+        return self.connected
+
+    def IsEnabled(self):
+        return self.enabled
+
+    def GetErrorCode(self):
+        return 0
+
+
+class SimulatedMasterBoardInterfaceClass():
+
+    def __init__(self,
+        name_interface = 'simulator',
+        n_slaves = 6,
+        dt = 0.001,
+        initial_positions = None,
+        index_positions = None,
+        adc_triggers = ((3.0, 3.1),),
+        adc_driver = 3,
+        connected_slaves = None,
+        timeout_after = None,
+        seed = 0,
+    ):
+        """
+            In-process stand-in for MasterBoardInterface. Every ParseSensorData call advances the simulation by dt, so the simulated time does not depend on the wall clock.
+
+            :param name_interface: Name of network interface (unused).
+            :type name_interface: str.
+            :param n_slaves: Number of motor drivers.
+            :type n_slaves: int.
+            :param dt: Simulation time step in seconds.
+            :type dt: float.
+            :param initial_positions: Motor positions at start. If None small random positions are used.
+            :type initial_positions: list[float] or None.
+            :param index_positions: Encoder index positions of motors. If None random positions in [0, 2*pi) are used.
+            :type index_positions: list[float] or None.
+            :param adc_triggers: Scripted ADC trigger pulses as (start time, end time) in seconds of simulated time.
+            :type adc_triggers: list[tuple(float, float)].
+            :param adc_driver: Index of driver whose adc[0] is triggered.
+            :type adc_driver: int.
+            :param connected_slaves: Connected driver indices. If None all drivers are connected.
+            :type connected_slaves: list[int] or None.
+            :param timeout_after: Optional simulated time in seconds after which IsTimeout returns True.
+            :type timeout_after: float or None.
+            :param seed: Seed for random initial and index positions.
+            :type seed: int.
+        """
+        self.name_interface = name_interface
+        self.n_slaves = n_slaves
+        self.n_motors = n_slaves * 2
+        self.dt = dt
+        self.adc_triggers = list(adc_triggers)
+        self.adc_driver = adc_driver
+        self.timeout_after = timeout_after
+
+        rng = np.random.default_rng(seed)
+        if initial_positions is None:
+            initial_positions = rng.uniform(-0.1, 0.1, self.n_motors)
+        if index_positions is None:
+            index_positions = rng.uniform(0, 2 * math.pi, self.n_motors)
+        if connected_slaves is None:
+            connected_slaves = range(self.n_slaves)
+
+        self.motors = [SimulatedMotorClass(i, initial_positions[i], index_positions[i]) for i in range(self.n_motors)]
+        self.drivers = [SimulatedMotorDriverClass(self.motors[2 * i], self.motors[2 * i + 1], i in connected_slaves) for i in range(self.n_slaves)]
+
+        self.time = 0.0
+        self.n_sensor_parses = 0
+        self.n_commands = 0
+        self.initialized = False
+        self.ack_received = False
+        self.stopped = False
+
+        self.accelerometer = [0.0, 0.0, 9.81]
+        self.gyroscope = [0.0, 0.0, 0.0]
+        self.attitude = [0.0, 0.0, 0.0]
+        self.linear_acceleration = [0.0, 0.0, 0.0]
+
+    def Init(self):
+        self.initialized = True
+
+    def SendInit(self):
+        self.ack_received = self.initialized
+        for driver in self.drivers:
+            if driver.connected and driver.enabled:
+                driver.motor1.ready = driver.motor1.enabled
+                driver.motor2.ready = driver.motor2.enabled
+
+    def IsAckMsgReceived(self):
+        return self.ack_received
+
+    def IsTimeout(self):
+        return self.timeout_after is not None and self.time > self.timeout_after
+
+    def Stop(self):
+        self.stopped = True
+        for motor in self.motors:
+            motor.Disable()
+
+    def GetMotor(self, i):
+        return self.motors[i]
+
+    def GetDriver(self, i):
+        return self.drivers[i]
+
+    def ParseSensorData(self):
+        """
+            Advances motors by one time step and updates scripted ADC values.
+
+            :return: None.
+            :rtype: None.
+        """
+        self.time += self.dt
+        self.n_sensor_parses += 1
+        for driver in self.drivers:
+            if driver.connected:
+                driver.motor1.step(self.dt)
+                driver.motor2.step(self.dt)
+
+        adc_value = 0.0
+        for start_time, end_time in self.adc_triggers:
+            if start_time <= self.time < end_time:
+                adc_value = 1.0
+        self.drivers[self.adc_driver].adc[0] = adc_value
+
+    def SendCommand(self):
+        self.n_commands += 1
+
+    def imu_data_accelerometer(self, i):
+        return self.accelerometer[i]
+
+    def imu_data_gyroscope(self, i):
+        return self.gyroscope[i]
+
+    def imu_data_attitude(self, i):
+        return self.attitude[i]
+
+    def imu_data_linear_acceleration(self, i):
+        return self.linear_acceleration[i]
+
+    def PrintIMU(self):
+        print("IMU accelerometer:", self.accelerometer, "gyroscope:", self.gyroscope, "attitude:", self.attitude)
+
+    def PrintADC(self):
+        print("ADC:", [driver.adc[0] for driver in self.drivers])
+
+    def PrintMotors(self):
+        for motor in self.motors:
+            print("Motor", motor.index, "enabled:", motor.enabled, "ready:", motor.ready, "index detected:", motor.index_detected, "position: %.4f velocity: %.4f current: %.4f" % (motor.position, motor.velocity, motor.current))
+
+    def PrintMotorDrivers(self):
+        for i, driver in enumerate(self.drivers):
+            print("Driver", i, "connected:", driver.connected, "enabled:", driver.enabled)
+
+    def PrintStats(self):
+        print("Simulated time: %.3f s, sensor parses: %d, commands: %d" % (self.time, self.n_sensor_parses, self.n_commands))
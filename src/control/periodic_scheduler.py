@@ -0,0 +1,110 @@
+"""
+    Deadline based periodic scheduler for control loops.
+"""
+
+import time
+
+
+class PeriodicSchedulerClass():
+
+    def __init__(self,
+        period = 0.001,
+        spin_time = 0.0002,
+        name = 'loop',
+    ):
+        """
+            Periodic scheduler with absolute deadlines on the monotonic perf_counter_ns clock. Deadlines are advanced by the period, so timing errors do not accumulate.
+            wait() sleeps until shortly before the deadline and spins for the remaining spin_time.
+
+            :param period: Period in seconds.
+            :type period: float.
+            :param spin_time: Time in seconds before the deadline in which the scheduler spins instead of sleeping. 0 to only sleep.
+            :type spin_time: float.
+            :param name: Name used in the report.
+            :type name: str.
+        """
+        self.period_ns = int(round(period * 1e9))
+        self.spin_time_ns = int(round(spin_time * 1e9))
+        self.name = name
+        self.start()
+
+
+    def start(self):
+        """
+            Resets statistics and sets first deadline one period from now.
+
+            :return: None.
+            :rtype: None.
+        """
+        self.start_time_ns = time.perf_counter_ns()
+        self.next_deadline_ns = self.start_time_ns + self.period_ns
+        self.wake_time_ns = self.start_time_ns # perf_counter_ns time of last wake up
+        self.n_ticks = 0
+        self.n_overruns = 0
+        self.n_missed_ticks = 0
+        self.sum_jitter_ns = 0
+        self.max_jitter_ns = 0
+
+
+    def wait(self):
+        """
+            Blocks until next deadline and advances deadline by one period. If the deadline has already passed by more than one period, the tick is counted as an overrun and missed deadlines are skipped.
+
+            :return: Lateness of wake up after deadline in nanoseconds.
+            :rtype: int.
+        """
+        deadline_ns = self.next_deadline_ns
+        now_ns = time.perf_counter_ns()
+
+        sleep_ns = deadline_ns - self.spin_time_ns - now_ns
+        if sleep_ns > 0:
+            time.sleep(sleep_ns * 1e-9)
+        while now_ns < deadline_ns:
+            now_ns = time.perf_counter_ns()
+
+        self.wake_time_ns = now_ns
+        jitter_ns = now_ns - deadline_ns
+        self.n_ticks += 1
+        self.sum_jitter_ns += jitter_ns
+        if jitter_ns > self.max_jitter_ns:
+            self.max_jitter_ns = jitter_ns
+
+        self.next_deadline_ns = deadline_ns + self.period_ns
+        if now_ns >= self.next_deadline_ns: # loop body or wake up took longer than one period
+            self.n_overruns += 1
+            missed_ticks = (now_ns - deadline_ns) // self.period_ns
+            self.n_missed_ticks += missed_ticks
+            self.next_deadline_ns = deadline_ns + (missed_ticks + 1) * self.period_ns
+
+        return jitter_ns
+
+
+    def get_report(self):
+        """
+            Returns scheduler statistics.
+
+            :return: Number of ticks, achieved rate in Hz, mean and max jitter in micro-seconds, number of overruns and missed ticks.
+            :rtype: dict.
+        """
+        elapsed_ns = time.perf_counter_ns() - self.start_time_ns
+        return {
+            'ticks': self.n_ticks,
+            'rate_hz': self.n_ticks / (elapsed_ns * 1e-9) if elapsed_ns > 0 else 0.0,
+            'target_rate_hz': 1e9 / self.period_ns,
+            'mean_jitter_us': self.sum_jitter_ns / self.n_ticks / 1000 if self.n_ticks > 0 else 0.0,
+            'max_jitter_us': self.max_jitter_ns / 1000,
+            'overruns': self.n_overruns,
+            'missed_ticks': self.n_missed_ticks,
+        }
+
+
+    def print_report(self):
+        """
+            Prints scheduler statistics.
+
+            :return: None.
+            :rtype: None.
+        """
+        report = self.get_report()
+        print("Scheduler", self.name+":", report['ticks'], "ticks, rate: %.1f Hz (target %.1f Hz)" % (report['rate_hz'], report['target_rate_hz']))
+        print("Scheduler", self.name+": jitter mean: %.1f us, max: %.1f us, overruns: %d, missed ticks: %d" % (report['mean_jitter_us'], report['max_jitter_us'], report['overruns'], report['missed_ticks']))
@@ -0,0 +1,282 @@
+"""
+    Headless PyBullet batch simulation of joint trajectories for regression sweeps.
+"""
+
+import csv
+import time
+import argparse
+import pybullet as p
+import numpy as np
+from control.pybullet_ctrl import *
+from config import *
+
+
+def load_pybullet_trajectories(joints_file_name, platform_file_name):
+    """
+        Reads joint and platform trajectories generated for the PyBullet environment (240 Hz) into arrays.
+
+        :param joints_file_name: Name of joint trajectory csv file (2 header lines).
+        :type joints_file_name: str.
+        :param platform_file_name: Name of platform trajectory csv file (1 header line).
+        :type platform_file_name: str.
+        :return: Joint positions and platform positions (xyzrpy).
+        :rtype: ndarray (N, 16), ndarray (M, 6).
+    """
+    with open(joints_file_name) as f:
+        csv_reader = csv.reader(f)
+        for _ in range(2):
+            line = next(csv_reader, [''])
+            if line[0] == 'solo':
+                print("\n==============================================================")
+                print("ERROR: SEQUENCE WAS GENERATED FOR SOLO ENV (1000 HZ). EXITING!")
+                print("==============================================================\n")
+                exit(-1)
+        joint_positions = np.loadtxt(f, delimiter=',', ndmin=2)
+    platform_positions = np.loadtxt(platform_file_name, delimiter=',', skiprows=1, ndmin=2)
+    return joint_positions, platform_positions
+
+
+class PybulletBatchSimulationClass():
+
+    def __init__(self,
+        kp = 20,
+        kd = 0.2,
+        torque_saturation = 2,
+        pybullet_frequency = 240.0,
+    ):
+        """
+            Runs joint trajectories in a DIRECT (headless) physics client as fast as possible, with the same model and torque controller (PybulletTorqueControllerClass) as PybulletControlClass.
+            Joint states are read with one getJointStates call per step and the platform pose with one getBasePositionAndOrientation call per step. Constraint forces between legs and platform are recorded after each step. The joint states read by the controller after a step are recorded for the next step. Results are written into preallocated arrays.
+            The model is loaded once per client and its state is saved. Later runs with the same start pose restore the saved state, so repeated runs of a sequence give identical results without reloading the URDFs.
+
+            :param kp: Proportional gain.
+            :type kp: float.
+            :param kd: Derivative gain.
+            :type kd: float.
+            :param torque_saturation: Maximum absolute torque in Nm.
+            :type torque_saturation: float.
+            :param pybullet_frequency: Simulation frequency in Hz.
+            :type pybullet_frequency: float.
+        """
+        self.kp = kp
+        self.kd = kd
+        self.torque_saturation = torque_saturation
+        self.torque_constant = 0.18 # torque constant from documentation (Nm/A)
+        self.pybullet_frequency = pybullet_frequency
+
+        self.client_id = None
+        self.state_id = None # saved state of the freshly loaded model
+        self.loaded_platform_position = None
+        self.robot_id = None
+        self.platform_id = None
+        self.joint_indices = list(range(16))
+        self.motor_indices = [i for i in self.joint_indices if i not in [3, 7, 11, 15]] # without dummy joints
+        self.constraint_ids = []
+        self.torque_controller = None
+
+        self.curr_joint_pos = None
+        self.curr_platform_pos = None
+        self.curr_platform_orn = None
+        self.motor_currents = None
+        self.constraint_forces = None
+
+        self.n_steps = 0
+        self.sim_time = 0.0
+        self.wall_time = 0.0
+        self.load_time = 0.0
+
+
+    def load_model(self, platform_position):
+        """
+            Restores the saved state of the loaded model if the platform start pose is the same. Otherwise connects DIRECT physics client on first call or resets the simulation, loads model, and saves its state. Resetting bodies and joints of a loaded model leaves solver and contact state behind, restoring the saved state does not.
+
+            :param platform_position: Start pose of platform (xyzrpy).
+            :type platform_position: ndarray (6,).
+            :return: None.
+            :rtype: None.
+        """
+        platform_position = [float(x) for x in platform_position[:6]]
+        if self.state_id is not None and platform_position == self.loaded_platform_position:
+            p.restoreState(self.state_id)
+            p.stepSimulation() # applies and clears the torques commanded after the last step of the previous run, they are not part of the saved state
+            p.restoreState(self.state_id)
+            self.torque_controller = PybulletTorqueControllerClass(self.robot_id, 16, self.kp, self.kd, self.torque_saturation, self.torque_constant)
+            return
+
+        if self.client_id is None:
+            self.client_id = p.connect(p.DIRECT)
+        else:
+            p.resetSimulation()
+        p.setGravity(0,0,-9.81)
+        p.setTimeStep(1/self.pybullet_frequency)
+        self.robot_id, self.platform_id = load_pybullet_model(list(platform_position[:3]), list(platform_position[3:6]))
+        self.constraint_ids = [p.getConstraintUniqueId(i) for i in range(p.getNumConstraints())]
+        self.torque_controller = PybulletTorqueControllerClass(self.robot_id, 16, self.kp, self.kd, self.torque_saturation, self.torque_constant)
+        self.state_id = p.saveState()
+        self.loaded_platform_position = platform_position
+
+
+    def run(self, joint_positions, platform_positions):
+        """
+            Simulates one joint trajectory from the freshly loaded or restored model. Step i records the state before the step and applies the torque calculated from the state after it, like PybulletControlClass.start_motion.
+
+            :param joint_positions: Joint targets of each step.
+            :type joint_positions: ndarray (N, 16).
+            :param platform_positions: Platform trajectory (xyzrpy), the first row is the start pose.
+            :type platform_positions: ndarray (M, 6).
+            :return: Simulated seconds per wall second.
+            :rtype: float.
+        """
+        start_time = time.perf_counter()
+        joint_positions = np.asarray(joint_positions, dtype=float)
+        n_steps = len(joint_positions)
+        self.load_model(platform_positions[0])
+        self.load_time = time.perf_counter() - start_time
+
+        self.curr_joint_pos = np.empty((n_steps, 16))
+        self.curr_platform_pos = np.empty((n_steps, 3))
+        self.curr_platform_orn = np.empty((n_steps, 3))
+        self.torque_controller.allocate_history(n_steps)
+        self.motor_currents = self.torque_controller.current_history
+        self.constraint_forces = np.empty((n_steps, len(self.constraint_ids)))
+
+        get_base_pose = p.getBasePositionAndOrientation
+        get_euler = p.getEulerFromQuaternion
+        get_constraint_state = p.getConstraintState
+        step_simulation = p.stepSimulation
+        torque_controller = self.torque_controller
+
+        start_time = time.perf_counter()
+        torque_controller.read_joint_states()
+        for counter in range(n_steps):
+            platform_pos, platform_orn = get_base_pose(self.platform_id)
+            self.curr_platform_pos[counter] = platform_pos
+            self.curr_platform_orn[counter] = get_euler(platform_orn)
+            self.curr_joint_pos[counter] = torque_controller.joint_pos
+
+            step_simulation()
+            self.constraint_forces[counter] = [max(map(abs, get_constraint_state(cid))) for cid in self.constraint_ids]
+            torque_controller.update(joint_positions[counter])
+        self.wall_time = time.perf_counter() - start_time
+
+        self.n_steps = n_steps
+        self.sim_time = n_steps / self.pybullet_frequency
+        return self.get_realtime_factor()
+
+
+    def get_tracking_summary(self, platform_positions):
+        """
+            Returns tracking results of last run. Platform targets are paired with recorded poses by step, as in PybulletControlClass.store_data.
+            A constraint violation is a step in which the force of a constraint between leg and platform reaches its limit, so the leg can separate from the platform.
+
+            :param platform_positions: Platform trajectory (xyzrpy) of last run.
+            :type platform_positions: ndarray (M, 6).
+            :return: Mean squared deviation of platform position (m^2) and orientation (rad^2), peak absolute motor current (A), steps with saturated torque, steps with constraint violations, steps, realtime factor.
+            :rtype: dict.
+        """
+        n_steps = min(self.n_steps, len(platform_positions))
+        targets = np.asarray(platform_positions[:n_steps], dtype=float)
+        motor_currents = np.abs(self.motor_currents[:, self.motor_indices])
+        motor_torques = np.abs(self.torque_controller.torque_history[:, self.motor_indices])
+        return {
+            'msd_pos': float(np.mean((self.curr_platform_pos[:n_steps] - targets[:, :3])**2)),
+            'msd_orn': float(np.mean((self.curr_platform_orn[:n_steps] - targets[:, 3:6])**2)),
+            'peak_current': float(motor_currents.max()) if self.n_steps > 0 else 0.0,
+            'saturated_steps': int(np.count_nonzero((motor_torques >= self.torque_saturation).any(axis=1))),
+            'constraint_violations': int(np.count_nonzero((self.constraint_forces >= CONSTRAINT_MAX_FORCE * 0.999).any(axis=1))),
+            'steps': self.n_steps,
+            'realtime_factor': self.get_realtime_factor(),
+        }
+
+
+    def get_realtime_factor(self):
+        """
+            Returns simulated seconds per wall second of last run.
+
+            :return: Realtime factor.
+            :rtype: float.
+        """
+        return self.sim_time / self.wall_time if self.wall_time > 0 else float('inf')
+
+
+    def print_report(self):
+        """
+            Prints steps, simulated and wall time, and model load time of last run.
+
+            :return: None.
+            :rtype: None.
+        """
+        print("PyBullet batch: %d steps, %.2f s simulated in %.2f s wall time, %.1f simulated s per wall s (%.1f us per step), model load: %.2f s" % (
+            self.n_steps, self.sim_time, self.wall_time, self.get_realtime_factor(), self.wall_time / max(self.n_steps, 1) * 1e6, self.load_time))
+
+
+    def disconnect(self):
+        """
+            Disconnects physics client.
+
+            :return: None.
+            :rtype: None.
+        """
+        if self.client_id is not None:
+            p.disconnect(self.client_id)
+            self.client_id = None
+            self.state_id = None
+
+
+def check_repeatability(joint_positions, platform_positions):
+    """
+        Runs a sequence twice in the same client and checks that the second run gives the same results as the first.
+
+        :param joint_positions: Joint targets of each step.
+        :type joint_positions: ndarray (N, 16).
+        :param platform_positions: Platform trajectory (xyzrpy).
+        :type platform_positions: ndarray (M, 6).
+        :return: True if both runs are identical.
+        :rtype: Bool.
+    """
+    batch = PybulletBatchSimulationClass()
+    results = []
+    for _ in range(2):
+        batch.run(joint_positions, platform_positions)
+        batch.print_report()
+        results.append([batch.curr_joint_pos.copy(), batch.curr_platform_pos.copy(), batch.curr_platform_orn.copy(), batch.motor_currents.copy()])
+    batch.disconnect()
+
+    max_diffs = [float(np.abs(first - second).max()) for first, second in zip(*results)]
+    print("Run 2 vs run 1, max difference of joint positions: %g rad, platform position: %g m, platform orientation: %g rad, motor currents: %g A" % tuple(max_diffs))
+    return max(max_diffs) == 0.0
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Headless PyBullet batch simulation of the auto-generated trajectory.')
+    parser.add_argument('-j',
+                        '--joints-file',
+                        type=str,
+                        default=GLOBAL_AUTOGENERATED_DIRECTORY + TRAJ_JOINTS_FILE_NAME,
+                        help='Joint trajectory csv file')
+    parser.add_argument('-p',
+                        '--platform-file',
+                        type=str,
+                        default=GLOBAL_AUTOGENERATED_DIRECTORY + TRAJ_PLATFORM_FILE_NAME,
+                        help='Platform trajectory csv file')
+    parser.add_argument('-r',
+                        '--repeat',
+                        type=int,
+                        default=1,
+                        help='Number of runs')
+    parser.add_argument('-c',
+                        '--check',
+                        action='store_true',
+                        help='Check that a second run in the same client equals the first')
+    args = parser.parse_args()
+
+    joint_positions, platform_positions = load_pybullet_trajectories(args.joints_file, args.platform_file)
+    if args.check:
+        exit(0 if check_repeatability(joint_positions, platform_positions) else -1)
+    batch = PybulletBatchSimulationClass()
+    for _ in range(args.repeat):
+        batch.run(joint_positions, platform_positions)
+        batch.print_report()
+    print(batch.get_tracking_summary(platform_positions))
+    batch.disconnect()
@@ -4,9 +4,92 @@ import pybullet_data
 import numpy as np
 import math
 import csv
+import shutil
 from matplotlib import pyplot as plt
+from control.pybullet_torque_ctrl import *
 from config import *
 
+CONSTRAINT_MAX_FORCE = 20. # maximum force of constraints between legs and platform
+
+
+def load_pybullet_model(platform_position, platform_orientation):
+    """
+        Loads plane, robot, and platform URDFs into the connected physics client, initializes motors, adjusts collision, and adds constraints between legs and platform.
+
+        :param platform_position: Start position of platform (x, y, z).
+        :type platform_position: list[float].
+        :param platform_orientation: Start orientation of platform (roll, pitch, yaw).
+        :type platform_orientation: list[float].
+        :return: Robot id and platform id.
+        :rtype: int, int.
+    """
+    # load plane URDF model
+    p.setAdditionalSearchPath(pybullet_data.getDataPath())
+    p.loadURDF("plane.urdf")
+
+    # load robot URDF model
+    URDF_home_position = [0,0,0]
+    URDF_home_orientation = p.getQuaternionFromEuler([0,0,0])
+    robot_id = p.loadURDF("../resources/URDF/URDF_motion_simulator_simplified_dummy/urdf/URDF_motion_simulator_simplified_dummy.urdf",
+                        URDF_home_position, 
+                        URDF_home_orientation, 
+                        useFixedBase = 1)
+    p.changeVisualShape(objectUniqueId=robot_id, linkIndex=2, rgbaColor=[0.48235294, 0.19607843, 0.58039216, 0.8])
+    p.changeVisualShape(objectUniqueId=robot_id, linkIndex=6, rgbaColor=[0.76078431, 0.64705882, 0.81176471, 0.8])
+    p.changeVisualShape(objectUniqueId=robot_id, linkIndex=10, rgbaColor=[0.65098039, 0.85882353, 0.62745098, 0.8])
+    p.changeVisualShape(objectUniqueId=robot_id, linkIndex=14,rgbaColor=[0.        , 0.53333333, 0.21568627, 0.8])
+
+    # initialize motors
+    p.setJointMotorControlArray(bodyUniqueId=robot_id, jointIndices=list(range(16)), controlMode=p.VELOCITY_CONTROL, forces=np.zeros(16))
+
+    # load platform URDF model
+    URDF_home_position = platform_position
+    URDF_home_orientation = p.getQuaternionFromEuler(platform_orientation)
+    platform_id = p.loadURDF("../resources/URDF/URDF_sensor_platform_simplified/urdf/URDF_sensor_platform_simplified.urdf",
+                        URDF_home_position, 
+                        URDF_home_orientation, 
+                        useFixedBase = 0)
+
+    # disable collision for dummy joints
+    dummy_joints = [3, 7, 11, 15]
+    for i in dummy_joints:
+        p.setCollisionFilterPair(robot_id, platform_id, i, -1, False) # disable collision
+
+    # Set contraints between legs and platform
+    joint_pos_leg = np.array([-1.1, 0, -93.07])/1000 # relative Position of new Joint to COM of link
+    joint_pos_platform = np.array([181.65, 118.89, 6.73])/1000   # relative Position of ball joint to origin
+    offset_com_platform = np.array([-6.23, 1.26, -4.63])/1000 # offset center of mass to origin of the platform
+    joint_indices = [2, 6, 10, 14] # Indices of the lower legs (FL, FR, HL, HR)
+    
+    for i in joint_indices:
+        p.setCollisionFilterPair(robot_id, platform_id, i, -1, False) # disable collision
+        newjoint_pos_leg = joint_pos_leg # Position of new joint
+
+        if i == joint_indices[0]: # front left
+            newjoint_pos_platform = joint_pos_platform + offset_com_platform
+        elif i == joint_indices[1]: # front right
+            newjoint_pos_platform = joint_pos_platform * np.array([1, -1, 1]) + offset_com_platform
+        elif i == joint_indices[2]: # back left
+            newjoint_pos_platform = joint_pos_platform * np.array([-1, 1, 1]) + offset_com_platform
+        elif i == joint_indices[3]: # back right
+            newjoint_pos_platform = joint_pos_platform * np.array([-1, -1, 1]) + offset_com_platform
+
+        cid = p.createConstraint(
+        robot_id,                # Parent body unique ID
+        i,                      # Parent link index
+        platform_id,             # Child body unique ID
+        -1,                     # Child link index (-1 for base)
+        p.JOINT_POINT2POINT,    # Joint type
+        [0,0,0],                # Joint axis in child link frame
+        newjoint_pos_leg,         # Position of the joint frame relative to parent center of mass frame.
+        newjoint_pos_platform,    # Position of the joint frame relative to a given child center of mass frame 
+        )
+
+        p.changeConstraint(cid, maxForce = CONSTRAINT_MAX_FORCE)     # Set maxForce of constraint
+
+    return robot_id, platform_id
+
+
 class PybulletControlClass():
 
     def __init__(self, 
@@ -27,6 +110,7 @@ class PybulletControlClass():
         self.robot_id = None
         self.platform_id = None
         self.dummy_joints = []
+        self.torque_controller = None
 
         self.joint_targets = None
         self.curr_platform_pos = []
@@ -58,72 +142,11 @@ class PybulletControlClass():
         p.setGravity(0,0,-9.81)
         p.resetDebugVisualizerCamera(cameraDistance=1, cameraYaw=50, cameraPitch=-35, cameraTargetPosition=[0,0,0])
         p.configureDebugVisualizer(p.COV_ENABLE_GUI,0) # faster visualization by disabling OpenGL3
-        
-        # load plane URDF model
-        p.setAdditionalSearchPath(pybullet_data.getDataPath())
-        p.loadURDF("plane.urdf")
-
         p.setTimeStep(1/self.pybullet_frequency)
 
-        # load robot URDF model
-        URDF_home_position = [0,0,0]
-        URDF_home_orientation = p.getQuaternionFromEuler([0,0,0])
-        self.robot_id = p.loadURDF("../resources/URDF/URDF_motion_simulator_simplified_dummy/urdf/URDF_motion_simulator_simplified_dummy.urdf",
-                            URDF_home_position, 
-                            URDF_home_orientation, 
-                            useFixedBase = 1)
-        p.changeVisualShape(objectUniqueId=self.robot_id, linkIndex=2, rgbaColor=[0.48235294, 0.19607843, 0.58039216, 0.8])
-        p.changeVisualShape(objectUniqueId=self.robot_id, linkIndex=6, rgbaColor=[0.76078431, 0.64705882, 0.81176471, 0.8])
-        p.changeVisualShape(objectUniqueId=self.robot_id, linkIndex=10, rgbaColor=[0.65098039, 0.85882353, 0.62745098, 0.8])
-        p.changeVisualShape(objectUniqueId=self.robot_id, linkIndex=14,rgbaColor=[0.        , 0.53333333, 0.21568627, 0.8])
-
-        # initialize motors
-        p.setJointMotorControlArray(bodyUniqueId=self.robot_id, jointIndices=list(range(16)), controlMode=p.VELOCITY_CONTROL, forces=np.zeros(16))
-
-        # load platform URDF model
-        URDF_home_position = self.platform_positions[0][:3]
-        URDF_home_orientation = p.getQuaternionFromEuler(self.platform_positions[0][3:])
-        self.platform_id = p.loadURDF("../resources/URDF/URDF_sensor_platform_simplified/urdf/URDF_sensor_platform_simplified.urdf",
-                            URDF_home_position, 
-                            URDF_home_orientation, 
-                            useFixedBase = 0)
-
-        # disable collision for dummy joints
+        self.robot_id, self.platform_id = load_pybullet_model(self.platform_positions[0][:3], self.platform_positions[0][3:])
         self.dummy_joints = [3, 7, 11, 15]
-        for i in self.dummy_joints:
-            p.setCollisionFilterPair(self.robot_id, self.platform_id, i, -1, False) # disable collision
-
-        # Set contraints between legs and platform
-        joint_pos_leg = np.array([-1.1, 0, -93.07])/1000 # relative Position of new Joint to COM of link
-        joint_pos_platform = np.array([181.65, 118.89, 6.73])/1000   # relative Position of ball joint to origin
-        offset_com_platform = np.array([-6.23, 1.26, -4.63])/1000 # offset center of mass to origin of the platform
-        joint_indices = [2, 6, 10, 14] # Indices of the lower legs (FL, FR, HL, HR)
-        
-        for i in joint_indices:
-            p.setCollisionFilterPair(self.robot_id, self.platform_id, i, -1, False) # disable collision
-            newjoint_pos_leg = joint_pos_leg # Position of new joint
-
-            if i == joint_indices[0]: # front left
-                newjoint_pos_platform = joint_pos_platform + offset_com_platform
-            elif i == joint_indices[1]: # front right
-                newjoint_pos_platform = joint_pos_platform * np.array([1, -1, 1]) + offset_com_platform
-            elif i == joint_indices[2]: # back left
-                newjoint_pos_platform = joint_pos_platform * np.array([-1, 1, 1]) + offset_com_platform
-            elif i == joint_indices[3]: # back right
-                newjoint_pos_platform = joint_pos_platform * np.array([-1, -1, 1]) + offset_com_platform
-
-            cid = p.createConstraint(
-            self.robot_id,                # Parent body unique ID
-            i,                      # Parent link index
-            self.platform_id,             # Child body unique ID
-            -1,                     # Child link index (-1 for base)
-            p.JOINT_POINT2POINT,    # Joint type
-            [0,0,0],                # Joint axis in child link frame
-            newjoint_pos_leg,         # Position of the joint frame relative to parent center of mass frame.
-            newjoint_pos_platform,    # Position of the joint frame relative to a given child center of mass frame 
-            )
-
-            p.changeConstraint(cid, maxForce = 20.)     # Set maxForce of constraint
+        self.torque_controller = PybulletTorqueControllerClass(self.robot_id, 16, self.kp, self.kd, self.torque_saturation, self.torque_constant)
 
 
     def start_motion(self):
@@ -133,18 +156,24 @@ class PybulletControlClass():
             :return: None.
             :rtype: None.
         """
+        n_steps = len(self.joint_positions)
+        self.curr_platform_pos = np.zeros((n_steps, 3))
+        self.curr_platform_orn = np.zeros((n_steps, 3))
+        self.curr_joint_pos = np.zeros((n_steps, 16))
+        self.torque_controller.allocate_history(n_steps)
+        self.motor_currents = self.torque_controller.current_history
+
         counter = 0
         last_time = 0
-        while counter < len(self.joint_positions):
+        self.torque_controller.read_joint_states()
+        while counter < n_steps:
             if (time.process_time() - last_time > 1./self.pybullet_frequency) or not self.render_gui:
                 self.joint_targets = self.joint_positions[counter]
                 # save current platform position
-                self.curr_platform_pos.append(p.getBasePositionAndOrientation(self.platform_id)[0])
-                self.curr_platform_orn.append(p.getEulerFromQuaternion(p.getBasePositionAndOrientation(self.platform_id)[1]))
-                temp = []
-                for i in range(16):
-                    temp.append(p.getJointState(self.robot_id, i)[0])
-                self.curr_joint_pos.append(temp)
+                platform_pos, platform_orn = p.getBasePositionAndOrientation(self.platform_id)
+                self.curr_platform_pos[counter] = platform_pos
+                self.curr_platform_orn[counter] = p.getEulerFromQuaternion(platform_orn)
+                self.curr_joint_pos[counter] = self.torque_controller.joint_pos # joint states read by controller after last step
 
                 last_time = time.process_time()
                 
@@ -157,40 +186,12 @@ class PybulletControlClass():
 
     def controller(self):
         """
-            PyBullet KD torque controller. 
+            PyBullet KD torque controller. Reads joint states after the step and applies saturated torque, current is recorded in motor_currents.
 
             :return: None.
             :rtype: None.
         """
-        velocity_target = 0
-        torque = []
-        current = []
-        for i in range(len(self.joint_targets)):
-            # get joints positions
-            joint_state = p.getJointState(self.robot_id, i)
-            joint_pos = joint_state[0]
-            joint_vel = joint_state[1]
-
-            # calculate error
-            pos_err = self.joint_targets[i] - joint_pos
-            vel_err = velocity_target - joint_vel
-
-            # calculate torque
-            torque.append(pos_err * self.kp + vel_err * self.kd)
-            # calculate current from torque
-            current.append(torque[-1] / self.torque_constant)
-            # saturation
-            if torque[-1] > self.torque_saturation:
-                torque[-1] = self.torque_saturation
-            elif torque[-1] < -self.torque_saturation:
-                torque[-1] = -self.torque_saturation
-
-        self.motor_currents.append(current)
-        
-        p.setJointMotorControlArray(bodyUniqueId=self.robot_id, 
-                                    jointIndices=list(range(len(self.joint_targets))), 
-                                    controlMode=p.TORQUE_CONTROL, 
-                                    forces=torque)
+        self.torque_controller.update(self.joint_targets)
 
 
     def read_from_csv(self, path, header = False, num_headers=1):
@@ -233,15 +234,11 @@ class PybulletControlClass():
 
     def store_data(self):
         """
-            Stores PyBullet simulation data in csv file. 
+            Stores PyBullet simulation data in csv file. The rows are assembled column-wise into one (N, 61) array and written in one call, the history file is a copy of the output file.
 
             :return: None.
             :rtype: None.
         """
-        f = open(GLOBAL_OUTPUT_DIRECTORY + PYBULLET_DATA_OUTPUT_FILE_NAME, 'w')
-        f_c = open(GLOBAL_OUTPUT_DIRECTORY + HISTORY_DIR + PYBULLET_DATA_OUTPUT_FILE_UNIQUE, 'w')
-        writer = csv.writer(f)
-        writer_c = csv.writer(f_c)
         header = ['counter[0]', 
                     'current_joint_pos[1-16]', 
                     'target_joint_pos[17-32]', 
@@ -250,8 +247,6 @@ class PybulletControlClass():
                     'target_platform_pos[52-54]',
                     'current_platform_orn[55-57]', 
                     'target_platform_orn[58-60]']
-        writer.writerow(header)
-        writer_c.writerow(header)
 
         self.curr_joint_pos = np.array(self.curr_joint_pos)
         self.joint_positions = np.array(self.joint_positions)
@@ -260,28 +255,20 @@ class PybulletControlClass():
         self.curr_platform_pos = np.array(self.curr_platform_pos)
         self.curr_platform_orn = np.array(self.curr_platform_orn)
 
-        for i in range(len(self.joint_positions)):
-            row = []
-            row.append(i)
-            for e in self.curr_joint_pos[i, :]:
-                row.append(e)
-            for e in self.joint_positions[i, :]:
-                row.append(e)
-            for e in self.motor_currents[i, :]:
-                row.append(e)
-            for e in self.curr_platform_pos[i, :]:
-                row.append(e)
-            for e in self.platform_positions[i, :3]:
-                row.append(e)
-            for e in self.curr_platform_orn[i, :]:
-                row.append(e)
-            for e in self.platform_positions[i, 3:]:
-                row.append(e)
-            writer.writerow(row)
-            writer_c.writerow(row)
-
-        f.close()
-        f_c.close()
+        n_rows = len(self.joint_positions)
+        data = np.hstack([
+            np.arange(n_rows).reshape(-1, 1),
+            self.curr_joint_pos[:n_rows],
+            self.joint_positions,
+            self.motor_currents[:n_rows],
+            self.curr_platform_pos[:n_rows],
+            self.platform_positions[:n_rows, :3],
+            self.curr_platform_orn[:n_rows],
+            self.platform_positions[:n_rows, 3:],
+        ])
+        # %.17g keeps every float64 exact when read back
+        np.savetxt(GLOBAL_OUTPUT_DIRECTORY + PYBULLET_DATA_OUTPUT_FILE_NAME, data, fmt=['%d'] + ['%.17g'] * (data.shape[1] - 1), delimiter=',', header=','.join(header), comments='')
+        shutil.copyfile(GLOBAL_OUTPUT_DIRECTORY + PYBULLET_DATA_OUTPUT_FILE_NAME, GLOBAL_OUTPUT_DIRECTORY + HISTORY_DIR + PYBULLET_DATA_OUTPUT_FILE_UNIQUE)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,166 @@
+"""
+    Parallel PyBullet simulation of many sequences, one headless physics client per worker process.
+"""
+
+import os
+import csv
+import time
+import argparse
+import multiprocessing
+from control.pybullet_batch import *
+from config import *
+
+SUMMARY_COLUMNS = ['sequence', 'steps', 'msd_pos', 'msd_orn', 'peak_current', 'saturated_steps', 'constraint_violations', 'realtime_factor']
+
+worker_simulation = None # batch simulation of worker process, its client is connected and the model is loaded by the first sequence
+
+
+def init_worker(kp, kd, torque_saturation):
+    """
+        Creates batch simulation of worker process.
+
+        :param kp: Proportional gain.
+        :type kp: float.
+        :param kd: Derivative gain.
+        :type kd: float.
+        :param torque_saturation: Maximum absolute torque in Nm.
+        :type torque_saturation: float.
+        :return: None.
+        :rtype: None.
+    """
+    global worker_simulation
+    worker_simulation = PybulletBatchSimulationClass(kp=kp, kd=kd, torque_saturation=torque_saturation)
+
+
+def simulate_sequence(sequence):
+    """
+        Simulates one sequence in the physics client of the worker process, starting from the saved state of the loaded model. Trajectories are read by the worker, so only file names and the summary are sent between processes.
+
+        :param sequence: Name, joint trajectory csv file, and platform trajectory csv file.
+        :type sequence: tuple(str, str, str).
+        :return: Tracking summary of sequence.
+        :rtype: dict.
+    """
+    name, joints_file_name, platform_file_name = sequence
+    joint_positions, platform_positions = load_pybullet_trajectories(joints_file_name, platform_file_name)
+    worker_simulation.run(joint_positions, platform_positions)
+    summary = worker_simulation.get_tracking_summary(platform_positions)
+    summary['sequence'] = name
+    summary['wall_time'] = worker_simulation.wall_time
+    summary['sim_time'] = worker_simulation.sim_time
+    summary['load_time'] = worker_simulation.load_time
+    return summary
+
+
+class PybulletFarmClass():
+
+    def __init__(self,
+        n_workers = None,
+        kp = 20,
+        kd = 0.2,
+        torque_saturation = 2,
+    ):
+        """
+            Fans out sequences to a pool of worker processes. Each worker connects its own DIRECT physics client, loads the model once (about 0.7 s) and saves its state. Every later sequence restores the saved state, so the summary of a sequence does not depend on the worker that ran it or on what that worker ran before. The model is only reloaded for a sequence with another platform start pose, because the constraints between legs and platform are created at the start pose.
+            Throughput is measured and printed by print_summary, compare runs with different n_workers to see how it scales on a machine.
+
+            :param n_workers: Number of worker processes, None for number of CPUs.
+            :type n_workers: int or None.
+            :param kp: Proportional gain.
+            :type kp: float.
+            :param kd: Derivative gain.
+            :type kd: float.
+            :param torque_saturation: Maximum absolute torque in Nm.
+            :type torque_saturation: float.
+        """
+        self.n_workers = n_workers if n_workers is not None else (os.cpu_count() or 1)
+        self.kp = kp
+        self.kd = kd
+        self.torque_saturation = torque_saturation
+
+        self.summaries = []
+        self.n_pool_workers = 0
+        self.wall_time = 0.0
+
+
+    def run(self, sequences):
+        """
+            Simulates all sequences and collects their tracking summaries in the order of the sequences.
+
+            :param sequences: Name, joint trajectory csv file, and platform trajectory csv file of each sequence.
+            :type sequences: list[tuple(str, str, str)].
+            :return: Tracking summaries.
+            :rtype: list[dict].
+        """
+        start_time = time.perf_counter()
+        self.n_pool_workers = max(1, min(self.n_workers, len(sequences)))
+        with multiprocessing.Pool(self.n_pool_workers, initializer=init_worker, initargs=(self.kp, self.kd, self.torque_saturation)) as pool:
+            self.summaries = pool.map(simulate_sequence, sequences, chunksize=1)
+        self.wall_time = time.perf_counter() - start_time
+        return self.summaries
+
+
+    def print_summary(self):
+        """
+            Prints summary table of all sequences and farm throughput.
+
+            :return: None.
+            :rtype: None.
+        """
+        print("%-24s %8s %12s %12s %10s %10s %11s %9s" % ('sequence', 'steps', 'msd_pos', 'msd_orn', 'peak A', 'saturated', 'violations', 'sim/wall'))
+        for summary in self.summaries:
+            print("%-24s %8d %12.4e %12.4e %10.2f %10d %11d %9.1f" % (
+                summary['sequence'][-24:], summary['steps'], summary['msd_pos'], summary['msd_orn'], summary['peak_current'],
+                summary['saturated_steps'], summary['constraint_violations'], summary['realtime_factor']))
+
+        sim_time = sum(summary['sim_time'] for summary in self.summaries)
+        load_time = sum(summary['load_time'] for summary in self.summaries)
+        if self.wall_time > 0:
+            print("Farm: %d sequences on %d workers, %.2f s simulated in %.2f s wall time (model loads: %.2f s), %.1f simulated s per wall s" % (
+                len(self.summaries), self.n_pool_workers, sim_time, self.wall_time, load_time, sim_time / self.wall_time))
+
+
+    def save_summary(self, file_name = GLOBAL_OUTPUT_DIRECTORY + PYBULLET_FARM_SUMMARY_FILE_NAME):
+        """
+            Stores summary table in csv file.
+
+            :param file_name: Name of csv file.
+            :type file_name: str.
+            :return: None.
+            :rtype: None.
+        """
+        with open(file_name, 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(SUMMARY_COLUMNS)
+            for summary in self.summaries:
+                writer.writerow([summary[column] for column in SUMMARY_COLUMNS])
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Simulate sequences in parallel headless PyBullet clients and summarize tracking results.')
+    parser.add_argument('-s',
+                        '--sequence',
+                        nargs=2,
+                        action='append',
+                        metavar=('JOINTS_FILE', 'PLATFORM_FILE'),
+                        help='Joint and platform trajectory csv files of a sequence (repeatable), default: auto-generated trajectory')
+    parser.add_argument('-w',
+                        '--workers',
+                        type=int,
+                        default=None,
+                        help='Number of worker processes, default: number of CPUs')
+    parser.add_argument('-o',
+                        '--output-file',
+                        type=str,
+                        default=GLOBAL_OUTPUT_DIRECTORY + PYBULLET_FARM_SUMMARY_FILE_NAME,
+                        help='Summary csv file')
+    args = parser.parse_args()
+
+    files = args.sequence or [(GLOBAL_AUTOGENERATED_DIRECTORY + TRAJ_JOINTS_FILE_NAME, GLOBAL_AUTOGENERATED_DIRECTORY + TRAJ_PLATFORM_FILE_NAME)]
+    sequences = [(os.path.basename(joints_file_name)[:-4], joints_file_name, platform_file_name) for joints_file_name, platform_file_name in files]
+
+    farm = PybulletFarmClass(n_workers=args.workers)
+    farm.run(sequences)
+    farm.print_summary()
+    farm.save_summary(args.output_file)
@@ -0,0 +1,108 @@
+"""
+    Vectorized KD torque controller for PyBullet joints, shared by simulation control and inverse kinematics.
+"""
+
+import pybullet as p
+import numpy as np
+
+
+class PybulletTorqueControllerClass():
+
+    def __init__(self,
+        robot_id,
+        n_joints = 16,
+        kp = 20,
+        kd = 0.2,
+        torque_saturation = 2,
+        torque_constant = 0.18,
+    ):
+        """
+            KD torque controller with zero velocity target on all joints of a robot. Joint states are read with one getJointStates call into preallocated arrays, torque is calculated and saturated with array operations.
+            Current is calculated from the saturated torque, i.e. the torque that is applied. If a history is allocated, applied torque and current of each update are recorded in it.
+
+            :param robot_id: PyBullet id of robot.
+            :type robot_id: int.
+            :param n_joints: Number of controlled joints (joint indices 0 to n_joints - 1).
+            :type n_joints: int.
+            :param kp: Proportional gain.
+            :type kp: float.
+            :param kd: Derivative gain.
+            :type kd: float.
+            :param torque_saturation: Maximum absolute torque in Nm.
+            :type torque_saturation: float.
+            :param torque_constant: Torque constant in Nm/A.
+            :type torque_constant: float.
+        """
+        self.robot_id = robot_id
+        self.joint_indices = list(range(n_joints))
+        self.kp = kp
+        self.kd = kd
+        self.torque_saturation = torque_saturation
+        self.torque_constant = torque_constant
+
+        self.joint_pos = np.zeros(n_joints)
+        self.joint_vel = np.zeros(n_joints)
+        self.torque = np.zeros(n_joints)
+        self.vel_torque = np.zeros(n_joints)
+
+        self.torque_history = None
+        self.current_history = None
+        self.n_records = 0
+
+
+    def allocate_history(self, n_records):
+        """
+            Allocates history buffers for torque and current and starts recording at the first row.
+
+            :param n_records: Number of updates to record.
+            :type n_records: int.
+            :return: None.
+            :rtype: None.
+        """
+        self.torque_history = np.zeros((n_records, len(self.joint_indices)))
+        self.current_history = np.zeros((n_records, len(self.joint_indices)))
+        self.n_records = 0
+
+
+    def read_joint_states(self):
+        """
+            Reads positions and velocities of all controlled joints with one call.
+
+            :return: None.
+            :rtype: None.
+        """
+        joint_states = p.getJointStates(self.robot_id, self.joint_indices)
+        self.joint_pos[:] = [joint_state[0] for joint_state in joint_states]
+        self.joint_vel[:] = [joint_state[1] for joint_state in joint_states]
+
+
+    def update(self, joint_targets, read_states = True):
+        """
+            Calculates saturated torque for joint targets, records it if a history is allocated, and applies it.
+
+            :param joint_targets: Joint targets.
+            :type joint_targets: ndarray or list[float] (n_joints,).
+            :param read_states: Read joint states before calculation, False if they were read after the last step already.
+            :type read_states: Bool.
+            :return: Applied torque.
+            :rtype: ndarray (n_joints,).
+        """
+        if read_states:
+            self.read_joint_states()
+
+        np.subtract(joint_targets, self.joint_pos, out=self.torque)
+        self.torque *= self.kp
+        np.multiply(self.joint_vel, self.kd, out=self.vel_torque)
+        self.torque -= self.vel_torque # velocity target is 0
+        np.clip(self.torque, -self.torque_saturation, self.torque_saturation, out=self.torque)
+
+        if self.torque_history is not None and self.n_records < len(self.torque_history):
+            self.torque_history[self.n_records] = self.torque
+            np.divide(self.torque, self.torque_constant, out=self.current_history[self.n_records])
+            self.n_records += 1
+
+        p.setJointMotorControlArray(bodyUniqueId=self.robot_id,
+                                    jointIndices=self.joint_indices,
+                                    controlMode=p.TORQUE_CONTROL,
+                                    forces=self.torque)
+        return self.torque
@@ -0,0 +1,327 @@
+"""
+    Opt-in real-time process setup for control loops: CPU pinning, SCHED_FIFO, memory locking, and garbage collector control.
+"""
+
+import os
+import gc
+import time
+import errno
+import ctypes
+import ctypes.util
+import argparse
+import numpy as np
+from control.periodic_scheduler import *
+
+MCL_CURRENT = 1 # mlockall flags (Linux)
+MCL_FUTURE = 2
+MCL_ONFAULT = 4 # lock pages when they are faulted in instead of populating all mappings (Linux >= 4.4)
+ISOLATED_CPUS_FILE = '/sys/devices/system/cpu/isolated'
+
+normal_cpus = None # CPUs for helper threads, saved by RealtimeProfileClass.apply before the control thread is pinned
+
+
+def parse_cpu_list(cpu_list):
+    """
+        Parses kernel cpu list format, e.g. '2-3,6'.
+
+        :param cpu_list: Cpu list.
+        :type cpu_list: str.
+        :return: CPU ids.
+        :rtype: list[int].
+    """
+    cpus = []
+    for part in cpu_list.strip().split(','):
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def get_isolated_cpus():
+    """
+        Returns CPUs isolated from the scheduler with the isolcpus kernel parameter.
+
+        :return: CPU ids, empty if there are no isolated CPUs.
+        :rtype: list[int].
+    """
+    try:
+        with open(ISOLATED_CPUS_FILE) as f:
+            return parse_cpu_list(f.read())
+    except OSError:
+        return []
+
+
+def set_thread_normal_priority():
+    """
+        Moves calling thread back to the normal (SCHED_OTHER) scheduling policy and to the CPUs the process had before the control thread was pinned. Called by helper threads, which otherwise inherit SCHED_FIFO and the CPUs of the control thread and would run on its CPU.
+
+        :return: None.
+        :rtype: None.
+    """
+    try:
+        if os.sched_getscheduler(0) != os.SCHED_OTHER:
+            os.sched_setscheduler(0, os.SCHED_OTHER, os.sched_param(0)) # pid 0 is the calling thread
+    except (AttributeError, OSError):
+        pass
+    if normal_cpus is not None:
+        try:
+            os.sched_setaffinity(0, normal_cpus)
+        except (AttributeError, OSError, ValueError):
+            pass
+
+
+def measure_jitter(period = 0.001, n_ticks = 500):
+    """
+        Runs an empty periodic loop and measures wake up jitter.
+
+        :param period: Loop period in seconds.
+        :type period: float.
+        :param n_ticks: Number of ticks.
+        :type n_ticks: int.
+        :return: Mean, 99th percentile, and max jitter in micro-seconds, number of overruns.
+        :rtype: dict.
+    """
+    scheduler = PeriodicSchedulerClass(period, name='jitter')
+    scheduler.start()
+    jitter_us = np.array([scheduler.wait() for _ in range(n_ticks)]) / 1000
+    return {
+        'mean_us': float(jitter_us.mean()),
+        'p99_us': float(np.percentile(jitter_us, 99)),
+        'max_us': float(jitter_us.max()),
+        'overruns': scheduler.n_overruns,
+    }
+
+
+class RealtimeProfileClass():
+
+    def __init__(self,
+        enabled = False,
+        cpus = None,
+        priority = 80,
+        lock_memory = True,
+        control_gc = True,
+        period = 0.001,
+        n_jitter_ticks = 500,
+        name = 'realtime',
+    ):
+        """
+            Real-time profile for the control thread. apply() pins the calling thread to CPUs, requests SCHED_FIFO, and locks process memory. Each setting may be denied (e.g. without root), what was actually granted is recorded and reported with the wake up jitter measured before and after.
+            The garbage collector is controlled by the lifecycle: collect() between phases, disable_gc() for the time critical phase, enable_gc() after it.
+            If the profile is not enabled, all methods do nothing.
+
+            :param enabled: Apply the profile.
+            :type enabled: Bool.
+            :param cpus: CPUs for the control thread, None for the isolated CPUs of the kernel (not pinned if there are none).
+            :type cpus: list[int] or None.
+            :param priority: SCHED_FIFO priority (1-99).
+            :type priority: int.
+            :param lock_memory: Lock process memory with mlockall.
+            :type lock_memory: Bool.
+            :param control_gc: Freeze and disable the garbage collector during the time critical phase.
+            :type control_gc: Bool.
+            :param period: Control loop period in seconds, used for jitter measurement.
+            :type period: float.
+            :param n_jitter_ticks: Number of ticks of each jitter measurement, 0 to skip.
+            :type n_jitter_ticks: int.
+            :param name: Name used in the report.
+            :type name: str.
+        """
+        self.enabled = enabled
+        self.cpus = cpus
+        self.priority = priority
+        self.lock_memory = lock_memory
+        self.control_gc = control_gc
+        self.period = period
+        self.n_jitter_ticks = n_jitter_ticks
+        self.name = name
+
+        self.settings = [] # (setting, granted, detail)
+        self.jitter_before = None
+        self.jitter_after = None
+        self.gc_disabled = False
+        self.n_collections = 0
+        self.max_collection_time = 0.0
+
+
+    def apply(self):
+        """
+            Applies profile to the calling thread and process and prints report.
+
+            :return: None.
+            :rtype: None.
+        """
+        if not self.enabled:
+            return
+        if self.n_jitter_ticks > 0:
+            self.jitter_before = measure_jitter(self.period, self.n_jitter_ticks)
+
+        global normal_cpus
+        try:
+            normal_cpus = os.sched_getaffinity(0) # before pinning, for helper threads
+        except AttributeError:
+            normal_cpus = None
+        self.set_affinity()
+        self.set_scheduler()
+        if self.lock_memory:
+            self.lock_process_memory()
+        if self.control_gc:
+            self.collect()
+            gc.freeze() # objects created at startup are never scanned again
+            self.settings.append(('gc', True, 'startup objects frozen, collection between phases'))
+
+        if self.n_jitter_ticks > 0:
+            self.jitter_after = measure_jitter(self.period, self.n_jitter_ticks)
+        self.print_report()
+
+
+    def set_affinity(self):
+        """
+            Pins calling thread to CPUs. Helper threads started later are moved to the other CPUs of the process by set_thread_normal_priority.
+
+            :return: None.
+            :rtype: None.
+        """
+        cpus = self.cpus if self.cpus is not None else get_isolated_cpus()
+        if not cpus:
+            self.settings.append(('cpu affinity', False, 'no isolated CPUs (isolcpus), not pinned'))
+            return
+        global normal_cpus
+        try:
+            os.sched_setaffinity(0, cpus)
+            self.settings.append(('cpu affinity', True, 'CPUs ' + str(sorted(os.sched_getaffinity(0)))))
+            if normal_cpus is not None and normal_cpus - set(cpus):
+                normal_cpus = normal_cpus - set(cpus) # helper threads stay off the CPUs of the control thread
+                self.settings.append(('helper cpus', True, 'CPUs ' + str(sorted(normal_cpus))))
+        except (AttributeError, OSError, ValueError) as e:
+            self.settings.append(('cpu affinity', False, str(e)))
+
+
+    def set_scheduler(self):
+        """
+            Requests SCHED_FIFO for calling thread.
+
+            :return: None.
+            :rtype: None.
+        """
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.priority))
+            granted = os.sched_getscheduler(0) == os.SCHED_FIFO
+            self.settings.append(('SCHED_FIFO', granted, 'priority ' + str(os.sched_getparam(0).sched_priority)))
+        except (AttributeError, OSError) as e:
+            self.settings.append(('SCHED_FIFO', False, str(e)))
+
+
+    def lock_process_memory(self):
+        """
+            Locks current and future process memory with mlockall. Uses MCL_ONFAULT if available, so memory-mapped files (trajectory cache) are only locked where they are read.
+
+            :return: None.
+            :rtype: None.
+        """
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        except OSError as e:
+            self.settings.append(('mlockall', False, str(e)))
+            return
+        flags = MCL_CURRENT | MCL_FUTURE | MCL_ONFAULT
+        result = libc.mlockall(flags)
+        if result != 0 and ctypes.get_errno() == errno.EINVAL: # kernel without MCL_ONFAULT
+            flags = MCL_CURRENT | MCL_FUTURE
+            result = libc.mlockall(flags)
+        if result != 0:
+            self.settings.append(('mlockall', False, os.strerror(ctypes.get_errno())))
+        else:
+            self.settings.append(('mlockall', True, 'MCL_CURRENT | MCL_FUTURE' + (' | MCL_ONFAULT' if flags & MCL_ONFAULT else '')))
+
+
+    def collect(self):
+        """
+            Runs a full garbage collection. Called between lifecycle phases, where a longer tick does no harm.
+
+            :return: None.
+            :rtype: None.
+        """
+        if not (self.enabled and self.control_gc):
+            return
+        start_time = time.perf_counter()
+        gc.collect()
+        self.n_collections += 1
+        self.max_collection_time = max(self.max_collection_time, time.perf_counter() - start_time)
+
+
+    def disable_gc(self):
+        """
+            Disables garbage collector for the time critical phase.
+
+            :return: None.
+            :rtype: None.
+        """
+        if not (self.enabled and self.control_gc):
+            return
+        gc.freeze()
+        gc.disable()
+        self.gc_disabled = True
+
+
+    def enable_gc(self):
+        """
+            Enables garbage collector after the time critical phase.
+
+            :return: None.
+            :rtype: None.
+        """
+        if not self.gc_disabled:
+            return
+        gc.enable()
+        self.gc_disabled = False
+
+
+    def print_report(self):
+        """
+            Prints granted settings, jitter before and after, and garbage collections.
+
+            :return: None.
+            :rtype: None.
+        """
+        if not self.enabled:
+            return
+        print("Realtime", self.name+":")
+        for setting, granted, detail in self.settings:
+            print("    %-14s %-12s %s" % (setting, 'granted' if granted else 'NOT granted', detail))
+        for label, jitter in (('before', self.jitter_before), ('after', self.jitter_after)):
+            if jitter is not None:
+                print("    jitter %-7s mean: %.1f us, p99: %.1f us, max: %.1f us, overruns: %d" % (label, jitter['mean_us'], jitter['p99_us'], jitter['max_us'], jitter['overruns']))
+        if self.n_collections > 0:
+            print("    gc collections between phases: %d, max: %.2f ms" % (self.n_collections, self.max_collection_time * 1000))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Apply real-time profile and measure jitter.')
+    parser.add_argument('-c',
+                        '--cpus',
+                        type=str,
+                        default=None,
+                        help='CPUs for the control thread (e.g. 2-3), default: isolated CPUs')
+    parser.add_argument('-p',
+                        '--priority',
+                        type=int,
+                        default=80,
+                        help='SCHED_FIFO priority')
+    parser.add_argument('-n',
+                        '--n-ticks',
+                        type=int,
+                        default=2000,
+                        help='Number of ticks of each jitter measurement')
+    args = parser.parse_args()
+
+    RealtimeProfileClass(
+        enabled = True,
+        cpus = None if args.cpus is None else parse_cpu_list(args.cpus),
+        priority = args.priority,
+        n_jitter_ticks = args.n_ticks,
+    ).apply()
@@ -0,0 +1,154 @@
+"""
+    Batched access to masterboard sensor data and current references.
+"""
+
+import time
+import argparse
+import numpy as np
+from control.masterboard_simulator import *
+
+IMU_DATA_FUNCTION_NAMES = ('imu_data_accelerometer', 'imu_data_gyroscope', 'imu_data_attitude', 'imu_data_linear_acceleration')
+
+
+class RobotSnapshotClass():
+
+    def __init__(self,
+        robot_if,
+        n_motors,
+        connected_motor_indexes,
+        adc_driver = 3,
+        position = None,
+        velocity = None,
+    ):
+        """
+            Snapshot of motor positions, velocities, and currents, ADC value, and IMU data, read once per tick after ParseSensorData into preallocated arrays.
+            Motor objects and their getters are looked up once, so a tick does not go through GetMotor(i) or GetDriver(i) again. Current references of all connected motors are written with one call before SendCommand.
+
+            :param robot_if: Masterboard interface.
+            :type robot_if: MasterBoardInterface or SimulatedMasterBoardInterfaceClass.
+            :param n_motors: Number of motors (n_slaves * 2).
+            :type n_motors: int.
+            :param connected_motor_indexes: Indexes of motors on connected slaves, only these get current references.
+            :type connected_motor_indexes: list[int].
+            :param adc_driver: Index of driver whose first ADC input is read.
+            :type adc_driver: int.
+            :param position: Optional buffer for motor positions (e.g. controller buffer).
+            :type position: ndarray (n_motors,) or None.
+            :param velocity: Optional buffer for motor velocities (e.g. controller buffer).
+            :type velocity: ndarray (n_motors,) or None.
+        """
+        self.robot_if = robot_if
+        self.n_motors = n_motors
+        self.connected_motor_indexes = list(connected_motor_indexes)
+
+        motors = [robot_if.GetMotor(i) for i in range(n_motors)]
+        self.position_getters = [motor.GetPosition for motor in motors]
+        self.velocity_getters = [motor.GetVelocity for motor in motors]
+        self.current_getters = [motor.GetCurrent for motor in motors]
+        self.current_setters = [motors[i].SetCurrentReference for i in self.connected_motor_indexes]
+        self.imu_getters = [(getattr(robot_if, name), i) for name in IMU_DATA_FUNCTION_NAMES for i in range(3)]
+        self.adc_driver = robot_if.GetDriver(adc_driver)
+
+        self.position = np.zeros(n_motors) if position is None else position
+        self.velocity = np.zeros(n_motors) if velocity is None else velocity
+        self.current = np.zeros(n_motors) # measured currents
+        self.imu = np.zeros(len(self.imu_getters)) # accelerometer, gyroscope, attitude, linear acceleration (x, y, z each)
+        self.adc = 0.0
+        self.zero_current = np.zeros(n_motors)
+
+
+    def read(self):
+        """
+            Reads sensor data of all motors and ADC into the snapshot arrays. Call after ParseSensorData.
+
+            :return: None.
+            :rtype: None.
+        """
+        self.position[:] = [get() for get in self.position_getters]
+        self.velocity[:] = [get() for get in self.velocity_getters]
+        self.current[:] = [get() for get in self.current_getters]
+        self.adc = self.adc_driver.adc[0]
+
+
+    def read_imu(self):
+        """
+            Reads IMU data into the snapshot array. Call after ParseSensorData in ticks where IMU data is used.
+
+            :return: None.
+            :rtype: None.
+        """
+        self.imu[:] = [get(i) for get, i in self.imu_getters]
+
+
+    def write(self, current_reference):
+        """
+            Sets current references of all connected motors. Call before SendCommand.
+
+            :param current_reference: Current references of all motors in A.
+            :type current_reference: ndarray (n_motors,).
+            :return: None.
+            :rtype: None.
+        """
+        current_reference = current_reference.tolist()
+        for set_current, i in zip(self.current_setters, self.connected_motor_indexes):
+            set_current(current_reference[i])
+
+
+def benchmark_snapshot(n_ticks = 20000, n_slaves = 6):
+    """
+        Compares per-tick cost of individual masterboard calls and snapshot reads/writes against the masterboard simulator.
+
+        :param n_ticks: Number of ticks.
+        :type n_ticks: int.
+        :param n_slaves: Number of slaves.
+        :type n_slaves: int.
+        :return: None.
+        :rtype: None.
+    """
+    robot_if = SimulatedMasterBoardInterfaceClass(n_slaves=n_slaves)
+    n_motors = n_slaves * 2
+    connected_motor_indexes = list(range(n_motors))
+    cur = np.zeros(n_motors)
+    motor_pos = np.zeros(n_motors)
+    motor_vel = np.zeros(n_motors)
+    motor_cur = np.zeros(n_motors)
+    adc = np.zeros(1)
+
+    start_time = time.perf_counter()
+    for _ in range(n_ticks):
+        for i in range(n_motors):
+            motor_pos[i] = robot_if.GetMotor(i).GetPosition()
+            motor_vel[i] = robot_if.GetMotor(i).GetVelocity()
+            motor_cur[i] = robot_if.GetMotor(i).GetCurrent()
+        imu_data = []
+        for name in IMU_DATA_FUNCTION_NAMES:
+            for ii in range(3):
+                imu_data.append(getattr(robot_if, name)(ii))
+        adc[0] = robot_if.GetDriver(3).adc[0] # snapshot.read() reads the ADC as well
+        for i in connected_motor_indexes:
+            robot_if.GetMotor(i).SetCurrentReference(cur[i])
+    individual_time = time.perf_counter() - start_time
+
+    snapshot = RobotSnapshotClass(robot_if, n_motors, connected_motor_indexes)
+    start_time = time.perf_counter()
+    for _ in range(n_ticks):
+        snapshot.read()
+        snapshot.read_imu()
+        snapshot.write(cur)
+    snapshot_time = time.perf_counter() - start_time
+
+    print("Individual calls: %.2f us per tick" % (individual_time / n_ticks * 1e6))
+    print("Snapshot:         %.2f us per tick" % (snapshot_time / n_ticks * 1e6))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Masterboard snapshot microbenchmark against the simulator.')
+    parser.add_argument('-n',
+                        '--n-ticks',
+                        type=int,
+                        default=20000,
+                        help='Number of ticks')
+    args = parser.parse_args()
+
+    benchmark_snapshot(args.n_ticks)
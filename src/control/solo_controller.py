@@ -0,0 +1,213 @@
+"""
+    Vectorized PD/PID controller for solo control.
+"""
+
+import enum
+import time
+import argparse
+import numpy as np
+
+
+class ControllerMode(enum.IntEnum):
+    HOME = 0 # going to home position
+    SEQUENCE = 1 # running motion trajectory sequence
+    CALIBRATION = 2 # calibration, going to zero position, smooth landing
+    HOLD = 3 # all other states
+
+
+class SoloControllerClass():
+
+    def __init__(self,
+        connected_motors,
+        seq_kp = 3.5,
+        seq_ki = 0.0,
+        seq_kd = 0.0375,
+        i_sat = 0.,
+        iq_sat = 12.0,
+    ):
+        """
+            PD/PID controller with preallocated buffers. All per-tick operations are done in place.
+
+            :param connected_motors: 1 if motor at index is connected, else 0.
+            :type connected_motors: ndarray (n_motors,).
+            :param seq_kp: Proportional gain for motion trajectory sequence.
+            :type seq_kp: float.
+            :param seq_ki: Integral gain for motion trajectory sequence.
+            :type seq_ki: float.
+            :param seq_kd: Derivative gain for motion trajectory sequence.
+            :type seq_kd: float.
+            :param i_sat: Saturation of integrator.
+            :type i_sat: float.
+            :param iq_sat: Saturation of current reference in A.
+            :type iq_sat: float.
+        """
+        self.connected_motors = np.array(connected_motors, dtype=float)
+        self.n_motors = len(self.connected_motors)
+        self.i_sat = i_sat
+        self.iq_sat = iq_sat
+
+        self.gains = {} # mode -> (kp, ki, kd) per joint gain vectors
+        self.set_gains(ControllerMode.HOME, 4, 0.0, 0.03)
+        self.set_gains(ControllerMode.SEQUENCE, seq_kp, seq_ki, seq_kd)
+        self.set_gains(ControllerMode.CALIBRATION, 3, 0.1, 0.03)
+        self.set_gains(ControllerMode.HOLD, 4, 0.0, 0.03)
+        self.zero_gain = np.zeros(self.n_motors)
+        self.v_ref = np.zeros(self.n_motors) # desired velocity
+        self.iq_min = np.full(self.n_motors, -self.iq_sat)
+        self.iq_max = np.full(self.n_motors, self.iq_sat)
+
+        self.motor_pos = np.zeros(self.n_motors)
+        self.motor_vel = np.zeros(self.n_motors)
+        self.p_err = np.zeros(self.n_motors)
+        self.v_err = np.zeros(self.n_motors)
+        self.controller_i = np.zeros(self.n_motors)
+        self.cur = np.zeros(self.n_motors)
+        self.term = np.zeros(self.n_motors) # buffer for I and D terms
+
+
+    def set_gains(self, mode, kp, ki, kd):
+        """
+            Sets gains of controller mode. Scalars are used for all joints.
+
+            :param mode: Controller mode.
+            :type mode: ControllerMode.
+            :param kp: Proportional gain.
+            :type kp: float or ndarray (n_motors,).
+            :param ki: Integral gain.
+            :type ki: float or ndarray (n_motors,).
+            :param kd: Derivative gain.
+            :type kd: float or ndarray (n_motors,).
+            :return: None.
+            :rtype: None.
+        """
+        self.gains[mode] = tuple(np.broadcast_to(np.asarray(k, dtype=float), (self.n_motors,)).copy() for k in (kp, ki, kd))
+
+
+    def compute(self, target_position, mode, use_i):
+        """
+            Computes current references from target position and measured motor positions and velocities (motor_pos and motor_vel must be filled before).
+
+            :param target_position: Target motor positions.
+            :type target_position: ndarray (n_motors,) or list[float].
+            :param mode: Controller mode that selects the gains.
+            :type mode: ControllerMode.
+            :param use_i: Update and use integrator (PID), else PD.
+            :type use_i: Bool.
+            :return: Current references (internal buffer).
+            :rtype: ndarray (n_motors,).
+        """
+        kp, ki, kd = self.gains[mode]
+
+        np.subtract(target_position, self.motor_pos, out=self.p_err)
+        self.p_err *= self.connected_motors # 0 for not connected indexes
+
+        if use_i:
+            self.controller_i += self.p_err
+            np.clip(self.controller_i, -self.i_sat, self.i_sat, out=self.controller_i)
+        else: # PD controller
+            ki = self.zero_gain
+
+        np.subtract(self.v_ref, self.motor_vel, out=self.v_err)
+        self.v_err *= self.connected_motors
+
+        np.multiply(kp, self.p_err, out=self.cur)
+        np.multiply(ki, self.controller_i, out=self.term)
+        self.cur += self.term
+        np.multiply(kd, self.v_err, out=self.term)
+        self.cur += self.term
+
+        # same as np.clip for non-zero iq_sat, but without the overhead of the np.clip wrapper
+        np.maximum(self.cur, self.iq_min, out=self.cur)
+        np.minimum(self.cur, self.iq_max, out=self.cur)
+        return self.cur
+
+
+def reference_controller_step(target_position, motor_pos, motor_vel, connected_motors, controller_i, kp, ki, kd, use_i, i_sat=0., iq_sat=12.0):
+    """
+        Reference PD/PID step as implemented in SoloControlClass before vectorization. Used to check SoloControllerClass.
+
+        :return: Current references, updated controller_i.
+        :rtype: ndarray (n_motors,), ndarray (n_motors,).
+    """
+    v_ref = 0
+    p_err = (target_position - motor_pos) * connected_motors
+    if use_i:
+        for i in range(len(controller_i)):
+            controller_i[i] += p_err[i]
+            if controller_i[i] > i_sat:
+                controller_i[i] = i_sat
+            elif controller_i[i] < - i_sat:
+                controller_i[i] = - i_sat
+    else:
+        ki = 0
+    v_err = (v_ref - motor_vel) * connected_motors
+    cur = (kp * p_err) + (ki * controller_i) + (kd * v_err)
+    for e in range(len(cur)):
+        if cur[e] > iq_sat:
+            cur[e] = iq_sat
+        elif cur[e] < -iq_sat:
+            cur[e] = -iq_sat
+    return cur, controller_i
+
+
+def compare_controller(n_ticks=20000, i_sat=0.5):
+    """
+        Checks that SoloControllerClass gives bit-identical currents to the reference implementation and prints per-tick cost of both.
+
+        :param n_ticks: Number of random ticks.
+        :type n_ticks: int.
+        :param i_sat: Integrator saturation used for the check (0 in SoloControlClass).
+        :type i_sat: float.
+        :return: True if all currents are bit-identical.
+        :rtype: Bool.
+    """
+    rng = np.random.default_rng(0)
+    n_motors = 12
+    connected_motors = np.ones(n_motors)
+    connected_motors[[4, 5]] = 0
+    targets = rng.normal(scale=5, size=(n_ticks, n_motors))
+    positions = rng.normal(scale=5, size=(n_ticks, n_motors))
+    velocities = rng.normal(scale=50, size=(n_ticks, n_motors))
+    modes = [ControllerMode(mode) for mode in rng.integers(0, len(ControllerMode), n_ticks)]
+    use_is = (rng.random(n_ticks) < 0.5).tolist()
+
+    controller = SoloControllerClass(connected_motors, i_sat=i_sat)
+    gains = {mode: (4, 0.0, 0.03) for mode in ControllerMode}
+    gains[ControllerMode.SEQUENCE] = (3.5, 0.0, 0.0375)
+    gains[ControllerMode.CALIBRATION] = (3, 0.1, 0.03)
+
+    reference_i = np.zeros(n_motors)
+    reference_currents = np.zeros((n_ticks, n_motors))
+    start_time = time.perf_counter()
+    for t in range(n_ticks):
+        kp, ki, kd = gains[modes[t]]
+        reference_currents[t], reference_i = reference_controller_step(targets[t], positions[t], velocities[t], connected_motors, reference_i, kp, ki, kd, use_is[t], i_sat=i_sat)
+    reference_time = time.perf_counter() - start_time
+
+    currents = np.zeros((n_ticks, n_motors))
+    start_time = time.perf_counter()
+    for t in range(n_ticks):
+        controller.motor_pos[:] = positions[t]
+        controller.motor_vel[:] = velocities[t]
+        currents[t] = controller.compute(targets[t], modes[t], use_is[t])
+    vectorized_time = time.perf_counter() - start_time
+
+    identical = currents.tobytes() == reference_currents.tobytes()
+    print("Bit-identical currents:", identical)
+    print("Reference controller:  %.2f us per tick" % (reference_time / n_ticks * 1e6))
+    print("Vectorized controller: %.2f us per tick" % (vectorized_time / n_ticks * 1e6))
+    return identical
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Controller check and microbenchmark.')
+    parser.add_argument('-n',
+                        '--n-ticks',
+                        type=int,
+                        default=20000,
+                        help='Number of ticks')
+    args = parser.parse_args()
+
+    compare_controller(args.n_ticks, i_sat=0.)
+    compare_controller(args.n_ticks, i_sat=0.5)
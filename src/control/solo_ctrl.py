@@ -4,12 +4,28 @@
 
 import math
 import os
+import enum
 import csv
-from scipy.interpolate import interp1d
+import hashlib
+import itertools
 import numpy as np
 from config import *
 import time
 from control.free_solo_ctrl import *
+from control.solo_data_log import *
+from control.telemetry_writer import *
+from control.periodic_scheduler import *
+from control.latency_profiler import *
+from control.masterboard_simulator import *
+from control.solo_controller import *
+from control.trajectory_stream import *
+from control.state_machine import *
+from control.calibration_engine import *
+from control.status_channel import *
+from control.fighting_detector import *
+from control.robot_snapshot import *
+from control.realtime_profile import *
+from platform_trajectory_generation.transition_trajectory import *
 
 try:
     import libmaster_board_sdk_pywrap as mbs
@@ -17,6 +33,18 @@ except ImportError:
     # print("- Cannot find libmaster_board_sdk_pywrap. PyBullet Simulation will work as normal but SOLO control will not work.")
     pass 
 
+
+class RunState(enum.IntEnum):
+    INIT = 0 # select calibration or load calibrated zero angles
+    CALIBRATE = 1 # calibration phase 1 or 2
+    ZERO = 2 # going to calibrated zero position after phase 2
+    HOME = 3 # going to home position
+    WAIT_TRIGGER = 4 # maintaining home position until ADC trigger
+    SEQUENCE = 5 # running motion trajectory sequence
+    LAND = 6 # going to smooth landing position
+    DONE = 7
+
+
 class SoloControlClass():
 
     def __init__(self,
@@ -27,6 +55,9 @@ class SoloControlClass():
         phase_0_calibration = False,
         phase_1_calibration = False,
         phase_2_calibration = False,
+        latency_report_interval = None, # seconds, if None latency report is only printed at shutdown
+        use_simulator = False, # use in-process masterboard simulator instead of libmaster_board_sdk_pywrap
+        realtime = REALTIME_PROFILE, # pin control thread, SCHED_FIFO, mlockall, no garbage collection during the sequence
     ):
         self.debug_mode = False
         self.counter = 0 
@@ -38,9 +69,16 @@ class SoloControlClass():
         self.phase_1_calibration = phase_1_calibration
         self.phase_2_calibration = phase_2_calibration
         self.name_interface = name_interface
+        self.latency_report_interval = latency_report_interval
+        self.use_simulator = use_simulator
+        self.realtime = realtime
         self.csv_joint_positions_file_name = GLOBAL_AUTOGENERATED_DIRECTORY+csv_joint_positions_file_name
         self.solo_output_file = GLOBAL_OUTPUT_DIRECTORY+solo_output_file
-        self.unique_solo_output_file = GLOBAL_OUTPUT_DIRECTORY + HISTORY_DIR + SOLO_DATA_OUTPUT_FILE_UNIQUE
+        self.solo_log_file = GLOBAL_OUTPUT_DIRECTORY+SOLO_DATA_LOG_FILE_NAME
+        self.unique_solo_log_file = GLOBAL_OUTPUT_DIRECTORY + HISTORY_DIR + SOLO_DATA_LOG_FILE_UNIQUE
+        self.status_log_file = GLOBAL_OUTPUT_DIRECTORY+SOLO_EVENT_LOG_FILE_NAME
+        self.data_log = None
+        self.telemetry = None
 
         self.init_starting_params()
         if self.phase_0_calibration:
@@ -64,13 +102,24 @@ class SoloControlClass():
                 print("Running Phase 2 Calibration")
             self.load_calibrated_zero_angles = False 
 
+        self.status = StatusChannelClass(self.status_log_file, rate_limits=STATUS_RATE_LIMITS, name='solo') # console output from the control loop
         self.init_masterboard_params()
         self.init_controller_params()
+        self.init_lifecycle()
 
         if self.phase_1_calibration or self.phase_2_calibration:      
             self.init_calibration()
 
-        self.main_loop()
+        try:
+            self.main_loop()
+        finally:
+            self.status.close() # render remaining output before the reports
+            self.close_data_log()
+            self.scheduler.print_report()
+            self.profiler.close()
+            self.lifecycle.print_report()
+            self.sequence_motion_trajectory.close()
+            self.realtime_profile.print_report()
 
         self.robot_if.Stop()  # Shut down the interface between the computer and the master board
 
@@ -83,167 +132,73 @@ class SoloControlClass():
     
     def main_loop(self):
         """
-            Main execution block. Runs until robot is not timeout. Maintains frequency of 1000 Hz.  
+            Main execution block. Runs until robot is not timeout. Maintains frequency of 1000 Hz with deadline based scheduler.  
 
             :return: None.
             :rtype: None.
         """
         self.prev_controller_time = time.time()
         self.prev_target = [0.0] * self.n_slaves * 2
+        start_tick = self.profiler.start_tick # bound once, see LatencyProfilerClass
+        mark = self.profiler.mark
+        self.scheduler.start()
 
         while ((not self.robot_if.IsTimeout()) or 1):  
 
             if self.program_complete:
                 break
 
-            if ((time.time() - self.last) > self.dt):
-                self.last = time.time()
-
-                if self.counter == 0:
-                    self.data_file = open(self.solo_output_file, 'w')
-                    self.data_file_c = open(self.unique_solo_output_file, 'w')
-                    self.data_writer = csv.writer(self.data_file)
-                    self.data_writer_c = csv.writer(self.data_file_c)
-                    # header = ["counter[0]", "motor_pos[1-12]", "target_pos[13-24]", "current[25-36]", "imu[37-48]"] # update this later
-                    header = [
-                        "timestamp[0]",
-                        "pos_bl_hip[1]", "pos_br_hip", "pos_bl_lower", "pos_bl_upper", "pos_br_lower", "pos_br_upper", "pos_fl_hip", "pos_fr_hip", "pos_fl_lower", "pos_fl_upper", "pos_fr_lower", "pos_fr_upper",
-                        "target_pos_bl_hip[13]", "target_pos_br_hip", "target_pos_bl_lower", "target_pos_bl_upper", "target_pos_br_lower", "target_pos_br_upper", "target_pos_fl_hip", "target_pos_fr_hip", "target_pos_fl_lower", "target_pos_fl_upper", "target_pos_fr_lower", "target_pos_fr_upper",
-                        "current_A_bl_hip[25]", "current_A_br_hip", "current_A_bl_lower", "current_A_bl_upper", "current_A_br_lower", "current_A_br_upper", "current_A_fl_hip", "current_A_fr_hip", "current_A_fl_lower", "current_A_fl_upper", "current_A_fr_lower", "current_A_fr_upper",
-                        "imu_accelerometer_x[37]", "imu_accelerometer_y", "imu_accelerometer_z", "imu_gyroscope_x", "imu_gyroscope_y", "imu_gyroscope_z", "imu_attitude_x", "imu_attitude_y", "imu_attitude_z", "imu_linear_acceleration_x", "imu_linear_acceleration_y", "imu_linear_acceleration_z",
-                        "adc[49]"
-                    ]
-                    self.data_writer.writerow(header)
-                    self.data_writer_c.writerow(header)
-
-                self.counter += 1
-
-                if not self.phase_1_calibration and not self.phase_2_calibration:
-                    self.sequence_counter += 1
-
-                if self.phase_1_calibration or self.phase_2_calibration:
-                    if not self.reset_calibration_complete:
-                        self.reset_calibration_counter += 1
-
-                self.current_time += self.dt
-                self.robot_if.ParseSensorData()  # Read sensor data sent by the masterboard
-
-                if (self.state == 0):  #  If the system is not ready
-                    self.state = 1
-
-                    # for all motors on a connected slave
-                    for i in self.motors_spi_connected_indexes:  # Check if all motors are enabled and ready
-                        if not (self.robot_if.GetMotor(i).IsEnabled() and self.robot_if.GetMotor(i).IsReady()):
-                            self.state = 0
-                        self.init_pos_motors[i] = self.robot_if.GetMotor(i).GetPosition()
-                        self.current_time = 0
-
-
-                else:  # If the system is ready
-                    # for all motors on a connected slave
-                    for i in self.motors_spi_connected_indexes:
-
-                        if i % 2 == 0 and self.robot_if.GetDriver(i // 2).GetErrorCode() == 0xf:
-                            #print("Transaction with SPI{} failed".format(i // 2))
-                            continue #user should decide what to do in that case, here we ignore that motor
-                        
-                        self.global_motor_i = i
-                        
-                        if self.robot_if.GetMotor(i).IsEnabled():
-
-                            if self.debug_mode:
-                                self.debug_joint.get_joint()
-                                self.debug_joint.set_joint_position()
-
-                            elif self.phase_1_calibration:
-                                self.fill_index_calibration()
-                                if self.is_calibration_complted(self.index_calibration_array):
-                                    self.completed_phase_1_exit = False 
-                                    if not self.calibrated_offsets_saved:
-                                        self.save_calibrated_offsets(phase=1, f_name=self.name_of_calibration_saved_csv)
-                                    else:
-                                        self.phase_1_calibration = False
-                                        self.calibrated_zero_position = self.zero_position
-                                    # if not self.phase_1_calibration:
-                                else:
-                                    self.run_calibration_synced()
-
-                            elif not self.completed_phase_1_exit:
-                                print("Calibration Phase 1 Completed. In Free SOLO Control.")
-                                self.robot_if.Stop()
-                                FreeSoloClass()
-                                exit(1)
-
-                            elif self.phase_2_calibration:
-                                if self.calibrated_offsets == []:
-                                    self.calibrated_offsets = self.load_offsets(f_name=self.name_of_calibration_saved_csv)
-                                
-                                self.fill_index_calibration()
-
-                                if self.is_calibration_complted(self.phase_2_index_calibration_array):
-                                    if not self.offsets_to_calibrated_zeros_saved:
-                                        self.save_calibrated_offsets(phase=2, f_name=self.name_of_offset_calibrated_zeros_csv)
-                                    self.phase_2_calibration = False 
-                                    self.use_i = True
-                                    self.calibrated_zero_position = self.calibration_target_position
-                                    self.target_position = self.calibrated_zero_position
-                                    
-                                else:
-                                    self.run_calibration_synced()
-                                    self.do_zero_position_after_calibration = True
-
-                            elif self.load_calibrated_zero_angles:
-                                self.calibrated_zero_position = self.load_offsets(f_name=self.name_of_offset_calibrated_zeros_csv)
-                                self.target_position = self.calibrated_zero_position
-                                self.load_calibrated_zero_angles = False 
-                                self.use_i = False 
-
-                            elif not self.phase_1_calibration and \
-                                    not self.phase_2_calibration and \
-                                    not self.in_motion_trajectory_sequence and \
-                                    not self.end_sequence:
-                                # self.robot_if.Stop()
-                                # exit(1)
-                                # self.go_to_home_position()
-                                if self.do_zero_position_after_calibration:
-                                    self.go_to_zero_position()
-                                else:
-                                    self.go_to_home_position()
-
-                            elif not self.trigger_is_triggered:
-                                self.maintain_home_position()
-                                self.read_trigger_signal()
-                                
-
-                            elif (self.in_home_position and self.start_sequence) or self.in_motion_trajectory_sequence:
-                                if self.start_sequence:
-                                    self.sequence_counter = 0
-                                    print("Running sequence ... ")
-                                    print('---')
-                                    print("Sequence Start Time:", self.sequence_start_time)
-
-                                self.start_sequence_motion_trajectory()
-
-                                if self.sequence_counter % 1000 == 0:
-                                    print('Sequence Run Time:', int(self.last - self.sequence_start_time),'s.', end='\r')
-
-
-                            else: # ending
-                                if self.sequence_counter == 0 and self.global_motor_i==2:
-                                    print("Sequence completed!")
-                                    print('---')
-                                    print("Sequence End Time: ", self.sequence_end_time)
-                                    print("Total Sequence Runtime:", self.sequence_end_time - self.sequence_start_time)
-                                    print('---')
-                                self.do_smooth_landing()
-
-                    self.controller()
-
-                    if not self.phase_0_calibration and not self.phase_1_calibration and not self.phase_2_calibration and self.trigger_is_triggered:                   
-                        self.get_imu_data()
-                        self.save_pos_in_arr()
-
-                self.robot_if.SendCommand()  # Send the reference currents to the master board
+            self.scheduler.wait()
+            start_tick(self.scheduler.wake_time_ns)
+            self.last = time.time()
+
+            if self.counter == 0:
+                self.data_log = SoloDataLogClass(self.solo_log_file, self.unique_solo_log_file)
+                self.telemetry = TelemetryWriterClass(self.data_log.write_row, self.data_log.n_columns, name='solo_data')
+
+            self.counter += 1
+
+            if not self.phase_1_calibration and not self.phase_2_calibration:
+                self.sequence_counter += 1
+
+            self.current_time += self.dt
+            self.robot_if.ParseSensorData()  # Read sensor data sent by the masterboard
+            self.snapshot.read() # motor positions, velocities, currents, and ADC of this tick
+            mark(perf_counter_ns()) # parse_sensor_data
+
+            if (self.state == 0):  #  If the system is not ready
+                self.state = 1
+
+                # for all motors on a connected slave
+                for i in self.motors_spi_connected_indexes:  # Check if all motors are enabled and ready
+                    if not (self.robot_if.GetMotor(i).IsEnabled() and self.robot_if.GetMotor(i).IsReady()):
+                        self.state = 0
+                    self.init_pos_motors[i] = self.snapshot.position[i]
+                    self.current_time = 0
+                timestamp_ns = perf_counter_ns() # state machine, controller, and data saving do not run
+                mark(timestamp_ns)
+                mark(timestamp_ns)
+                mark(timestamp_ns)
+
+            else:  # If the system is ready
+                if self.is_any_motor_active():
+                    if self.debug_mode:
+                        self.debug_joint.get_joint()
+                        self.debug_joint.set_joint_position()
+                    else:
+                        self.lifecycle.step() # runs lifecycle state handlers once per tick
+
+                mark(perf_counter_ns()) # state_machine
+                self.controller()
+                mark(perf_counter_ns()) # controller
+
+                if not self.phase_0_calibration and not self.phase_1_calibration and not self.phase_2_calibration and self.trigger_is_triggered:                   
+                    self.snapshot.read_imu()
+                    self.save_pos_in_arr()
+                mark(perf_counter_ns()) # save_data
+
+            self.robot_if.SendCommand()  # Send the reference currents to the master board
+            mark(perf_counter_ns()) # send_command
     
     
     def maintain_home_position(self):
@@ -254,9 +209,8 @@ class SoloControlClass():
             :rtype: None.
         """
         self.target_position = self.smooth_home_pos
-        if ((self.counter % 3000) == 0 and self.global_motor_i == 4):
-            print("Maintaining position.")
-            print('---')
+        if (self.counter % 3000) == 0:
+            self.status.post('maintain_position', "Maintaining position.\n---")
         
     
     def init_calibration(self):
@@ -268,12 +222,8 @@ class SoloControlClass():
         """
         self.zero_position = [0] * self.n_slaves * 2
         self.home_position = [0] * self.n_slaves * 2
-        self.index_pos_array = [0] * self.n_slaves * 2
-        self.index_calibration_array = [None] * self.n_slaves * 2
-        self.phase_2_index_calibration_array = [None] * self.n_slaves * 2
         # self.calibration_joint_offset_step_value = 0.00000001
         self.calibration_joint_offset_step_value = 0.000001 # 0.000001 rad/ms = 0.00005729578 degrees/ms = 0.05729578 degrees/s in motor
-        self.number_of_steps_for_calibration = 1000
         self.max_motor_angle_in_degrees = 25 # input in degrees (leg angle)
         self.min_motor_angle_in_degrees = -25 # input in degrees (leg angle)
         self.max_motor_angle = math.radians(self.max_motor_angle_in_degrees) * 9 # motor angle
@@ -281,46 +231,115 @@ class SoloControlClass():
         self.tolerance_for_startup_position_in_degrees = 10 # tolerance of leg at startup
         self.tolerance_for_startup_position = math.radians(self.tolerance_for_startup_position_in_degrees) * 9 # tolerance angle in radians at motor
 
-        self.move_in_max_dir = True 
+        self.calibration = CalibrationEngineClass(
+            phase = 1 if self.phase_1_calibration else 2,
+            zero_position = self.zero_position,
+            step_value = self.calibration_joint_offset_step_value,
+            min_angle_in_degrees = self.min_motor_angle_in_degrees,
+            max_angle_in_degrees = self.max_motor_angle_in_degrees,
+            post = self.status.post,
+        )
         self.calibration_target_position = self.zero_position
-        self.calibration_joint_offset_array = [0] * self.n_slaves *2
-        self.calibration_counter_i = 0
-        self.calibration_counter_j = 0
         self.calibrated_offsets_saved = False 
-        self.calibrated_hips_phase_1 = False 
-        self.calibrated_lower_ls_phase_1 = False
-        self.calibrated_upper_ls_phase_1 = False
-        self.calibrated_hips_phase_2 = False 
-        self.calibrated_hips_phase_2_prev = False 
-        self.calibrated_lower_ls_phase_2 = False
-        self.calibrated_lower_ls_phase_2_prev = False
-        self.calibrated_upper_ls_phase_2 = False
         self.calibrated_offsets = []
-        self.multiple_indices_found = [False] * self.n_slaves * 2
-        self.target_hip_angles = None
-        self.target_lower_ls_angles = None
-        self.target_upper_ls_angles = None
         self.offsets_to_calibrated_zeros_saved = False
 
-        self.reset_calibration_complete = True 
-        self.reset_calibration_counter = 0
-        self.smooth_reset_trajectory = [[None] * self.n_slaves * 2] 
-
     
     def load_trajectory(self, name_of_csv_file):
         """
-            Loads PyBullet trajectory, does time scaling, does interpolation of trajectory to run in 1000 Hz, and outputs sequence with correct index mapping.
+            Loads PyBullet joint trajectory and outputs sequence with correct index mapping and gearing. 
+            The mapped trajectory is cached as .npy file keyed by the hash of the csv file and streamed from the memory-mapped cache in chunks, so memory use does not depend on the length of the sequence.
 
             :param name_of_csv_file: Name of csv file where trajectory is being loaded from.
             :type name_of_csv_file: str.
-            :return: Time scaled, interpolated, and correct index trajectory for csv file.
-            :rtype: list[float].
+            :return: Correct index trajectory for csv file.
+            :rtype: TrajectoryStreamClass (N,12).
         """
         print('Loading trajectory for: '+name_of_csv_file+'...', end='')
-        trajectory_from_csv = self.read_from_csv(name_of_csv_file, True, 2)
-        mapped_trajectory = list([self.get_mapped_joints_from_pybullet_to_robot(trajector) for trajector in trajectory_from_csv])
+        cache_file_name = self.get_trajectory_cache_file_name(name_of_csv_file)
+
+        if os.path.exists(cache_file_name):
+            print(' (cached: '+cache_file_name+')', end='')
+        else:
+            cache_directory = os.path.dirname(cache_file_name)
+            os.makedirs(cache_directory, exist_ok=True)
+            cache_prefix = os.path.basename(name_of_csv_file)[:-4] + '-'
+            for old_cache_file_name in os.listdir(cache_directory): # remove caches of previous versions of csv file
+                if old_cache_file_name.startswith(cache_prefix) and old_cache_file_name.endswith('.npy'):
+                    os.remove(os.path.join(cache_directory, old_cache_file_name))
+            self.write_trajectory_cache(name_of_csv_file, cache_file_name)
+
+        mapped_trajectory = np.load(cache_file_name, mmap_mode='r')
         print(" Done!")
-        return mapped_trajectory
+        return TrajectoryStreamClass(mapped_trajectory, chunk_size=TRAJ_STREAM_CHUNK_SIZE)
+
+
+    def get_trajectory_cache_file_name(self, name_of_csv_file):
+        """
+            Returns name of trajectory cache file for csv file. The name contains the SHA-256 hash of the csv file content and of the motor mapping.
+
+            :param name_of_csv_file: Name of csv file.
+            :type name_of_csv_file: str.
+            :return: Name of .npy cache file.
+            :rtype: str.
+        """
+        file_hash = hashlib.sha256()
+        with open(name_of_csv_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                file_hash.update(chunk)
+        source_index, sign = self.get_pybullet_to_robot_joint_mapping(16)
+        file_hash.update(source_index.tobytes())
+        file_hash.update(sign.tobytes())
+        return GLOBAL_AUTOGENERATED_DIRECTORY + TRAJ_JOINTS_CACHE_DIR + os.path.basename(name_of_csv_file)[:-4] + '-' + file_hash.hexdigest()[:16] + '.npy'
+
+
+    def write_trajectory_cache(self, name_of_csv_file, cache_file_name, num_headers=2, chunk_size=TRAJ_STREAM_CHUNK_SIZE):
+        """
+            Reads joint trajectory from csv file with header lines chunk by chunk, maps it to robot motors and writes it into .npy cache file.
+            Only one chunk is held in memory at a time.
+
+            :param name_of_csv_file: Name of csv file.
+            :type name_of_csv_file: str.
+            :param cache_file_name: Name of .npy cache file.
+            :type cache_file_name: str.
+            :param num_headers: Number of header lines.
+            :type num_headers: int.
+            :param chunk_size: Number of rows read at a time.
+            :type chunk_size: int.
+            :return: None.
+            :rtype: None.
+        """
+        input_file = open(name_of_csv_file)
+        csv_reader = csv.reader(input_file)
+        for _ in range(num_headers):
+            line = next(csv_reader, [''])
+            if line[0] == 'pybullet':
+                print("\n==================================================================\n")
+                print("ERROR: SEQUENCE WAS GENERATED FOR PYBULLET ENV (240 HZ). EXITING!")
+                print("==================================================================\n")
+                exit(-1)
+
+        n_rows = 0
+        n_columns = 0
+        temp_file_name = cache_file_name + '.tmp'
+        with open(temp_file_name, 'wb') as cache_file:
+            cache_file.write(get_npy_header(n_rows, n_columns)) # placeholder, patched when all chunks are written
+            while True:
+                lines = list(itertools.islice(input_file, chunk_size))
+                if not lines:
+                    break
+                mapped_chunk = self.map_pybullet_trajectory_to_robot(np.loadtxt(lines, delimiter=',', ndmin=2))
+                cache_file.write(mapped_chunk.tobytes())
+                n_rows, n_columns = n_rows + mapped_chunk.shape[0], mapped_chunk.shape[1]
+            cache_file.seek(0)
+            cache_file.write(get_npy_header(n_rows, n_columns))
+        input_file.close()
+
+        if n_rows == 0:
+            os.remove(temp_file_name)
+            print("\nERROR: TRAJECTORY FILE "+name_of_csv_file+" CONTAINS NO DATA. EXITING!")
+            exit(-1)
+        os.replace(temp_file_name, cache_file_name) # cache file only exists once it is complete
 
 
     def read_from_csv(self, name_of_csv, header, num_headers=1):
@@ -369,7 +388,7 @@ class SoloControlClass():
             :return: None
             :rtype: None
         """
-        self.smooth_home_pos = self.sequence_motion_trajectory[0]
+        self.smooth_home_pos = np.array(self.sequence_motion_trajectory[0]) # copy, rows of the trajectory stream are reused
         try:
             self.smooth_landing_pos = self.load_offsets(GLOBAL_CALIBRATION_FILES_DIRECTORY+LANDING_POS_FILE)
         except:
@@ -381,45 +400,62 @@ class SoloControlClass():
             Converts PyBullet joint/motor indices into robot joint/motor indices and returns updated trajectory.
 
             :param pybullet_trajectory: Trajectory from pybullet whose indices need to be updated.
-            :type pybullet_trajectory: list[list[float]].
+            :type pybullet_trajectory: list[float].
             :return: Trajectory with updated indices.
-            :rtype: list[list[float]].
+            :rtype: ndarray (12,).
         """
-        if len(pybullet_trajectory) != 12 and len(pybullet_trajectory) != 16:
-            print("Number of joint positions != 12 or 16. Exiting!")
-            exit(-1) 
+        return self.map_pybullet_trajectory_to_robot(np.array([pybullet_trajectory], dtype=float))[0]
 
 
-        if len(pybullet_trajectory) == 16: # removing dummy joints if input
-            dummy_joints = [3,7,11,15]
-            updated_pybullet_trajectory = []
-            for ti, tv in enumerate(pybullet_trajectory):
-                if ti in dummy_joints:
-                    continue
-                else:
-                    updated_pybullet_trajectory.append(tv)
-        
-            pybullet_trajectory = updated_pybullet_trajectory
-
-
-        mapped_trajectory = [None] * self.n_slaves * 2
-        ''' mapped_trajectory[robot_motor_index] = pybullet_trajectory[correpsonding_pybullet_joint_index] '''
-        mapped_trajectory[self.motor_mapping["bl_hip"]] = - pybullet_trajectory[6] # bl_hip = hip_left_back 
-        mapped_trajectory[self.motor_mapping["br_hip"]] = pybullet_trajectory[9] # br_hip = hip_right_back
-        mapped_trajectory[self.motor_mapping["bl_lower"]] = pybullet_trajectory[8] # bl_lower = lower_leg_left_back
-        mapped_trajectory[self.motor_mapping["bl_upper"]] = pybullet_trajectory[7] # bl_upper = upper_leg_left_back
-        mapped_trajectory[self.motor_mapping["br_lower"]] = pybullet_trajectory[11] # br_lower = lower_leg_right_back
-        mapped_trajectory[self.motor_mapping["br_upper"]] = pybullet_trajectory[10] # br_upper = upper_leg_right_back
-        mapped_trajectory[self.motor_mapping["fl_hip"]] = pybullet_trajectory[0] # fl_hip = hip_left_front
-        mapped_trajectory[self.motor_mapping["fr_hip"]] = - pybullet_trajectory[3] # fr_hip = hip_right_front
-        mapped_trajectory[self.motor_mapping["fl_lower"]] = pybullet_trajectory[2] # fl_lower = lower_leg_left_front
-        mapped_trajectory[self.motor_mapping["fl_upper"]] = pybullet_trajectory[1] # fl_upper = upper_leg_left_front
-        mapped_trajectory[self.motor_mapping["fr_lower"]] = pybullet_trajectory[5] # fr_lower = lower_leg_right_front
-        mapped_trajectory[self.motor_mapping["fr_upper"]] = pybullet_trajectory[4] # fr_upper = upper_leg_right_front
-        
-        mapped_trajectory = np.array(mapped_trajectory) * 9 # accounting for gearing
+    def get_pybullet_to_robot_joint_mapping(self, n_joints):
+        """
+            Returns column index and sign for each robot motor in a PyBullet joint trajectory.
 
-        return mapped_trajectory
+            :param n_joints: Number of joints in PyBullet trajectory, 12 or 16 (with dummy joints).
+            :type n_joints: int.
+            :return: PyBullet column index and sign for each robot motor index.
+            :rtype: ndarray (12,), ndarray (12,).
+        """
+        pybullet_joint_indices = { # robot motor name : (pybullet joint index without dummy joints, sign)
+            "bl_hip" : (6, -1), # bl_hip = hip_left_back 
+            "br_hip" : (9, 1), # br_hip = hip_right_back
+            "bl_lower" : (8, 1), # bl_lower = lower_leg_left_back
+            "bl_upper" : (7, 1), # bl_upper = upper_leg_left_back
+            "br_lower" : (11, 1), # br_lower = lower_leg_right_back
+            "br_upper" : (10, 1), # br_upper = upper_leg_right_back
+            "fl_hip" : (0, 1), # fl_hip = hip_left_front
+            "fr_hip" : (3, -1), # fr_hip = hip_right_front
+            "fl_lower" : (2, 1), # fl_lower = lower_leg_left_front
+            "fl_upper" : (1, 1), # fl_upper = upper_leg_left_front
+            "fr_lower" : (5, 1), # fr_lower = lower_leg_right_front
+            "fr_upper" : (4, 1), # fr_upper = upper_leg_right_front
+        }
+        source_index = np.zeros(self.n_slaves * 2, dtype=np.int64)
+        sign = np.zeros(self.n_slaves * 2)
+        for motor_name, (pybullet_index, pybullet_sign) in pybullet_joint_indices.items():
+            if n_joints == 16:
+                pybullet_index += pybullet_index // 3 # skip dummy joints 3, 7, 11, 15
+            source_index[self.motor_mapping[motor_name]] = pybullet_index
+            sign[self.motor_mapping[motor_name]] = pybullet_sign
+        return source_index, sign
+
+
+    def map_pybullet_trajectory_to_robot(self, pybullet_trajectory):
+        """
+            Converts PyBullet joint trajectory into robot motor trajectory (index mapping, sign, and gearing) in one operation.
+
+            :param pybullet_trajectory: Trajectory from pybullet, with or without dummy joints.
+            :type pybullet_trajectory: ndarray (N,12) or (N,16).
+            :return: Trajectory with robot motor indices at the motor side.
+            :rtype: ndarray (N,12).
+        """
+        n_joints = pybullet_trajectory.shape[1]
+        if n_joints != 12 and n_joints != 16:
+            print("Number of joint positions != 12 or 16. Exiting!")
+            exit(-1) 
+
+        source_index, sign = self.get_pybullet_to_robot_joint_mapping(n_joints)
+        return np.ascontiguousarray(pybullet_trajectory[:, source_index] * (sign * 9)) # accounting for gearing
 
 
     def init_starting_params(self):
@@ -429,16 +465,11 @@ class SoloControlClass():
             :return: None.
             :rtype: None.
         """
-        self.in_home_position = False 
-        self.start_sequence = False 
         self.in_motion_trajectory_sequence = False 
         self.sequence_motion_trajectory = None 
         self.sequence_counter = 0 
-        self.end_sequence = False 
         self.going_home = False 
         self.going_zero = False
-        self.interploate_zero_complete = False
-        self.completed_phase_1_exit = True 
         self.name_of_calibration_saved_csv = GLOBAL_CALIBRATION_FILES_DIRECTORY+CALIBRATION_PHASE_1_FILE
         self.name_of_offset_calibrated_zeros_csv = GLOBAL_CALIBRATION_FILES_DIRECTORY+CALIBRATION_PHASE_2_FILE
         self.target_position = [0] * self.n_slaves * 2
@@ -448,20 +479,15 @@ class SoloControlClass():
         self.save_time = [] 
         self.data = []
         self.doing_smooth_landing = False 
-        self.interploate_smooth_landing_complete = False 
         self.use_i = False
-        self.finished_smooth_landing = False
         self.diff_threshold = 5.0
-        self.motors_fighting = [False] * self.n_slaves * 2
-        self.interploate_home_complete = False 
-        self.interpolate_home_trajectory = [[None] * self.n_slaves * 2] 
-        self.interpolate_zero_trajectory = [[None] * self.n_slaves * 2] 
-        self.interpolate_landing_trajectory = [[None] * self.n_slaves * 2] 
+        self.fighting_detector = MotorFightingDetectorClass(self.n_slaves*2, diff_threshold=self.diff_threshold, debounce_ticks=MOTOR_FIGHTING_DEBOUNCE)
+        self.interpolate_home_trajectory = None
+        self.interpolate_zero_trajectory = None
+        self.interpolate_landing_trajectory = None
         self.motor_pos = [0] * self.n_slaves * 2
         self.program_complete = False 
         self.trigger_is_triggered = False 
-        self.imu_data = []
-        self.do_zero_position_after_calibration = False
 
         self.adc_trigger_threshold = 0.50
 
@@ -503,8 +529,14 @@ class SoloControlClass():
             :rtype: None.
         """
         self.state = 0 # State of the system (ready (1) or not (0))
-        self.global_motor_i = 0
-        os.nice(-20)  #  Set the process to highest priority (from -20 highest to +20 lowest)
+        try:
+            os.nice(-20)  #  Set the process to highest priority (from -20 highest to +20 lowest)
+        except PermissionError:
+            if not self.use_simulator:
+                raise
+            print("Running simulator without raised process priority.")
+        self.realtime_profile = RealtimeProfileClass(enabled=self.realtime, cpus=REALTIME_CPUS, priority=REALTIME_PRIORITY, period=self.dt, name='solo_control')
+        self.realtime_profile.apply()
         self.init_motor_drivers()
     
 
@@ -520,8 +552,18 @@ class SoloControlClass():
         self.motors_spi_connected_indexes = [] # indexes of the motors on each connected slaves
         self.motors_spi_connected_indexes_array = np.zeros(self.n_slaves*2) # 1 if motor at index is connected
 
-        self.robot_if = mbs.MasterBoardInterface(self.name_interface)
+        if self.use_simulator:
+            self.robot_if = SimulatedMasterBoardInterfaceClass(self.name_interface, n_slaves=self.n_slaves, dt=self.dt)
+        else:
+            self.robot_if = mbs.MasterBoardInterface(self.name_interface)
         self.robot_if.Init()  # Initialization of the interface between the computer and the master board
+        self.scheduler = PeriodicSchedulerClass(self.dt, name='solo_control')
+        self.profiler = LatencyProfilerClass(
+            ['parse_sensor_data', 'state_machine', 'controller', 'save_data', 'send_command'],
+            period = self.dt,
+            report_interval = self.latency_report_interval,
+            name = 'solo_control'
+        )
 
         for i in range(self.n_slaves):  #  We enable each controler driver and its two associated motors
             self.robot_if.GetDriver(i).motor1.SetCurrentReference(0)
@@ -532,12 +574,11 @@ class SoloControlClass():
             self.robot_if.GetDriver(i).SetTimeout(5)
             self.robot_if.GetDriver(i).Enable()
 
-        self.last = time.time()
-
+        self.scheduler.start()
         while (not self.robot_if.IsTimeout() and not self.robot_if.IsAckMsgReceived()):
-            if ((time.time() - self.last) > self.dt):
-                self.last = time.time()
-                self.robot_if.SendInit()
+            self.scheduler.wait()
+            self.robot_if.SendInit()
+        self.last = time.time()
 
         if self.robot_if.IsTimeout():
             print("Timeout while waiting for ack.")
@@ -566,14 +607,34 @@ class SoloControlClass():
         self.seq_ki = 0.0
         self.i_sat = 0.
         self.iq_sat = 12.0
-        self.cur = np.zeros(self.n_slaves*2)
-        self.controller_i = np.zeros(self.n_slaves*2)
-        self.p_err = 0.0
-
-
-    def interpolate_smooth_trajectory(self, prev_sequence=None, next_sequence=None, step_size=1000):
-        """
-            Returns interpolated transition trajectory between two sequences/states.
+        self.solo_controller = SoloControllerClass(
+            self.motors_spi_connected_indexes_array,
+            seq_kp = self.seq_kp,
+            seq_ki = self.seq_ki,
+            seq_kd = self.seq_kd,
+            i_sat = self.i_sat,
+            iq_sat = self.iq_sat
+        )
+        # controller buffers, updated in place every tick
+        self.motor_pos = self.solo_controller.motor_pos
+        self.motor_vel = self.solo_controller.motor_vel
+        self.p_err = self.solo_controller.p_err
+        self.cur = self.solo_controller.cur
+        self.controller_i = self.solo_controller.controller_i
+        # sensor data is read once per tick directly into the controller buffers
+        self.snapshot = RobotSnapshotClass(
+            self.robot_if,
+            self.n_slaves*2,
+            self.motors_spi_connected_indexes,
+            position = self.motor_pos,
+            velocity = self.motor_vel,
+        )
+        self.target_position_with_offset = np.zeros(self.n_slaves*2)
+
+
+    def interpolate_smooth_trajectory(self, prev_sequence=None, next_sequence=None, step_size=1000, profile='linear'):
+        """
+            Returns transition trajectory between two sequences/states. Samples are evaluated in closed form when indexed.
 
             :param prev_sequence: Optional previous sequence.
             :type prev_sequence: list[list[float]] or None.
@@ -581,358 +642,425 @@ class SoloControlClass():
             :type next_sequence: list[list[float]] or None.
             :param step_size: Desired transition time between previous sequence and next_sequence in milli-seconds.
             :type step_size: Integer.
-            :return: Interpolated transition trajectory.
-            :rtype: list[list[float]].
+            :param profile: Transition profile, 'linear', 'cubic' or 'quintic' (minimum jerk).
+            :type profile: str.
+            :return: Transition trajectory.
+            :rtype: TransitionTrajectoryClass.
         """
-        yx = np.arange(0, 2) 
-
         if next_sequence is None:
             next_sequence = self.home_position_trajectory
 
         if prev_sequence is None:
-            prev_sequence = [[self.robot_if.GetMotor(m).GetPosition() for m in range(self.n_slaves*2)]]
-
-        y = [prev_sequence[-1], next_sequence[0]]
-        f = interp1d(yx, y, kind='linear', axis=0)
-
-        interpolate_x = np.arange(0, 1, step=1/step_size, dtype=float)
-        transition_traj = f(interpolate_x)
+            prev_sequence = [self.snapshot.position]
 
-        transition_traj[0] = prev_sequence[-1]
-
-        return transition_traj
+        return TransitionTrajectoryClass(prev_sequence[-1], next_sequence[0], step_size, profile)
 
 
     def controller(self):
         """
-            PD/PID Controller for Robot.
+            PD/PID Controller for Robot. Uses motor positions and velocities of the snapshot read after ParseSensorData.
 
             :return: None.
             :rtype: None.
         """
-        v_ref = 0 # desired velocity
-        self.motor_pos = np.zeros(self.n_slaves*2)
-        motor_vel = np.zeros(self.n_slaves*2)
-
-        # Individual controller gains for different tasks
-        if self.going_home:
-            # self.iq_sat = 1.0
-            self.kp = 4
-            self.ki = 0.0
-            self.kd = 0.03
-
-        elif self.in_motion_trajectory_sequence:
-            # self.iq_sat = 1.0
-            self.kp = self.seq_kp
-            self.ki = self.seq_ki
-            self.kd = self.seq_kd
-
-        elif self.phase_1_calibration or self.phase_2_calibration or self.going_zero or self.doing_smooth_landing:
-            # self.iq_sat = 1.0
-            self.kp = 3
-            self.ki = 0.1
-            self.kd = 0.03
-
-        else: 
-            # self.iq_sat = 1.0
-            self.kp = 4
-            self.ki = 0.0
-            self.kd = 0.03
-        
-
-        for i in range(self.n_slaves*2):
-            self.motor_pos[i] = self.robot_if.GetMotor(i).GetPosition()
-            motor_vel[i] = self.robot_if.GetMotor(i).GetVelocity()
         if self.phase_1_calibration or self.phase_2_calibration or self.going_zero:
-            self.p_err = (self.calibration_target_position - self.motor_pos) * self.motors_spi_connected_indexes_array # 0 for not connected indexes
+            target_position = self.calibration_target_position
         elif self.doing_smooth_landing:
-            self.p_err = (self.target_position - self.motor_pos) * self.motors_spi_connected_indexes_array # 0 for not connected indexes
-        else:      
-            self.target_position = np.array(self.target_position) + np.array(self.calibrated_zero_position)      
-            self.p_err = (self.target_position - self.motor_pos) * self.motors_spi_connected_indexes_array # 0 for not connected indexes
-        
-        if self.phase_2_calibration or self.use_i:  # only use PID when calibrating
-            for i in range(self.n_slaves*2):
-                self.controller_i[i] += self.p_err[i]
-                if self.controller_i[i] > self.i_sat:
-                    self.controller_i[i] = self.i_sat
-                elif self.controller_i[i] < - self.i_sat:
-                    self.controller_i[i] = - self.i_sat  
-        else: # else use PD controller 
-            self.ki = 0
-
-        v_err = (v_ref - motor_vel) * self.motors_spi_connected_indexes_array # 0 for not connected indexes
-        
+            target_position = self.target_position
+        else:
+            np.add(self.target_position, self.calibrated_zero_position, out=self.target_position_with_offset)
+            self.target_position = self.target_position_with_offset
+            target_position = self.target_position
+
         # I part is 0 if not calibrating 
-        self.cur = (self.kp * self.p_err) + (self.ki * self.controller_i) + (self.kd * v_err)
+        self.solo_controller.compute(target_position, self.get_controller_mode(), self.phase_2_calibration or self.use_i)
 
-        for e in range(len(self.cur)):
-            if self.cur[e] > self.iq_sat:
-                self.cur[e] = self.iq_sat
-            elif self.cur[e] < -self.iq_sat:
-                self.cur[e] = -self.iq_sat
-        
-        for i in self.motors_spi_connected_indexes:
-            if self.debug_mode:
-                self.robot_if.GetMotor(i).SetCurrentReference(0.) # sets currents to 0 so nothing happens   
-                # print(self.motor_pos)
-            else:
-                self.robot_if.GetMotor(i).SetCurrentReference(self.cur[i])
+        if self.debug_mode:
+            self.snapshot.write(self.snapshot.zero_current) # sets currents to 0 so nothing happens
+        else:
+            self.snapshot.write(self.cur)
             
         '''
             add anti gravity torque code here
         '''
+
+
+    def get_controller_mode(self):
+        """
+            Returns controller mode which selects individual controller gains for different tasks.
+
+            :return: Controller mode.
+            :rtype: ControllerMode.
+        """
+        if self.going_home:
+            return ControllerMode.HOME
+        elif self.in_motion_trajectory_sequence:
+            return ControllerMode.SEQUENCE
+        elif self.phase_1_calibration or self.phase_2_calibration or self.going_zero or self.doing_smooth_landing:
+            return ControllerMode.CALIBRATION
+        else:
+            return ControllerMode.HOLD
     
 
-    def go_to_zero_position(self):
+    def init_lifecycle(self):
         """
-            Sets target position to zero posiiton by using interpolated trajectory to zero position.
+            Initializes lifecycle state machine. Each state has (enter, update, exit) handlers that are called once per tick.
 
             :return: None.
             :rtype: None.
         """
-        if not self.going_zero:
-            print("Going Zero Position!")
-            self.sequence_counter = 0
-            self.interploate_zero_complete = False 
-            self.new_zero_position = self.calibrated_zero_position
- 
-        if not self.interploate_zero_complete:
-            if self.interpolate_zero_trajectory[0][0] is None:
-                self.interpolate_zero_trajectory = self.interpolate_smooth_trajectory(next_sequence=[self.new_zero_position], step_size=5000)
-                self.sequence_counter = 0 
-                self.going_zero = True 
-                print("Starting interpolated trajectory for 5 seconds!")
-                print("Starting Free Solo Control after 5 seconds. Move platform to landing position and save the press the ADC trigger.")
-                print('---')
-
-            elif self.sequence_counter == len(self.interpolate_zero_trajectory)-1:
-                self.interploate_zero_complete = True 
-                self.sequence_counter = 0
-                self.interpolate_zero_trajectory = [[None] * self.n_slaves * 2]
-                print("Completed interpolated trajectory!")
-            else:
-                self.target_position = self.interpolate_zero_trajectory[self.sequence_counter]
-        else:
-            self.going_zero = True
-         
-            print("Completed zero pos!")
-            print('---')
+        self.lifecycle = StateMachineClass({
+            RunState.INIT: (None, self.update_init, None),
+            RunState.CALIBRATE: (None, self.update_calibration, None),
+            RunState.ZERO: (self.enter_zero_position, self.update_zero_position, None),
+            RunState.HOME: (self.enter_home_position, self.update_home_position, self.exit_home_position),
+            RunState.WAIT_TRIGGER: (self.enter_wait_trigger, self.update_wait_trigger, None),
+            RunState.SEQUENCE: (self.enter_sequence, self.update_sequence, self.exit_sequence),
+            RunState.LAND: (self.enter_smooth_landing, self.update_smooth_landing, None),
+            RunState.DONE: (self.enter_done, None, None),
+        }, RunState.INIT, name='solo_lifecycle')
+
+
+    def is_any_motor_active(self):
+        """
+            Checks if at least one motor on a connected slave is enabled and its SPI transaction did not fail.
+
+            :return: True if lifecycle handlers should run in this tick.
+            :rtype: Bool.
+        """
+        for i in self.motors_spi_connected_indexes:
+            if i % 2 == 0 and self.robot_if.GetDriver(i // 2).GetErrorCode() == 0xf:
+                #print("Transaction with SPI{} failed".format(i // 2))
+                continue #user should decide what to do in that case, here we ignore that motor
+            if self.robot_if.GetMotor(i).IsEnabled():
+                return True
+        return False
+
+
+    def update_init(self):
+        """
+            Selects calibration or loads calibrated zero angles.
+
+            :return: Next state.
+            :rtype: RunState.
+        """
+        if self.phase_1_calibration or self.phase_2_calibration:
+            return RunState.CALIBRATE
+
+        if self.load_calibrated_zero_angles:
+            self.calibrated_zero_position = self.load_offsets(f_name=self.name_of_offset_calibrated_zeros_csv)
+            self.target_position = self.calibrated_zero_position
+            self.load_calibrated_zero_angles = False 
+            self.use_i = False 
+        return RunState.HOME
+
+
+    def update_calibration(self):
+        """
+            Runs calibration phase 1 or 2. Phase 1 saves the index offsets and hands over to free solo control. Phase 2 goes to the calibrated zero position when complete.
+
+            :return: Next state or None.
+            :rtype: RunState or None.
+        """
+        if self.phase_1_calibration:
+            self.run_calibration_synced()
+            if not self.calibration.index_found.all():
+                return None
+
+            self.status.post('calibration_timeline', "{timeline}", timeline=self.calibration.get_timeline_text())
+            self.save_calibrated_offsets(phase=1, f_name=self.name_of_calibration_saved_csv)
+            self.phase_1_calibration = False
+            self.calibrated_zero_position = self.zero_position
+            self.status.post('state', "Calibration Phase 1 Completed. In Free SOLO Control.")
+            self.status.close() # render remaining output before free solo control takes over the console
             self.robot_if.Stop()
-            FreeSoloClass() # call free solo class for saving landing position
+            FreeSoloClass(use_simulator=self.use_simulator, realtime=self.realtime)
             exit(1)
 
+        if self.calibrated_offsets == []:
+            self.calibrated_offsets = self.load_offsets(f_name=self.name_of_calibration_saved_csv)
+        self.run_calibration_synced() # sets phase_2_calibration to False when complete
+
+        if not self.phase_2_calibration:
+            return RunState.ZERO
+        return None
 
-    def go_to_home_position(self):
+
+    def enter_zero_position(self):
         """
-            Sets target position to home posiiton by using interpolated trajectory to home position.
+            Starts interpolated trajectory to calibrated zero position.
 
             :return: None.
             :rtype: None.
         """
-        if not self.going_home:
-            print("Going Home!")
-            self.sequence_counter = 0
-            self.interploate_home_complete = False 
- 
-        if not self.interploate_home_complete:
-            if self.interpolate_home_trajectory[0][0] is None:
-                self.interpolate_home_trajectory = self.interpolate_smooth_trajectory(next_sequence=[self.smooth_home_pos], step_size=TIME_INTERPOLATE_HOME)
-                self.sequence_counter = 0 
-                self.going_home = True 
-                print("Starting interpolated trajectory!")
-                print('---')
-
-            elif self.sequence_counter == len(self.interpolate_home_trajectory)-1:
-                self.interploate_home_complete = True 
-                self.sequence_counter = 0
-                self.interpolate_home_trajectory = [[None] * self.n_slaves * 2]
-                print("Completed interpolated trajectory!")
-            else:
-                self.target_position = self.interpolate_home_trajectory[self.sequence_counter]
-        else:
-            self.going_home = True
-         
-            print("Completed homing!")
-            print('---')
-            self.in_home_position = True
-            self.going_home = False
+        self.status.post('state', "Going Zero Position!")
+        self.new_zero_position = self.calibrated_zero_position
+        self.interpolate_zero_trajectory = self.interpolate_smooth_trajectory(next_sequence=[self.new_zero_position], step_size=5000)
+        self.sequence_counter = 0 
+        self.going_zero = True 
+        self.status.post('state', "Starting interpolated trajectory for 5 seconds!\nStarting Free Solo Control after 5 seconds. Move platform to landing position and save the press the ADC trigger.\n---")
 
-            if self.sequence_motion_trajectory is not None: 
-                self.sequence_counter = 0
-                self.start_sequence = True
-                self.in_motion_trajectory_sequence = True 
 
+    def update_zero_position(self):
+        """
+            Sets target position to zero position by using interpolated trajectory to zero position. Hands over to free solo control for saving the landing position when complete.
 
-    def do_smooth_landing(self):
+            :return: None.
+            :rtype: None.
         """
-            Sets target position to smooth landing position by using interpolated trajectory to smooth landing position.
+        if self.sequence_counter != len(self.interpolate_zero_trajectory)-1:
+            self.target_position = self.interpolate_zero_trajectory[self.sequence_counter]
+            return None
+
+        self.sequence_counter = 0
+        self.interpolate_zero_trajectory = None
+        self.status.post('state', "Completed interpolated trajectory!\nCompleted zero pos!\n---")
+        self.status.close() # render remaining output before free solo control takes over the console
+        self.robot_if.Stop()
+        FreeSoloClass(use_simulator=self.use_simulator, realtime=self.realtime) # call free solo class for saving landing position
+        exit(1)
+
+
+    def enter_home_position(self):
+        """
+            Starts interpolated trajectory to home position.
 
             :return: None.
             :rtype: None.
         """
-        if not self.doing_smooth_landing:
-            if self.global_motor_i == 4:
-                print("Doing Smooth Landing!")
-            self.sequence_counter = 0
-            self.interploate_smooth_landing_complete = False 
+        self.status.post('state', "Going Home!")
+        self.interpolate_home_trajectory = self.interpolate_smooth_trajectory(next_sequence=[self.smooth_home_pos], step_size=TIME_INTERPOLATE_HOME, profile=TRANSITION_PROFILE_HOME)
+        self.sequence_counter = 0 
+        self.going_home = True 
+        self.status.post('state', "Starting interpolated trajectory!\n---")
 
-        if self.finished_smooth_landing:
-            if self.global_motor_i == 4:
-                print("Program completed!")
-                self.program_complete = True 
-            return
 
-        else:
-            if not self.interploate_smooth_landing_complete:
-                if self.interpolate_landing_trajectory[0][0] is None:
-                    self.interpolate_landing_trajectory = self.interpolate_smooth_trajectory(next_sequence=[self.smooth_landing_pos], step_size=TIME_INTERPOLATE_LANDING)
-                    self.sequence_counter = 0 
-                    self.doing_smooth_landing = True 
-                    print('---')
-                elif self.sequence_counter == len(self.interpolate_landing_trajectory)-1:
-                    self.finished_smooth_landing = True 
-                    print("Completed interpolated trajectory!")
-                else:
-                    self.target_position = self.interpolate_landing_trajectory[self.sequence_counter]
+    def update_home_position(self):
+        """
+            Sets target position to home position by using interpolated trajectory to home position.
+
+            :return: RunState.WAIT_TRIGGER when home position is reached, else None.
+            :rtype: RunState or None.
+        """
+        if self.sequence_counter == len(self.interpolate_home_trajectory)-1:
+            return RunState.WAIT_TRIGGER
+        self.target_position = self.interpolate_home_trajectory[self.sequence_counter]
+        return None
 
 
-    def get_imu_data(self):
+    def exit_home_position(self):
         """
-            Gets data from imu and stores in imu_data list.  
+            Finishes interpolated trajectory to home position.
 
             :return: None.
             :rtype: None.
         """
-        self.imu_data = [] 
-        for ii in range(3):
-            self.imu_data.append(self.robot_if.imu_data_accelerometer(ii))
-        for ii in range(3):
-            self.imu_data.append(self.robot_if.imu_data_gyroscope(ii))
-        for ii in range(3):
-            self.imu_data.append(self.robot_if.imu_data_attitude(ii))
-        for ii in range(3):
-            self.imu_data.append(self.robot_if.imu_data_linear_acceleration(ii))
-        
-        
-    def save_pos_in_arr(self):
+        self.sequence_counter = 0
+        self.interpolate_home_trajectory = None
+        self.going_home = False
+        self.status.post('state', "Completed interpolated trajectory!\nCompleted homing!\n---")
+
+
+    def enter_wait_trigger(self):
         """
-            Saves joint angles into csv file.
+            Switches to sequence controller gains, which are already used while holding the home position. Collects garbage before the sequence (real-time profile).
 
             :return: None.
             :rtype: None.
         """
-        if not self.phase_0_calibration and not self.phase_1_calibration and not self.phase_2_calibration and self.trigger_is_triggered:
-            line = [self.counter, *self.motor_pos, *self.target_position, *self.cur, *self.imu_data, self.robot_if.GetDriver(3).adc[0]]
-            self.data_writer.writerow(line)
-            self.data_writer_c.writerow(line)
+        self.in_motion_trajectory_sequence = True 
+        self.realtime_profile.collect()
 
 
-    def start_sequence_motion_trajectory(self):
+    def update_wait_trigger(self):
         """
-            Sets target position to sequence motion trajectory.
+            Maintains home position until ADC trigger is pressed.
+
+            :return: RunState.SEQUENCE when triggered, else None.
+            :rtype: RunState or None.
+        """
+        self.maintain_home_position()
+        self.read_trigger_signal()
+        if self.trigger_is_triggered:
+            return RunState.SEQUENCE
+        return None
+
+
+    def enter_sequence(self):
+        """
+            Starts sequence motion trajectory. The garbage collector is disabled during the sequence (real-time profile).
 
             :return: None.
             :rtype: None.
         """
-        self.start_sequence = False 
-        self.in_home_position = False 
+        self.sequence_counter = 0
         self.in_motion_trajectory_sequence = True 
+        self.fighting_detector.reset()
+        self.realtime_profile.disable_gc()
+        self.status.post('state', "Running sequence ... \n---\nSequence Start Time: {start_time}", start_time=self.sequence_start_time)
 
-        if self.sequence_counter != len(self.sequence_motion_trajectory):
-            self.target_position = np.array(self.sequence_motion_trajectory[self.sequence_counter])
-        else:
-            self.sequence_counter = 0 
-            self.in_motion_trajectory_sequence = False  
-            self.end_sequence = True 
-            self.sequence_end_time = time.time()
+
+    def update_sequence(self):
+        """
+            Sets target position to sequence motion trajectory.
+
+            :return: RunState.LAND when sequence is complete or motors are fighting, else None.
+            :rtype: RunState or None.
+        """
+        if self.sequence_counter == len(self.sequence_motion_trajectory):
+            return RunState.LAND
+
+        if self.check_motor_torques() and MOTOR_FIGHTING_LANDING:
+            self.status.post('state', "Motors fighting! Stopping sequence and landing.")
+            return RunState.LAND
+
+        self.target_position = np.array(self.sequence_motion_trajectory[self.sequence_counter])
+        if self.sequence_counter % 1000 == 0:
+            self.status.post('sequence_run_time', "Sequence Run Time: {run_time} s.", run_time=int(self.last - self.sequence_start_time))
+        return None
+
+
+    def exit_sequence(self):
+        """
+            Finishes sequence motion trajectory and enables the garbage collector again.
+
+            :return: None.
+            :rtype: None.
+        """
+        self.sequence_counter = 0 
+        self.in_motion_trajectory_sequence = False  
+        self.sequence_end_time = time.time()
+        self.realtime_profile.enable_gc()
+        self.status.post('state', "Sequence completed!\n---\nSequence End Time:  {end_time}\nTotal Sequence Runtime: {run_time}\n---", end_time=self.sequence_end_time, run_time=self.sequence_end_time - self.sequence_start_time)
+
+
+    def enter_smooth_landing(self):
+        """
+            Starts interpolated trajectory to smooth landing position.
+
+            :return: None.
+            :rtype: None.
+        """
+        self.status.post('state', "Doing Smooth Landing!\n---")
+        self.interpolate_landing_trajectory = self.interpolate_smooth_trajectory(next_sequence=[self.smooth_landing_pos], step_size=TIME_INTERPOLATE_LANDING, profile=TRANSITION_PROFILE_LANDING)
+        self.sequence_counter = 0 
+        self.doing_smooth_landing = True 
+
+
+    def update_smooth_landing(self):
+        """
+            Sets target position to smooth landing position by using interpolated trajectory to smooth landing position.
+
+            :return: RunState.DONE when landing position is reached, else None.
+            :rtype: RunState or None.
+        """
+        if self.sequence_counter == len(self.interpolate_landing_trajectory)-1:
+            self.status.post('state', "Completed interpolated trajectory!")
+            return RunState.DONE
+        self.target_position = self.interpolate_landing_trajectory[self.sequence_counter]
+        return None
+
+
+    def enter_done(self):
+        """
+            Ends main loop.
+
+            :return: None.
+            :rtype: None.
+        """
+        self.status.post('state', "Program completed!")
+        self.program_complete = True 
+
+
+    def save_pos_in_arr(self):
+        """
+            Copies joint angles, target angles, currents, imu, and adc data into a telemetry slot. The data log is written on the telemetry writer thread.
+
+            :return: None.
+            :rtype: None.
+        """
+        if not self.phase_0_calibration and not self.phase_1_calibration and not self.phase_2_calibration and self.trigger_is_triggered:
+            slot_index = self.telemetry.get_slot()
+            if slot_index is None: # writer thread is behind, sample is dropped and counted
+                return
+            row = self.telemetry.slots[slot_index]
+            row[0] = self.counter
+            row[1:13] = self.motor_pos
+            row[13:25] = self.target_position
+            row[25:37] = self.cur
+            row[37:49] = self.snapshot.imu
+            row[49] = self.snapshot.adc
+            self.telemetry.submit(slot_index)
+
+
+    def close_data_log(self):
+        """
+            Stops telemetry writer, closes binary data log and converts it into solo data csv file for post processing.
+
+            :return: None.
+            :rtype: None.
+        """
+        if self.telemetry is not None:
+            self.telemetry.close()
+            self.telemetry = None
+        if self.data_log is None:
+            return
+        self.data_log.close()
+        if self.data_log.n_rows > 0:
+            print("Converting data log:", self.solo_log_file, "->", self.solo_output_file)
+            convert_log_to_csv(self.solo_log_file, self.solo_output_file)
+        self.data_log = None
 
 
     def check_motor_torques(self):
         """
-            Checks motor torques and prints warning output if motors are fighting against each other.
+            Checks position errors of motors and posts a fault event if motors are fighting against each other. Uses the position errors of the last controller tick.
 
-            :return: Returns whether motors are fighting or not.
+            :return: True if motors started fighting in this tick.
             :rtype: Bool.
         """
-        offset_i_arr = []
-        avg_offset_not_i_arr = []
-        for motor_i_to_check in range(self.n_slaves*2):
-            offset_i = abs(self.p_err[motor_i_to_check])
-            offset_arr_not_i = list([abs(self.p_err[motor_j]) for motor_j in range(self.n_slaves*2) if motor_j!= motor_i_to_check])
-            avg_offset_not_i = np.average(offset_arr_not_i)
-            if offset_i > 2 * avg_offset_not_i and offset_i > self.diff_threshold:
-                self.motors_fighting[motor_i_to_check] = True  
-            else:
-                self.motors_fighting[motor_i_to_check] = False
-            offset_i_arr.append(offset_i)
-            avg_offset_not_i_arr.append(avg_offset_not_i)
-
-        # print debugger
-        if any(self.motors_fighting):
-            print("    Motor no.    Motor name.    Diff i.    Diff !i    Diff threshold")
-            for motor_i in range(self.n_slaves*2):
-                if self.motors_fighting[motor_i]: 
-                    flag='  ->' 
-                else: 
-                    flag='    '
-                print(flag, '   ', motor_i, '       ', self.motor_mapping[motor_i], '       %.3f'% offset_i_arr[motor_i], '       %.3f'% avg_offset_not_i_arr[motor_i], '         ', self.diff_threshold)
-        are_motors_fighting = any(self.motors_fighting)
-        self.motors_fighting = [False] * self.n_slaves * 12
-        return are_motors_fighting # return true if any motors are fighting, else return false
+        if not self.fighting_detector.update(self.p_err):
+            return False
+        self.status.post('motors_fighting', self.format_motors_fighting, **self.fighting_detector.fault)
+        return True
+
+
+    def format_motors_fighting(self, tick, motors, fighting, abs_err, avg_err_not_i, diff_threshold):
+        """
+            Formats table of motors fighting against each other. Called by the render thread of the status channel.
+
+            :return: Table text.
+            :rtype: str.
+        """
+        lines = ["Motors fighting at tick " + str(tick) + ": " + str(motors), "    Motor no.    Motor name.    Diff i.    Diff !i    Diff threshold"]
+        for motor_i in range(len(abs_err)):
+            flag = '  ->' if fighting[motor_i] else '    '
+            lines.append(' '.join([flag, '   ', str(motor_i), '       ', str(self.motor_mapping[motor_i]), '       %.3f'% abs_err[motor_i], '       %.3f'% avg_err_not_i[motor_i], '         ', str(diff_threshold)]))
+        return "\n".join(lines)
 
 
     def run_calibration_synced(self):
         """
-            Calls calibration process in sync for hip joints, lower leg joints, and upper leg joint. Used in Calibration Phase 1 and 2.
+            Runs one tick of calibration engine, which detects motor indices and calibrates hip joints, lower leg joints, and upper leg joints one after the other. Used in Calibration Phase 1 and 2.
 
             :return: None.
             :rtype: None.
         """
-        hips = [0, 1, 6, 7]
-        lower_ls = [2, 4, 8, 10]
-        upper_ls = [3, 5, 9, 11]
-
-        if self.phase_1_calibration:
-            if not self.calibrated_hips_phase_1 and not self.calibrated_lower_ls_phase_1 and not self.calibrated_upper_ls_phase_1:
-                self.calibrate_together(hips)
-            if self.calibrated_hips_phase_1 and not self.calibrated_lower_ls_phase_1 and not self.calibrated_upper_ls_phase_1:
-                self.calibrate_together(lower_ls)
-            if self.calibrated_hips_phase_1 and self.calibrated_lower_ls_phase_1 and not self.calibrated_upper_ls_phase_1: 
-                self.calibrate_together(upper_ls)
-            
-            if self.calibrated_hips_phase_1 and self.calibrated_lower_ls_phase_1 and self.calibrated_upper_ls_phase_1:
-                return
-        
-        elif self.phase_2_calibration:
-                
-            if not self.calibrated_hips_phase_2 and not self.calibrated_lower_ls_phase_2 and not self.calibrated_upper_ls_phase_2:             
-                self.calibrate_together(hips)
-
-            if self.calibrated_hips_phase_2 and not self.calibrated_lower_ls_phase_2 and not self.calibrated_upper_ls_phase_2:
-                if not self.calibrated_hips_phase_2_prev == self.calibrated_hips_phase_2:
-                    self.calibration_target_position = self.zero_position       
-                self.calibrate_together(lower_ls)
-
-            if self.calibrated_hips_phase_2 and self.calibrated_lower_ls_phase_2 and not self.calibrated_upper_ls_phase_2: 
-                if not self.calibrated_lower_ls_phase_2_prev == self.calibrated_lower_ls_phase_2:
-                    self.calibration_target_position = self.zero_position   
-                self.calibrate_together(upper_ls)
-            self.calibrated_hips_phase_2_prev = self.calibrated_hips_phase_2
-            self.calibrated_lower_ls_phase_2_prev = self.calibrated_lower_ls_phase_2
-            
-            if self.calibrated_hips_phase_2 and self.calibrated_lower_ls_phase_2 and self.calibrated_upper_ls_phase_2:
-                self.set_calibrated_zero_pos()
+        if self.calibration.step(self.robot_if):
+            self.status.post('index_found', "Phase {phase} Calibration Array: {indices}", phase=self.calibration.phase, indices=self.calibration.get_index_array())
+        self.calibration_target_position = self.calibration.target_position
 
-                self.use_i = True
-                self.calibrated_zero_position = self.calibration_target_position
-                self.target_position = self.calibrated_zero_position
-                
-                self.phase_2_calibration = False
-                if not self.offsets_to_calibrated_zeros_saved:
-                    self.save_calibrated_offsets(phase=2, f_name=self.name_of_offset_calibrated_zeros_csv)
+        if self.phase_2_calibration and self.calibration.complete:
+            self.status.post('calibration_timeline', "{timeline}", timeline=self.calibration.get_timeline_text())
+            self.set_calibrated_zero_pos()
 
-                return
+            self.use_i = True
+            self.calibrated_zero_position = self.calibration_target_position
+            self.target_position = self.calibrated_zero_position
+            
+            self.phase_2_calibration = False
+            if not self.offsets_to_calibrated_zeros_saved:
+                self.save_calibrated_offsets(phase=2, f_name=self.name_of_offset_calibrated_zeros_csv)
 
 
     def set_calibrated_zero_pos(self):
@@ -950,7 +1078,7 @@ class SoloControlClass():
         max_angle = starting_position + self.max_motor_angle * sign_indices
 
         calibration_offset = self.calibrated_offsets
-        index_found_at = self.phase_2_index_calibration_array
+        index_found_at = self.calibration.get_index_array()
         tolerance = self.tolerance_for_startup_position
 
         if any(index_found_a == None for index_found_a in index_found_at):
@@ -995,176 +1123,9 @@ class SoloControlClass():
 
             self.calibration_target_position[i] = calibrated_zero_position
 
-            print('motor index', i, 'zero_calc:', calibrated_zero_position, 'index found at:', index_found_at[i], 'calibration_offset', calibration_offset[i])
-
-
-    def calibrate_together(self, motor_arr):
-        """
-            Runs actual calibration process where target position is updated with small steps until either maximum or minimum angle threshold is reached, or until all motor indices are found. 
-
-            :param motor_arr: A list of motor ids that need to be calibrated together (hips, upper legs, lower legs).
-            :type motor_arr: list[int].
-            :return: None.
-            :rtype: None.
-        """
-        if self.counter % 1 == 0 and ((self.global_motor_i+1) % 12) == 0: 
-
-            if not self.reset_calibration_complete:
-                self.reset_calibration(motor_arr)
-                return 
-            else:
-                self.reset_calibration_counter = -1
-
-            motor_angles = [] # stores current motor angles 
-            for motor_angles_index, actual_motor_i in enumerate(motor_arr):
-                m_angle = self.robot_if.GetMotor(actual_motor_i).GetPosition()  
-                motor_angles.append(m_angle) 
-
-            if self.check_is_motor_arr_complete(motor_arr):
-                print("Motor indices array is complete")
-                self.reset_calibration_complete = False 
-
-            # go 1 direction
-            if self.move_in_max_dir:  
-                # print("Move in forward direction")
-                if any(motor_angles[mi] < self.max_motor_angle for mi in range(len(motor_angles)) if mi%2 == 0):
-                    # move in forward direction 
-                    for motor_angles_index, actual_motor_i in enumerate(motor_arr):
-                        if motor_angles_index % 2 == 0:
-                            self.calibration_joint_offset_array[actual_motor_i] += self.calibration_joint_offset_step_value
-                        elif motor_angles_index % 2 != 0:
-                            self.calibration_joint_offset_array[actual_motor_i] -= self.calibration_joint_offset_step_value
-                    self.calibration_target_position = np.asarray(self.calibration_target_position) + np.asarray(self.calibration_joint_offset_array)
-                else:
-                    print('All motor anges > max')
-                    self.move_in_max_dir = False 
-                    self.calibration_joint_offset_array = [0]*self.n_slaves*2 
-
-            # go other direction 
-            elif not self.move_in_max_dir:
-                # print("Move in opposite direction")
-                if any(motor_angles[mi] > self.min_motor_angle for mi in range(len(motor_angles)) if mi%2 == 0):
-                    # move in backwards direction 
-                    for motor_angles_index, actual_motor_i in enumerate(motor_arr):
-                        if motor_angles_index % 2 == 0:
-                            self.calibration_joint_offset_array[actual_motor_i] -= self.calibration_joint_offset_step_value
-                        elif motor_angles_index % 2 != 0:
-                            self.calibration_joint_offset_array[actual_motor_i] += self.calibration_joint_offset_step_value
-
-                    self.calibration_target_position = np.asarray(self.calibration_target_position) + np.asarray(self.calibration_joint_offset_array)
-                else:
-                    print('All motor anges < min')
-                    self.reset_calibration_complete = False 
-
-
-    def check_is_motor_arr_complete(self, motor_arr):
-        """
-            Checks if all motor indices are found for motors with id specified in motor_arr.
-
-            :param motor_arr: A list of motor ids to check if all motor indices are found.
-            :type motor_arr: list[int].
-            :return: Returns True if all motor indices are found and False if all motor indices are not found.
-            :rtype: Bool.
-        """
-        if self.phase_1_calibration:
-            return not any(list([self.index_calibration_array[m] is None for m in motor_arr])) 
-        elif self.phase_2_calibration:
-            return not any(list([self.phase_2_index_calibration_array[m] is None for m in motor_arr])) 
-
-
-    def reset_calibration(self, motor_arr):
-        """
-            Resets temporary calibration arrays and parameters after one calibration step is complete. Interpolates smooth trajectory to go back to calibration position after each calibration step is complete.
-
-            :param motor_arr: A list of motor ids which will be moved back to calibration position after interpolation.
-            :type motor_arr: list[int].
-            :return: None.
-            :rtype: None.
-        """
-        if self.reset_calibration_counter == 0 and self.smooth_reset_trajectory[0][0] is None:
-            print("Interpolated smooth reset calibration.")
-            self.smooth_reset_trajectory = self.interpolate_smooth_trajectory(next_sequence=[self.zero_position], step_size=2000)
-
-        if (self.reset_calibration_counter != len(self.smooth_reset_trajectory)-1) or (self.reset_calibration_counter == 0):
-            self.calibration_target_position = self.smooth_reset_trajectory[self.reset_calibration_counter]
-        else:
-            self.reset_calibration_complete = True 
-            self.smooth_reset_trajectory = [[None] * self.n_slaves * 2] 
-
-        if self.reset_calibration_complete:
-            if self.phase_1_calibration:
-                if motor_arr[0] == 0: self.calibrated_hips_phase_1 = True 
-                elif motor_arr[0] == 2: self.calibrated_lower_ls_phase_1 = True 
-                elif motor_arr[0] == 3: self.calibrated_upper_ls_phase_1 = True 
-                self.print_calibration_status(self.calibrated_hips_phase_1, self.calibrated_upper_ls_phase_1, self.calibrated_lower_ls_phase_1)
-            elif self.phase_2_calibration:
-                if motor_arr[0] == 0: self.calibrated_hips_phase_2 = True 
-                elif motor_arr[0] == 2: self.calibrated_lower_ls_phase_2 = True 
-                elif motor_arr[0] == 3: self.calibrated_upper_ls_phase_2 = True 
-                self.print_calibration_status(self.calibrated_hips_phase_2, self.calibrated_upper_ls_phase_2, self.calibrated_lower_ls_phase_2)
-            
-            self.move_in_max_dir = True
-            self.calibration_counter_i += 1
-            self.calibration_counter_j = 0
-            self.calibration_joint_offset_array = [0] * self.n_slaves *2
+            self.status.post('calibrated_zero_position', "motor index {motor} zero_calc: {zero_position} index found at: {index_position} calibration_offset {offset}", motor=i, zero_position=calibrated_zero_position, index_position=index_found_at[i], offset=calibration_offset[i])
 
-            self.reset_calibration_counter = -1
 
-            print('---')
-
-        
-    def print_calibration_status(self, hips, upper, lower):
-        """
-            Prints calibration status for hips, upper, and lower legs. 
-
-            :param hips: True if hips are calibrated, False if not. 
-            :type hips: Bool.
-            :param upper: True if upper legs are calibrated, False if not. 
-            :type upper: Bool.
-            :param lower: True if lower legs are calibrated, False if not. 
-            :type lower: Bool.
-            :return: None.
-            :rtype: None.
-        """
-        print("Hips Calibrated       :", hips)
-        print("Upper Legs Calibrated :", upper)
-        print("Lower Legs Calibrated :", lower)
-
-
-    def fill_index_calibration(self):
-        """
-            Checks if motor index has been detected and fills index_calibration_array if index is found.
-
-            :return: None.
-            :rtype: None.
-        """
-        for i in range(self.n_slaves*2):
-            if self.robot_if.GetMotor(i).HasIndexBeenDetected():
-                if self.phase_1_calibration:
-                    if self.index_calibration_array[i] is None: # if array not filled 
-                        self.index_calibration_array[i] = self.robot_if.GetMotor(i).GetPosition() # in rad 
-                        print("Phase 1 Calibration Array:",self.index_calibration_array)
-                elif self.phase_2_calibration:
-                    if self.phase_2_index_calibration_array[i] is None: # if array not filled 
-                        self.phase_2_index_calibration_array[i] = self.robot_if.GetMotor(i).GetPosition() # in rad 
-                        print("Phase 2 Calibration Array:",self.phase_2_index_calibration_array)
-
-
-    def is_calibration_complted(self, cali_array):
-        """
-            Checks if calibration array is filled.
-
-            :param cali_array: Calibration array is filled with motor position (float) if found index, else is None 
-            :type cali_array: list[None, float].
-            :return: Returns True if all motor indices are found and False if all motor indices are not found.
-            :rtype: Bool.
-        """
-        for i in range(self.n_slaves*2):
-            if cali_array[i] is None:
-                return False 
-        return not self.phase_2_calibration
-
-    
     def read_trigger_signal(self): 
         """
             Reads ADC trigger from masterboard and sets trigger_is_triggered if trigger is detected.  
@@ -1172,15 +1133,13 @@ class SoloControlClass():
             :return: None.
             :rtype: None.
         """
-        if ((self.counter % 3000) == 0 and self.global_motor_i == 4):            
-            print("Waiting for ADC trigger.")
-            print("---")
+        if (self.counter % 3000) == 0:
+            self.status.post('wait_trigger', "Waiting for ADC trigger.\n---")
 
-        if (self.robot_if.GetDriver(3).adc[0]) > self.adc_trigger_threshold:
-            print("ADC Triggered! Starting Sequence Movement...")
+        if self.snapshot.adc > self.adc_trigger_threshold:
             self.trigger_is_triggered = True
             self.sequence_start_time = time.time()
-            print("---")
+            self.status.post('trigger', "ADC Triggered! Starting Sequence Movement...\n---")
 
 
     def load_offsets(self, f_name):
@@ -1228,7 +1187,7 @@ class SoloControlClass():
         f = open(f_name, 'w')
         writer = csv.writer(f)
         if phase == 1:
-            row = self.index_calibration_array
+            row = self.calibration.get_index_array()
             writer.writerow(row)
             f.close()
             self.calibrated_offsets_saved = True
@@ -1237,7 +1196,7 @@ class SoloControlClass():
             writer.writerow(row)
             f.close() 
             self.offsets_to_calibrated_zeros_saved = True
-        print("Phase", phase, "~ Calibration saved as:", f_name, "!")
+        self.status.post('calibration_saved', "Phase {phase} ~ Calibration saved as: {file_name} !", phase=phase, file_name=f_name)
 
 
     def print_debugger(self):
@@ -0,0 +1,170 @@
+"""
+    Binary data log for solo control.
+"""
+
+import os
+import csv
+import shutil
+import argparse
+import numpy as np
+
+SOLO_DATA_HEADER = [
+    "timestamp[0]",
+    "pos_bl_hip[1]", "pos_br_hip", "pos_bl_lower", "pos_bl_upper", "pos_br_lower", "pos_br_upper", "pos_fl_hip", "pos_fr_hip", "pos_fl_lower", "pos_fl_upper", "pos_fr_lower", "pos_fr_upper",
+    "target_pos_bl_hip[13]", "target_pos_br_hip", "target_pos_bl_lower", "target_pos_bl_upper", "target_pos_br_lower", "target_pos_br_upper", "target_pos_fl_hip", "target_pos_fr_hip", "target_pos_fl_lower", "target_pos_fl_upper", "target_pos_fr_lower", "target_pos_fr_upper",
+    "current_A_bl_hip[25]", "current_A_br_hip", "current_A_bl_lower", "current_A_bl_upper", "current_A_br_lower", "current_A_br_upper", "current_A_fl_hip", "current_A_fr_hip", "current_A_fl_lower", "current_A_fl_upper", "current_A_fr_lower", "current_A_fr_upper",
+    "imu_accelerometer_x[37]", "imu_accelerometer_y", "imu_accelerometer_z", "imu_gyroscope_x", "imu_gyroscope_y", "imu_gyroscope_z", "imu_attitude_x", "imu_attitude_y", "imu_attitude_z", "imu_linear_acceleration_x", "imu_linear_acceleration_y", "imu_linear_acceleration_z",
+    "adc[49]"
+]
+SOLO_DATA_N_COLUMNS = len(SOLO_DATA_HEADER)
+
+NPY_HEADER_SIZE = 128 # fixed size of .npy header so that the row count can be patched in place on close
+
+
+def get_npy_header(n_rows, n_columns):
+    """
+        Returns a fixed size .npy (version 1.0) header for a C-ordered float64 array.
+
+        :param n_rows: Number of rows.
+        :type n_rows: int.
+        :param n_columns: Number of columns.
+        :type n_columns: int.
+        :return: Header bytes of length NPY_HEADER_SIZE.
+        :rtype: bytes.
+    """
+    header = "{'descr': '<f8', 'fortran_order': False, 'shape': (%d, %d), }" % (n_rows, n_columns)
+    prefix_len = 10 # magic string (6) + version (2) + header length (2)
+    header = header.ljust(NPY_HEADER_SIZE - prefix_len - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + np.uint16(len(header)).astype('<u2').tobytes() + header.encode('latin1')
+
+
+class SoloDataLogClass():
+
+    def __init__(self,
+        log_file_name,
+        history_file_name = None,
+        n_columns = SOLO_DATA_N_COLUMNS,
+        chunk_size = 1000,
+    ):
+        """
+            Fixed schema float64 log. Rows are copied into a preallocated buffer that is flushed to a memory-mappable .npy file once per chunk.
+
+            :param log_file_name: Name of .npy file to write.
+            :type log_file_name: str.
+            :param history_file_name: Optional name of history file that is hard linked (or copied) to the log file on close.
+            :type history_file_name: str or None.
+            :param n_columns: Number of columns per row.
+            :type n_columns: int.
+            :param chunk_size: Number of rows buffered before they are written to disk.
+            :type chunk_size: int.
+        """
+        self.log_file_name = log_file_name
+        self.history_file_name = history_file_name
+        self.n_columns = n_columns
+        self.chunk_size = chunk_size
+
+        self.buffer = np.zeros((self.chunk_size, self.n_columns))
+        self.buffer_index = 0
+        self.n_rows = 0
+
+        if os.path.exists(self.log_file_name):
+            os.remove(self.log_file_name) # new inode, history links of previous runs stay untouched
+        self.log_file = open(self.log_file_name, 'wb')
+        self.log_file.write(get_npy_header(0, self.n_columns))
+
+
+    def get_row(self):
+        """
+            Returns the next free row of the buffer. The caller fills it in place, the row is counted as written.
+
+            :return: View of the next row.
+            :rtype: ndarray (n_columns,).
+        """
+        if self.buffer_index == self.chunk_size:
+            self.flush()
+        row = self.buffer[self.buffer_index]
+        self.buffer_index += 1
+        return row
+
+
+    def write_row(self, values):
+        """
+            Copies one row of values into the buffer.
+
+            :param values: Row values.
+            :type values: list[float] or ndarray (n_columns,).
+            :return: None.
+            :rtype: None.
+        """
+        self.get_row()[:] = values
+
+
+    def flush(self):
+        """
+            Writes all buffered rows to the log file.
+
+            :return: None.
+            :rtype: None.
+        """
+        if self.buffer_index == 0:
+            return
+        self.buffer[:self.buffer_index].tofile(self.log_file)
+        self.n_rows += self.buffer_index
+        self.buffer_index = 0
+
+
+    def close(self):
+        """
+            Flushes remaining rows, writes the final row count into the .npy header and creates the history file.
+
+            :return: None.
+            :rtype: None.
+        """
+        if self.log_file is None:
+            return
+        self.flush()
+        self.log_file.seek(0)
+        self.log_file.write(get_npy_header(self.n_rows, self.n_columns))
+        self.log_file.close()
+        self.log_file = None
+
+        if self.history_file_name is not None:
+            try:
+                os.link(self.log_file_name, self.history_file_name)
+            except OSError:
+                shutil.copyfile(self.log_file_name, self.history_file_name)
+
+
+def convert_log_to_csv(log_file_name, csv_file_name, header = SOLO_DATA_HEADER):
+    """
+        Converts binary solo data log into csv file with the solo_data.csv layout.
+
+        :param log_file_name: Name of .npy file to read.
+        :type log_file_name: str.
+        :param csv_file_name: Name of csv file to write.
+        :type csv_file_name: str.
+        :param header: Header row of csv file.
+        :type header: list[str].
+        :return: None.
+        :rtype: None.
+    """
+    data = np.load(log_file_name, mmap_mode='r')
+    data_file = open(csv_file_name, 'w')
+    data_writer = csv.writer(data_file)
+    data_writer.writerow(header)
+    for row in data:
+        line = row.tolist()
+        line[0] = int(line[0]) # counter
+        data_writer.writerow(line)
+    data_file.close()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Converts binary solo data log into csv file.')
+    parser.add_argument('log_file', help='Name of .npy log file')
+    parser.add_argument('csv_file', help='Name of csv file to write')
+    args = parser.parse_args()
+
+    convert_log_to_csv(args.log_file, args.csv_file)
+    print("Saved Ouptut in file:", args.csv_file)
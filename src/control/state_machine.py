@@ -0,0 +1,91 @@
+"""
+    Table-driven state machine for control loop lifecycles.
+"""
+
+
+class StateMachineClass():
+
+    def __init__(self,
+        handlers,
+        initial_state,
+        name = 'state_machine',
+    ):
+        """
+            State machine that is stepped once per control tick. Every state has optional enter, update, and exit handlers.
+            update returns the next state (or None to stay). On a transition the exit handler of the old state and the enter handler of the new state are called, and the new state is updated in the same tick, so a tick never passes without an update of the current state.
+
+            :param handlers: Maps state to tuple of (enter, update, exit) handlers, each a callable without arguments or None.
+            :type handlers: dict.
+            :param initial_state: State at start. Its enter handler is called on the first step.
+            :type initial_state: enum.IntEnum.
+            :param name: Name used in the report.
+            :type name: str.
+        """
+        self.handlers = handlers
+        self.state = initial_state
+        self.name = name
+        self.max_transitions_per_tick = len(handlers) # guards against transition cycles
+        self.n_ticks = 0
+        self.started = False
+        self.transitions = [] # (tick, previous state, next state)
+
+
+    def step(self):
+        """
+            Runs update handler of current state and follows transitions.
+
+            :return: Current state after step.
+            :rtype: enum.IntEnum.
+        """
+        if not self.started:
+            self.started = True
+            self.call_handler(self.state, 0)
+
+        for _ in range(self.max_transitions_per_tick):
+            next_state = self.call_handler(self.state, 1)
+            if next_state is None or next_state == self.state:
+                break
+            self.transition(next_state)
+
+        self.n_ticks += 1
+        return self.state
+
+
+    def transition(self, next_state):
+        """
+            Calls exit handler of current state, records transition, and calls enter handler of next state.
+
+            :param next_state: Next state.
+            :type next_state: enum.IntEnum.
+            :return: None.
+            :rtype: None.
+        """
+        self.call_handler(self.state, 2)
+        self.transitions.append((self.n_ticks, self.state, next_state))
+        self.state = next_state
+        self.call_handler(self.state, 0)
+
+
+    def call_handler(self, state, handler_index):
+        """
+            Calls enter (0), update (1), or exit (2) handler of state if it is defined.
+
+            :return: Return value of handler.
+            :rtype: enum.IntEnum or None.
+        """
+        handler = self.handlers[state][handler_index]
+        if handler is None:
+            return None
+        return handler()
+
+
+    def print_report(self):
+        """
+            Prints recorded transitions.
+
+            :return: None.
+            :rtype: None.
+        """
+        print("State machine", self.name+":", self.n_ticks, "ticks, state:", self.state.name)
+        for tick, previous_state, next_state in self.transitions:
+            print("    tick %8d: %s -> %s" % (tick, previous_state.name, next_state.name))
@@ -0,0 +1,192 @@
+"""
+    Rate-limited console output and event log for control loops.
+"""
+
+import os
+import json
+import time
+import threading
+import collections
+from control.realtime_profile import *
+
+
+def format_event(message, fields):
+    """
+        Returns text of event.
+
+        :param message: Format string for fields, or function that returns text from fields.
+        :type message: str or function(**fields).
+        :param fields: Values of event.
+        :type fields: dict.
+        :return: Text of event.
+        :rtype: str.
+    """
+    if callable(message):
+        return message(**fields)
+    return message.format(**fields)
+
+
+def print_event(event, message = '', **fields):
+    """
+        Prints event immediately. Same interface as StatusChannelClass.post for code that runs outside of a control loop.
+
+        :return: None.
+        :rtype: None.
+    """
+    print(format_event(message, fields))
+
+
+def to_json_value(value):
+    """
+        Converts numpy values for the json event log.
+    """
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+class StatusChannelClass():
+
+    def __init__(self,
+        log_file_name = None,
+        rate_limits = None,
+        n_slots = 1024,
+        render_period = 0.05,
+        name = 'status',
+    ):
+        """
+            Status channel for control loops. The control thread posts events into a bounded ring buffer, a low priority thread renders them on the console and writes them into a json lines event log.
+            Rendering is rate limited per event, every posted event is written into the event log.
+
+            :param log_file_name: Name of json lines event log, None for no log.
+            :type log_file_name: str or None.
+            :param rate_limits: Minimum time in seconds between two rendered events of the same name. Events without rate limit are always rendered.
+            :type rate_limits: dict(str, float) or None.
+            :param n_slots: Maximum number of events waiting for the render thread, further events are dropped and counted.
+            :type n_slots: int.
+            :param render_period: Time in seconds between two renderings.
+            :type render_period: float.
+            :param name: Name used in the report.
+            :type name: str.
+        """
+        self.log_file_name = log_file_name
+        self.rate_limits = dict(rate_limits or {})
+        self.n_slots = n_slots
+        self.render_period = render_period
+        self.name = name
+
+        self.events = collections.deque() # append and popleft are thread safe
+        self.last_render_time = {} # event -> time of last rendered event
+        self.n_suppressed = collections.Counter() # event -> number of events not rendered because of rate limit
+        self.n_posted = 0
+        self.n_dropped = 0
+
+        self.log_file = None
+        if self.log_file_name is not None:
+            self.log_file = open(self.log_file_name, 'w')
+
+        self.stop_event = threading.Event()
+        self.render_thread = threading.Thread(target=self.render_loop, name=self.name+'_render', daemon=True)
+        self.render_thread.start()
+
+
+    def post(self, event, message = '', **fields):
+        """
+            Posts event without formatting or writing it. Values in fields must not be changed after posting (pass copies of arrays).
+
+            :param event: Name of event, used for rate limiting.
+            :type event: str.
+            :param message: Format string for fields, or function that returns text from fields.
+            :type message: str or function(**fields).
+            :return: None.
+            :rtype: None.
+        """
+        if len(self.events) >= self.n_slots:
+            self.n_dropped += 1
+            return
+        self.events.append((time.time(), event, message, fields))
+        self.n_posted += 1
+
+
+    def render_loop(self):
+        """
+            Render thread. Leaves real-time scheduling, lowers its own priority, and renders events every render_period until the channel is closed.
+
+            :return: None.
+            :rtype: None.
+        """
+        set_thread_normal_priority()
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19) # lowest priority for this thread only (Linux)
+        except (AttributeError, OSError):
+            pass
+        while not self.stop_event.wait(self.render_period):
+            self.render_events()
+        self.render_events()
+
+
+    def render_events(self):
+        """
+            Renders and logs all waiting events.
+
+            :return: None.
+            :rtype: None.
+        """
+        lines = []
+        while self.events:
+            event_time, event, message, fields = self.events.popleft()
+
+            if self.log_file is not None:
+                record = {'time': event_time, 'event': event}
+                if isinstance(message, str):
+                    record['message'] = message
+                record.update(fields)
+                self.log_file.write(json.dumps(record, default=to_json_value) + '\n')
+
+            min_interval = self.rate_limits.get(event)
+            if min_interval is not None:
+                if event_time - self.last_render_time.get(event, float('-inf')) < min_interval:
+                    self.n_suppressed[event] += 1
+                    continue
+                self.last_render_time[event] = event_time
+            lines.append(format_event(message, fields))
+
+        if lines:
+            print('\n'.join(lines), flush=True)
+        if self.log_file is not None:
+            self.log_file.flush()
+
+
+    def close(self, print_report = True):
+        """
+            Renders remaining events, stops render thread, and closes event log.
+
+            :param print_report: Print number of posted, suppressed, and dropped events.
+            :type print_report: Bool.
+            :return: None.
+            :rtype: None.
+        """
+        if self.render_thread is None:
+            return
+        self.stop_event.set()
+        self.render_thread.join()
+        self.render_thread = None
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+        if print_report:
+            self.print_report()
+
+
+    def print_report(self):
+        """
+            Prints number of posted, suppressed, and dropped events.
+
+            :return: None.
+            :rtype: None.
+        """
+        print("Status", self.name+":", self.n_posted, "events posted,", sum(self.n_suppressed.values()), "not rendered (rate limit),", self.n_dropped, "dropped", end='')
+        if self.log_file_name is not None:
+            print(", event log:", self.log_file_name)
+        else:
+            print()
@@ -0,0 +1,147 @@
+"""
+    Background writer for control loop telemetry.
+"""
+
+import queue
+import threading
+import numpy as np
+from control.realtime_profile import *
+
+
+class TelemetryWriterClass():
+
+    def __init__(self,
+        write_function,
+        n_columns,
+        n_slots = 4096,
+        name = 'telemetry',
+    ):
+        """
+            Telemetry sink with preallocated sample slots. The control thread copies numbers into a free slot and submits it, a writer thread passes submitted slots to write_function and releases them again.
+
+            :param write_function: Function that serializes one sample, called on the writer thread.
+            :type write_function: function(ndarray (n_columns,)).
+            :param n_columns: Number of values per sample.
+            :type n_columns: int.
+            :param n_slots: Number of preallocated slots, samples are dropped if all slots are in use.
+            :type n_slots: int.
+            :param name: Name used in the report.
+            :type name: str.
+        """
+        self.write_function = write_function
+        self.n_columns = n_columns
+        self.n_slots = n_slots
+        self.name = name
+
+        self.slots = np.zeros((self.n_slots, self.n_columns))
+        self.free_slots = queue.Queue(maxsize=self.n_slots)
+        self.filled_slots = queue.Queue(maxsize=self.n_slots + 1) # +1 for stop signal
+        for i in range(self.n_slots):
+            self.free_slots.put_nowait(i)
+
+        self.n_submitted = 0
+        self.n_written = 0
+        self.n_dropped = 0
+        self.high_water_mark = 0
+        self.write_error = None
+
+        self.writer_thread = threading.Thread(target=self.writer_loop, name=self.name+'_writer', daemon=True)
+        self.writer_thread.start()
+
+
+    def get_slot(self):
+        """
+            Returns index of a free slot. Counts a dropped sample if no slot is free.
+
+            :return: Slot index or None if queue is full.
+            :rtype: int or None.
+        """
+        try:
+            return self.free_slots.get_nowait()
+        except queue.Empty:
+            self.n_dropped += 1
+            return None
+
+
+    def submit(self, slot_index):
+        """
+            Hands filled slot over to the writer thread.
+
+            :param slot_index: Index of filled slot returned by get_slot.
+            :type slot_index: int.
+            :return: None.
+            :rtype: None.
+        """
+        self.filled_slots.put_nowait(slot_index)
+        self.n_submitted += 1
+        queue_size = self.n_submitted - self.n_written
+        if queue_size > self.high_water_mark:
+            self.high_water_mark = queue_size
+
+
+    def push(self, values):
+        """
+            Copies values into a free slot and submits it.
+
+            :param values: Sample values.
+            :type values: list[float] or ndarray (n_columns,).
+            :return: True if sample was queued, False if it was dropped.
+            :rtype: Bool.
+        """
+        slot_index = self.get_slot()
+        if slot_index is None:
+            return False
+        self.slots[slot_index] = values
+        self.submit(slot_index)
+        return True
+
+
+    def writer_loop(self):
+        """
+            Writer thread. Serializes submitted slots until stop signal (None) is received. Runs with normal scheduling even if the control thread is real-time.
+
+            :return: None.
+            :rtype: None.
+        """
+        set_thread_normal_priority()
+        while True:
+            slot_index = self.filled_slots.get()
+            if slot_index is None:
+                break
+            if self.write_error is None:
+                try:
+                    self.write_function(self.slots[slot_index])
+                except Exception as e:
+                    self.write_error = e # keep control loop running, reported on close
+            self.n_written += 1
+            self.free_slots.put_nowait(slot_index)
+
+
+    def close(self, print_report=True):
+        """
+            Writes remaining samples, stops writer thread and prints report.
+
+            :param print_report: Print number of samples, dropped samples and queue high-water mark.
+            :type print_report: Bool.
+            :return: None.
+            :rtype: None.
+        """
+        if self.writer_thread is None:
+            return
+        self.filled_slots.put(None)
+        self.writer_thread.join()
+        self.writer_thread = None
+        if print_report:
+            self.print_report()
+
+
+    def print_report(self):
+        """
+            Prints telemetry report.
+
+            :return: None.
+            :rtype: None.
+        """
+        print("Telemetry", self.name+":", self.n_written, "samples written,", self.n_dropped, "dropped, queue high-water mark:", self.high_water_mark, "/", self.n_slots)
+        if self.write_error is not None:
+            print("Telemetry", self.name, "write error:", self.write_error)
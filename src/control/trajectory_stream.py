@@ -0,0 +1,144 @@
+"""
+    Chunked trajectory playback with prefetching.
+"""
+
+import queue
+import threading
+import numpy as np
+from control.realtime_profile import *
+
+
+class TrajectoryStreamClass():
+
+    def __init__(self,
+        trajectory,
+        chunk_size = 10000,
+    ):
+        """
+            Plays back a (memory-mapped) trajectory through two chunk buffers. While the loop reads from one buffer, a reader thread fills the other one with the next chunk.
+            Memory use is bounded by 2 * chunk_size rows no matter how long the trajectory is.
+
+            :param trajectory: Trajectory, usually a read-only np.memmap of a .npy file.
+            :type trajectory: ndarray (N,k).
+            :param chunk_size: Number of rows per chunk.
+            :type chunk_size: int.
+        """
+        self.trajectory = trajectory
+        self.n_samples, self.n_columns = trajectory.shape
+        self.chunk_size = max(1, min(chunk_size, self.n_samples))
+        self.n_prefetch_misses = 0
+
+        self.buffers = [np.zeros((self.chunk_size, self.n_columns)), np.zeros((self.chunk_size, self.n_columns))]
+        self.buffer_chunks = [-1, -1] # chunk index stored in each buffer
+        self.current_buffer = 0
+        self.load_chunk(self.current_buffer, 0)
+
+        self.prefetch_requests = queue.Queue()
+        self.prefetch_done = threading.Event()
+        self.prefetch_done.set()
+        self.reader_thread = threading.Thread(target=self.reader_loop, name='trajectory_reader', daemon=True)
+        self.reader_thread.start()
+        self.request_prefetch(1)
+
+
+    def __len__(self):
+        return self.n_samples
+
+
+    def __getitem__(self, index):
+        """
+            Returns row of trajectory. The returned row is a view of a chunk buffer and is only valid until the next chunk switch, because the switch requests a prefetch into the buffer of the row. Copy it immediately to keep it.
+
+            :param index: Row index.
+            :type index: int.
+            :return: Row of trajectory.
+            :rtype: ndarray (k,).
+        """
+        if index < 0:
+            index += self.n_samples
+        if index < 0 or index >= self.n_samples:
+            raise IndexError('trajectory index out of range')
+        chunk_index, row_index = divmod(index, self.chunk_size)
+        if self.buffer_chunks[self.current_buffer] != chunk_index:
+            self.switch_to_chunk(chunk_index)
+        return self.buffers[self.current_buffer][row_index]
+
+
+    def load_chunk(self, buffer_index, chunk_index):
+        """
+            Copies chunk of trajectory into buffer.
+
+            :param buffer_index: Index of buffer (0 or 1).
+            :type buffer_index: int.
+            :param chunk_index: Index of chunk.
+            :type chunk_index: int.
+            :return: None.
+            :rtype: None.
+        """
+        start = chunk_index * self.chunk_size
+        stop = min(start + self.chunk_size, self.n_samples)
+        self.buffers[buffer_index][:stop - start] = self.trajectory[start:stop]
+        self.buffer_chunks[buffer_index] = chunk_index
+
+
+    def switch_to_chunk(self, chunk_index):
+        """
+            Makes the other buffer the current one. Loads chunk synchronously if it was not prefetched (random access), then requests prefetch of the following chunk.
+
+            :param chunk_index: Index of chunk.
+            :type chunk_index: int.
+            :return: None.
+            :rtype: None.
+        """
+        next_buffer = 1 - self.current_buffer
+        self.prefetch_done.wait()
+        if self.buffer_chunks[next_buffer] != chunk_index:
+            self.n_prefetch_misses += 1
+            self.load_chunk(next_buffer, chunk_index)
+        self.current_buffer = next_buffer
+        self.request_prefetch(chunk_index + 1)
+
+
+    def request_prefetch(self, chunk_index):
+        """
+            Requests reader thread to load chunk into the buffer that is not in use.
+
+            :param chunk_index: Index of chunk.
+            :type chunk_index: int.
+            :return: None.
+            :rtype: None.
+        """
+        if chunk_index * self.chunk_size >= self.n_samples or self.reader_thread is None:
+            return
+        self.prefetch_done.clear()
+        self.prefetch_requests.put((1 - self.current_buffer, chunk_index))
+
+
+    def reader_loop(self):
+        """
+            Reader thread. Loads requested chunks until stop signal (None) is received. Runs with normal scheduling even if the control thread is real-time.
+
+            :return: None.
+            :rtype: None.
+        """
+        set_thread_normal_priority()
+        while True:
+            request = self.prefetch_requests.get()
+            if request is None:
+                break
+            self.load_chunk(*request)
+            self.prefetch_done.set()
+
+
+    def close(self):
+        """
+            Stops reader thread.
+
+            :return: None.
+            :rtype: None.
+        """
+        if self.reader_thread is None:
+            return
+        self.prefetch_requests.put(None)
+        self.reader_thread.join()
+        self.reader_thread = None
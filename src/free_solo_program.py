@@ -7,10 +7,11 @@ from control.free_solo_ctrl import *
 class FreeSoloProgram():
 
     def __init__(self,
-
+        use_simulator=False,
+        realtime=REALTIME_PROFILE,
     ):
         print("Running Free Solo Control. You may move platform around.")
-        FreeSoloClass()
+        FreeSoloClass(use_simulator=use_simulator, realtime=realtime)
 
 if __name__ == '__main__':
     FreeSoloProgram()
\ No newline at end of file
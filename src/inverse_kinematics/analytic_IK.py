@@ -6,6 +6,7 @@ from scipy.spatial.transform import Rotation as R
 import sys
 sys.path.append('./')
 from config import *
+from inverse_kinematics.platform_kinematics import transform_platform_to_robot_batch
 
 class AnalyticIKClass():
     def __init__(self, robot_environment = 'pybullet'):
@@ -70,6 +71,63 @@ class AnalyticIKClass():
         f.close()
 
     def calc_IK(self):
+        """
+            Calculates target joint angles for the complete platform trajectory with the batch solver and stores them in csv file.
+
+            :return: None.
+            :rtype: None.
+        """
+        print('Calculating inverse kinematic...', end='\r')
+        platform_poses = np.hstack([self.positions, self.orientations])
+        self.joint_targets, reachable = self.solve_IK_batch(platform_poses)
+
+        if not reachable.all():
+            unreachable = np.flatnonzero(~reachable)
+            print('Calculating inverse kinematic...failed')
+            print(len(unreachable), 'of', len(reachable), 'platform poses are not reachable (negative square root), first at samples:', unreachable[:10].tolist())
+            print('Not saving joint trajectory. Exiting!')
+            exit(-1)
+
+        print('Calculating inverse kinematic...done   ')
+
+        print('Saving data to csv...', end='\r')
+        f = open(GLOBAL_AUTOGENERATED_DIRECTORY + TRAJ_JOINTS_FILE_NAME, 'w')
+        if self.robot_environment == "pybullet":
+            fn = "pybu" 
+        else:
+            fn = "solo"
+        # fc = open(GLOBAL_AUTOGENERATED_DIRECTORY + HISTORY_DIR + fn + '_' + TRAJ_JOINTS_FILE_UNIQUE, 'w')
+        writer = csv.writer(f)
+        # writerc = csv.writer(fc)
+        writer.writerow([self.robot_environment])
+        # writerc.writerow([self.robot_environment])
+
+        header_line = [
+            "fl_hip", "fl_upper", "fl_lower", "fl_dummy", 
+            "fr_hip", "fr_upper", "fr_lower", "fr_dummy",
+            "bl_hip", "bl_upper", "bl_lower", "bl_dummy",
+            "br_hip", "br_upper", "br_lower", "br_dummy"
+            ]
+
+        writer.writerow(header_line)
+        # writerc.writerow(header_line)
+
+        writer.writerows(self.joint_targets[1:].tolist())
+        # writerc.writerows(joint_positions[1:])
+        # fc.close()
+        f.close()
+        print('Saving data to csv...done')
+        
+
+        # self.compare()
+
+    def get_leg_vectors(self):
+        """
+            Returns the reference leg vectors of the zero pose in mm, converted to the Z up system.
+
+            :return: Vectors from origin to hip joint, hip joint to upper leg joint, upper leg joint to lower leg joint, and lower leg joint to ball joint.
+            :rtype: ndarray, ndarray, ndarray, ndarray.
+        """
         # Reference vectors in zero pose
         # Measurements from SW in calibration pose (global coordinates in Y up system)
         vec_base = np.array([32.65, 31, -87.5])  # Vector from origin to hip joint
@@ -78,20 +136,112 @@ class AnalyticIKClass():
         vec_l_leg = np.array([-6.33, 160.04, 5.22])    # Vector from lower leg joint to ball bearing of platform
         # Convert to Z up system
         rot_matrix = R.from_euler('xyz', [math.pi/2, 0, 0], degrees=False).as_matrix()
-        vec_base = rot_matrix.dot(vec_base)
-        vec_hip = rot_matrix.dot(vec_hip)
-        vec_u_leg = rot_matrix.dot(vec_u_leg)
-        vec_l_leg = rot_matrix.dot(vec_l_leg)
-
-        target_positions = []
-        for pos, orn in zip(self.positions, self.orientations):
-            target_positions.append(self.transform_platform_to_robot(pos, orn))
-
-        progress = 0
-        print('Calculating inverse kinematic...', progress, '%', end='\r')
-        for ti, targets in enumerate(target_positions):
-            progress = math.floor(ti/len(target_positions) * 100)
-            print('Calculating inverse kinematic...', progress, '%', end='\r')
+        return rot_matrix.dot(vec_base), rot_matrix.dot(vec_hip), rot_matrix.dot(vec_u_leg), rot_matrix.dot(vec_l_leg)
+
+    def solve_IK_batch(self, platform_poses):
+        """
+            Solves the sphere intersection inverse kinematics for all platform poses and all legs at once.
+
+            :param platform_poses: Platform poses, one row per sample (xyz + rpy or xyz + quaternion).
+            :type platform_poses: ndarray (N,6) or (N,7).
+            :return: Joint angles in PyBullet joint order with dummy joints set to 0 (rows of unreachable samples are NaN), and mask that is True for reachable samples.
+            :rtype: ndarray (N,16), ndarray (N,).
+        """
+        vec_base, vec_hip, vec_u_leg, vec_l_leg = self.get_leg_vectors()
+        platform_poses = np.asarray(platform_poses, dtype=float)
+
+        # FL, FR, BL, BR
+        position = np.array([[1, 1, 1], [1, -1, 1], [-1, 1, 1], [-1, -1, 1]])
+        hip_sign = np.array([-1., -1., 1., 1.])
+        u_leg_sign = np.array([1., -1., -1., 1.])
+        l_leg_sign = np.array([1., -1., 1., 1.])
+        l_leg_offset = np.array([0., 0., math.pi/2, -math.pi/2])
+
+        vec_p1 = (vec_base + vec_hip) * position # upper leg joints (4,3)
+        vec_p2 = transform_platform_to_robot_batch(platform_poses) # ball joints (N,4,3)
+        vec_p2 *= 1000
+
+        # sphere around upper leg joint (origin, r1) intersected with sphere around ball joint (vec_x2, r2)
+        r1_sq = vec_u_leg.dot(vec_u_leg)
+        r2_sq = vec_l_leg.dot(vec_l_leg)
+        vec_x2 = vec_p2 - vec_p1
+        x2_sq = np.einsum('nli,nli->nl', vec_x2, vec_x2)
+        delta_x = -vec_x2[..., 0]
+        delta_y = -vec_x2[..., 1]
+        delta_z = -vec_x2[..., 2]
+        delta_z_sq = delta_z * delta_z
+
+        aa = 1 + (delta_x / delta_z)**2
+        bb = 1 + (delta_y / delta_z)**2
+        cc = delta_x * delta_y / delta_z_sq
+        dd = delta_x * (x2_sq + r1_sq - r2_sq) / delta_z_sq
+        ee = delta_y * (x2_sq + r1_sq - r2_sq) / delta_z_sq
+        ff = (x2_sq**2 + 2 * x2_sq * (r1_sq - r2_sq) + r1_sq**2 + r2_sq**2 - 2 * r1_sq * r2_sq) / (4 * delta_z_sq) - r1_sq
+
+        aaa = aa - cc**2 / bb
+        bbb = dd - cc * ee / bb
+        ccc = -ee**2 / 4 / bb + ff
+
+        discriminant = bbb**2 - 4 * aaa * ccc
+        reachable = (discriminant >= 0).all(axis=1)
+        sqrt_discriminant = np.sqrt(np.where(discriminant >= 0, discriminant, np.nan))
+
+        # both solutions (N,4,2): x from quadratic, y from eq VI, z from eq IV
+        res_x = (-bbb[..., None] + np.stack([sqrt_discriminant, -sqrt_discriminant], axis=-1)) / (2 * aaa[..., None])
+        res_y = (-2 * cc[..., None] * res_x - ee[..., None]) / (2 * bb[..., None])
+        res_z = (-2 * res_x * delta_x[..., None] - 2 * res_y * delta_y[..., None] - x2_sq[..., None] - r1_sq + r2_sq) / (2 * delta_z[..., None])
+        vec_intersections = np.stack([res_x, res_y, res_z], axis=-1) + vec_p1[:, None, :]
+
+        # final intersection vector will be the one closest to 0 in x direction --> knee bend inwards
+        use_first = np.abs(vec_intersections[..., 0, 0]) < np.abs(vec_intersections[..., 1, 0])
+        vec_intersection = np.where(use_first[..., None], vec_intersections[..., 0, :], vec_intersections[..., 1, :])
+
+        vec_hip_to_knee = vec_intersection - vec_p1
+        vec_knee_to_ball_joint = vec_p2 - vec_intersection
+
+        # calculate hip angle
+        vec_0 = self.normalize_vector(np.stack([vec_u_leg[1] * position[:, 1], vec_u_leg[2] * position[:, 2]], axis=-1))
+        vec_1 = self.normalize_vector(vec_hip_to_knee[..., 1:])
+        hip_angle = np.arccos(np.clip(np.sum(vec_0 * vec_1, axis=-1), -1, 1))
+        hip_angle = np.where(vec_0[:, 0] < vec_1[..., 0], -hip_angle, hip_angle)
+        cos_hip, sin_hip = np.cos(hip_angle), np.sin(hip_angle)
+
+        # calculate upper leg angle, rotated to zero hip angle
+        vec_0 = self.normalize_vector(np.stack([vec_u_leg[0] * position[:, 0], vec_u_leg[2] * position[:, 2]], axis=-1))
+        vec_1 = self.normalize_vector(np.stack([vec_hip_to_knee[..., 0], sin_hip * vec_hip_to_knee[..., 1] + cos_hip * vec_hip_to_knee[..., 2]], axis=-1))
+        u_leg_angle = np.arccos(np.clip(np.sum(vec_0 * vec_1, axis=-1), -1, 1))
+        cos_u_leg, sin_u_leg = np.cos(u_leg_angle), np.sin(u_leg_angle)
+
+        # calculate lower leg angle, rotated to zero hip and upper leg angle
+        vec_0 = self.normalize_vector(np.stack([vec_l_leg[0] * position[:, 0], vec_l_leg[2] * position[:, 2]], axis=-1))
+        knee_x = vec_knee_to_ball_joint[..., 0]
+        knee_z = sin_hip * vec_knee_to_ball_joint[..., 1] + cos_hip * vec_knee_to_ball_joint[..., 2]
+        vec_1 = self.normalize_vector(np.stack([cos_u_leg * knee_x + sin_u_leg * knee_z, -sin_u_leg * knee_x + cos_u_leg * knee_z], axis=-1))
+        l_leg_angle = np.arccos(np.clip(np.sum(vec_0 * vec_1, axis=-1), -1, 1))
+        l_leg_angle = np.where((vec_0[:, 0] < vec_1[..., 0]) | (vec_0[:, 1] < vec_1[..., 1]), -l_leg_angle, l_leg_angle)
+
+        joints = np.zeros((len(platform_poses), 4, 4))
+        joints[..., 0] = hip_sign * hip_angle
+        joints[..., 1] = u_leg_sign * u_leg_angle
+        joints[..., 2] = l_leg_sign * l_leg_angle + l_leg_offset
+        joints = joints.reshape(len(platform_poses), 16)
+        joints[~reachable] = np.nan
+
+        return joints, reachable
+
+    def solve_IK_per_sample(self, target_positions):
+        """
+            Reference solver that calculates the inverse kinematics one sample and one leg at a time. Used to verify solve_IK_batch.
+
+            :param target_positions: Ball joint target positions per sample.
+            :type target_positions: ndarray (N,4,3).
+            :return: Joint angles in PyBullet joint order.
+            :rtype: list[list[float]].
+        """
+        vec_base, vec_hip, vec_u_leg, vec_l_leg = self.get_leg_vectors()
+
+        joint_targets = []
+        for targets in target_positions:
             joints = []
             for it, target in enumerate(targets):
                 vec_intersection = np.array([0., 0., 0.])
@@ -105,7 +255,7 @@ class AnalyticIKClass():
                     position = np.array([-1, -1, 1])
                 # vec_p1 = np.array([210., 87.5, 31.]) * position # upper leg joint
                 vec_p1 = (vec_base + vec_hip) * position
-                vec_p2 = target # ball joint position
+                vec_p2 = np.array(target) # ball joint position
                 vec_p2 *= 1000
 
                 vec_x1 = np.array([0., 0., 0.])
@@ -210,40 +360,26 @@ class AnalyticIKClass():
                     joints.append(l_leg_angle - math.pi/2)
                 joints.append(0.)
 
-            self.joint_targets.append(joints)
+            joint_targets.append(joints)
 
-        print('Calculating inverse kinematic...done   ')
-
-        print('Saving data to csv...', end='\r')
-        f = open(GLOBAL_AUTOGENERATED_DIRECTORY + TRAJ_JOINTS_FILE_NAME, 'w')
-        if self.robot_environment == "pybullet":
-            fn = "pybu" 
-        else:
-            fn = "solo"
-        # fc = open(GLOBAL_AUTOGENERATED_DIRECTORY + HISTORY_DIR + fn + '_' + TRAJ_JOINTS_FILE_UNIQUE, 'w')
-        writer = csv.writer(f)
-        # writerc = csv.writer(fc)
-        writer.writerow([self.robot_environment])
-        # writerc.writerow([self.robot_environment])
-
-        header_line = [
-            "fl_hip", "fl_upper", "fl_lower", "fl_dummy", 
-            "fr_hip", "fr_upper", "fr_lower", "fr_dummy",
-            "bl_hip", "bl_upper", "bl_lower", "bl_dummy",
-            "br_hip", "br_upper", "br_lower", "br_dummy"
-            ]
+        return joint_targets
 
-        writer.writerow(header_line)
-        # writerc.writerow(header_line)
 
-        writer.writerows(self.joint_targets[1:])
-        # writerc.writerows(joint_positions[1:])
-        # fc.close()
-        f.close()
-        print('Saving data to csv...done')
-        
+    def verify_IK_batch(self, tolerance=1e-9):
+        """
+            Compares batch solver against per sample reference solver for loaded platform trajectory.
 
-        # self.compare()
+            :param tolerance: Maximum allowed absolute difference in rad.
+            :type tolerance: float.
+            :return: True if all reachable samples match within tolerance.
+            :rtype: Bool.
+        """
+        platform_poses = np.hstack([self.positions, self.orientations])
+        joints_ref = np.array(self.solve_IK_per_sample(transform_platform_to_robot_batch(platform_poses)))
+        joints_batch, reachable = self.solve_IK_batch(platform_poses)
+        max_err = np.max(np.abs(joints_batch[reachable] - joints_ref[reachable]))
+        print('Max difference batch vs per sample IK:', max_err, 'rad')
+        return max_err <= tolerance
 
     def compare(self):
         self.joint_targets = np.array(self.joint_targets)
@@ -286,33 +422,6 @@ class AnalyticIKClass():
         plt.show()
 
 
-    def transform_platform_to_robot(self, platform_pos, platform_orn):
-        target_pos = []
-        ball_joint_pos = []
-        joint_pos_platform = np.array([181.65, 118.89, 6.73])/1000   # relative Position of ball joint to origin
-
-        # calculate ball joint positions on platform
-        rot_matrix = self.get_rotation_matrix(platform_orn)
-        ball_joint_pos.append(rot_matrix.dot(joint_pos_platform))
-        ball_joint_pos.append(rot_matrix.dot(joint_pos_platform * np.array([1, -1, 1])))
-        ball_joint_pos.append(rot_matrix.dot(joint_pos_platform * np.array([-1, 1, 1])))
-        ball_joint_pos.append(rot_matrix.dot(joint_pos_platform * np.array([-1, -1, 1])))
-
-        for ball_joint in ball_joint_pos:
-            target_pos.append(platform_pos + ball_joint)
-
-        return target_pos
-
-    def get_rotation_matrix(self, orientation):
-        # Euler
-        if len(orientation) == 3:
-            return R.from_euler('xyz', orientation, degrees=False).as_matrix()
-        elif len(orientation) == 4:
-            return R.from_quat(orientation).as_matrix()
-        else:
-            print('wrong input for orientation.')
-            exit()
-
     def vec_pow(self, vec, pow):
         res = vec.dot(vec)
         if pow == 2:
@@ -331,7 +440,7 @@ class AnalyticIKClass():
         return res
 
     def normalize_vector(self, vec):
-        return vec / np.linalg.norm(vec)
+        return vec / np.linalg.norm(vec, axis=-1, keepdims=True)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,86 @@
+"""
+    Platform to robot kinematics shared by all inverse kinematics tools.
+"""
+
+import numpy as np
+
+JOINT_POS_PLATFORM = np.array([181.65, 118.89, 6.73])/1000   # relative Position of ball joint to origin
+LEG_POSITION_SIGNS = np.array([ # FL, FR, BL, BR
+    [1, 1, 1],
+    [1, -1, 1],
+    [-1, 1, 1],
+    [-1, -1, 1]
+])
+JOINT_POS_LEGS = JOINT_POS_PLATFORM * LEG_POSITION_SIGNS # relative Position of each ball joint to origin (4,3)
+
+
+def get_rotation_matrix_batch(orientations, out=None):
+    """
+        Returns closed form rotation matrices for all orientations.
+
+        :param orientations: Orientations of platform as extrinsic xyz euler angles or xyzw quaternions.
+        :type orientations: ndarray (N,3) or (N,4).
+        :param out: Optional preallocated output buffer.
+        :type out: ndarray (N,3,3) or None.
+        :return: Rotation matrices.
+        :rtype: ndarray (N,3,3).
+    """
+    orientations = np.asarray(orientations, dtype=float)
+    if orientations.ndim == 1:
+        orientations = orientations[None, :]
+    if out is None:
+        out = np.empty((len(orientations), 3, 3))
+
+    if orientations.shape[1] == 3:
+        ca, cb, cg = np.cos(orientations).T
+        sa, sb, sg = np.sin(orientations).T
+        out[:, 0, 0] = cb * cg
+        out[:, 0, 1] = sa * sb * cg - ca * sg
+        out[:, 0, 2] = ca * sb * cg + sa * sg
+        out[:, 1, 0] = cb * sg
+        out[:, 1, 1] = sa * sb * sg + ca * cg
+        out[:, 1, 2] = ca * sb * sg - sa * cg
+        out[:, 2, 0] = -sb
+        out[:, 2, 1] = sa * cb
+        out[:, 2, 2] = ca * cb
+    elif orientations.shape[1] == 4:
+        x, y, z, w = (orientations / np.linalg.norm(orientations, axis=1, keepdims=True)).T
+        out[:, 0, 0] = 1 - 2 * (y * y + z * z)
+        out[:, 0, 1] = 2 * (x * y - z * w)
+        out[:, 0, 2] = 2 * (x * z + y * w)
+        out[:, 1, 0] = 2 * (x * y + z * w)
+        out[:, 1, 1] = 1 - 2 * (x * x + z * z)
+        out[:, 1, 2] = 2 * (y * z - x * w)
+        out[:, 2, 0] = 2 * (x * z - y * w)
+        out[:, 2, 1] = 2 * (y * z + x * w)
+        out[:, 2, 2] = 1 - 2 * (x * x + y * y)
+    else:
+        print('Wrong input for orientation.')
+        exit()
+    return out
+
+
+def transform_platform_to_robot_batch(platform_poses, out=None, rot_out=None):
+    """
+        Transforms target platform poses to target robot end-effector ball joint positions for all four legs at once.
+
+        :param platform_poses: Target platform poses, position followed by euler angles (N,6) or quaternion (N,7).
+        :type platform_poses: ndarray.
+        :param out: Optional preallocated output buffer for ball joint positions.
+        :type out: ndarray (N,4,3) or None.
+        :param rot_out: Optional preallocated buffer for rotation matrices.
+        :type rot_out: ndarray (N,3,3) or None.
+        :return: Ball joint positions for FL, FR, BL, BR legs.
+        :rtype: ndarray (N,4,3).
+    """
+    platform_poses = np.asarray(platform_poses, dtype=float)
+    if platform_poses.ndim == 1:
+        platform_poses = platform_poses[None, :]
+    if out is None:
+        out = np.empty((len(platform_poses), 4, 3))
+
+    rot_matrix = get_rotation_matrix_batch(platform_poses[:, 3:], out=rot_out)
+    np.einsum('nij,lj->nli', rot_matrix, JOINT_POS_LEGS, out=out)
+    out += platform_poses[:, None, :3]
+    return out
+
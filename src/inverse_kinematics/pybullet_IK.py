@@ -1,21 +1,64 @@
 from pickle import GLOBAL
 import pybullet as p
 import csv
+import time
+import argparse
 import numpy as np
 import math
-from scipy.spatial.transform import Rotation as R
 from matplotlib import pyplot as plt
 from config import *
+from inverse_kinematics.platform_kinematics import transform_platform_to_robot_batch
+from control.pybullet_torque_ctrl import *
 
 class PybulletIKClass():
 
     def __init__(self, 
-        robot_environment = ''
+        robot_environment = '',
+        warm_start = False,
+        residual_threshold = IK_RESIDUAL_THRESHOLD,
+        residual_tolerance = IK_RESIDUAL_TOLERANCE,
+        block_iterations = IK_BLOCK_ITERATIONS,
+        joint_damping = IK_JOINT_DAMPING,
+        max_iterations = IK_MAX_ITERATIONS,
+        couple_simulation = True,
     ):
+        """
+            Calculates joint angles of the platform trajectory with PyBullet Inverse Kinematics.
+            By default every sample is solved with max_iterations from the current robot state, which follows the previous solutions through the torque controller and a simulation step.
+            With warm_start, the robot is set to the previous solution before every sample and PyBullet iterates with joint_damping in blocks of block_iterations. The sample is done when the residual (largest distance between leg end and target) is below residual_threshold or changes less than residual_tolerance between blocks (converged). Iterations and residual of each sample are stored in IK_REPORT_FILE_NAME.
+
+            :param robot_environment: Robot environment the joint angles are generated for (pybullet or solo).
+            :type robot_environment: str.
+            :param warm_start: Start each sample from the previous solution and stop on convergence.
+            :type warm_start: Bool.
+            :param residual_threshold: Residual in m at which PyBullet stops iterating.
+            :type residual_threshold: float.
+            :param residual_tolerance: Change of residual in m between blocks at which warm-started inverse kinematics has converged.
+            :type residual_tolerance: float.
+            :param block_iterations: Iterations per PyBullet call of warm-started inverse kinematics.
+            :type block_iterations: int.
+            :param joint_damping: Joint damping of warm-started inverse kinematics (all joints).
+            :type joint_damping: float.
+            :param max_iterations: Maximum iterations per sample.
+            :type max_iterations: int.
+            :param couple_simulation: Apply each solution with torque controller and simulation step, False if only joint angles are needed.
+            :type couple_simulation: Bool.
+        """
         self.robot_environment = robot_environment
+        self.warm_start = warm_start
+        self.residual_threshold = residual_threshold
+        self.residual_tolerance = residual_tolerance
+        self.block_iterations = block_iterations
+        self.joint_damping = joint_damping
+        self.max_iterations = max_iterations
+        self.couple_simulation = couple_simulation
+        self.ik_iterations = []
+        self.ik_residuals = []
+        self.ik_time = 0.0
         self.data = []
         self.robot_id = None
         self.dummy_joints = []
+        self.torque_controller = None
 
         self.read_from_csv(True)
         self.data = np.array(self.data)
@@ -51,6 +94,7 @@ class PybulletIKClass():
 
         # set indices for dummy joints
         self.dummy_joints = [3, 7, 11, 15]
+        self.torque_controller = PybulletTorqueControllerClass(self.robot_id, 16, kp=20, kd=0.2, torque_saturation=2)
 
         # load platform URDF model
         URDF_home_position = self.positions[0]
@@ -105,34 +149,7 @@ class PybulletIKClass():
             :return: None.
             :rtype: None.
         """
-        velocity_target = 0
-        torque = []
-        kp = 20
-        kd = 0.2
-        torque_saturation = 2
-
-        for i in range(len(self.joint_targets)):
-            # get joints positions
-            joint_state = p.getJointState(self.robot_id, i)
-            joint_pos = joint_state[0]
-            joint_vel = joint_state[1]
-
-            # calculate error
-            pos_err = self.joint_targets[i] - joint_pos
-            vel_err = velocity_target - joint_vel
-
-            # calculate torque
-            torque.append(pos_err * kp + vel_err * kd)
-            # saturation
-            if torque[-1] > torque_saturation:
-                torque[-1] = torque_saturation
-            elif torque[-1] < -torque_saturation:
-                torque[-1] = -torque_saturation
-        
-        p.setJointMotorControlArray(bodyUniqueId=self.robot_id, 
-                                    jointIndices=list(range(len(self.joint_targets))), 
-                                    controlMode=p.TORQUE_CONTROL, 
-                                    forces=torque)
+        self.torque_controller.update(self.joint_targets)
 
 
     def calculate_inverse_kinematic(self):
@@ -154,27 +171,33 @@ class PybulletIKClass():
                                     forces = np.zeros(16))
         first = True
 
-        for pos, orn in zip(self.positions, self.orientations):
-            target_position = self.transform_platform_to_robot(pos, orn)
-            if first: # Setting initial pose with knees bend inwards
+        target_positions = transform_platform_to_robot_batch(np.hstack([self.positions, self.orientations]))
+
+        start_time = time.perf_counter()
+        for target_position in target_positions:
+            if self.warm_start:
+                joint_positions.append(self.solve_warm_started(target_position, joint_positions[-1] if joint_positions else last_joint_pos))
+            elif first: # Setting initial pose with knees bend inwards
                 first = False
                 joint_positions.append(p.calculateInverseKinematics2(self.robot_id, 
                                                                 self.dummy_joints, 
                                                                 target_position, 
-                                                                maxNumIterations = 10000, 
+                                                                maxNumIterations = self.max_iterations, 
                                                                 currentPositions = last_joint_pos))
             else:
                 joint_positions.append(p.calculateInverseKinematics2(self.robot_id, 
                                                                 self.dummy_joints, 
                                                                 target_position, 
-                                                                maxNumIterations = 10000))
+                                                                maxNumIterations = self.max_iterations))
 
-            self.joint_targets = joint_positions[-1]
-            self.controller()
-            p.stepSimulation()
+            if self.couple_simulation:
+                self.joint_targets = joint_positions[-1]
+                self.controller()
+                p.stepSimulation()
             
             progress += float(1 / len(self.positions)) * 100
             print('Calculating inverse kinematics', math.floor(progress), '%', end='\r')
+        self.ik_time = time.perf_counter() - start_time
         print('Calculating inverse kinematics', 100, '%')
 
         print('Saving data to csv...', end='\r')
@@ -205,6 +228,10 @@ class PybulletIKClass():
         f.close()
         print('Saving data to csv...done')
 
+        if self.warm_start:
+            self.save_ik_report()
+            self.print_ik_report()
+
         """
         # Debugging option
         joint_positions = np.array(joint_positions)
@@ -221,52 +248,90 @@ class PybulletIKClass():
         plt.show()
         """
 
-    def transform_platform_to_robot(self, platform_pos, platform_orn):
+    def solve_warm_started(self, target_position, current_positions):
         """
-            Transforms target platform pose to target robot end-effector ball joint position.
-
-            :param platform_pos: List of target platform position values.
-            :type platform_pos: list[list[float]].
-            :param platform_orn: List of target platform orientation values.
-            :type platform_orn: list[list[float]].
-            :return: Retuns list of transformed target robot end-effector ball joint position.
+            Solves one sample starting from current_positions. The robot is set to current_positions and PyBullet iterates from the robot state in blocks of block_iterations, until the residual is below residual_threshold, changes less than residual_tolerance between blocks, or max_iterations is reached. Iterations and residual are recorded.
+            The start is set on the robot instead of passing currentPositions, which makes calculateInverseKinematics2 converge to a wrong pose of the legs.
+
+            :param target_position: Target positions of leg ends (FL, FR, BL, BR).
+            :type target_position: ndarray (4,3).
+            :param current_positions: Joint angles to start from (previous solution).
+            :type current_positions: list[float].
+            :return: Joint angles.
             :rtype: list[float].
         """
-        target_pos = []
-        ball_joint_pos = []
-        joint_pos_platform = np.array([181.65, 118.89, 6.73])/1000   # relative Position of ball joint to origin
+        if self.couple_simulation:
+            self.torque_controller.read_joint_states() # simulated state, restored after solving
+        joint_positions = current_positions
+        residual = self.get_ik_residual(joint_positions, target_position)
+        iterations = 0
+        while residual >= self.residual_threshold and iterations < self.max_iterations:
+            joint_positions = p.calculateInverseKinematics2(self.robot_id, 
+                                                            self.dummy_joints, 
+                                                            target_position, 
+                                                            maxNumIterations = self.block_iterations, 
+                                                            residualThreshold = self.residual_threshold, 
+                                                            jointDamping = [self.joint_damping] * len(joint_positions))
+            iterations += self.block_iterations
+            last_residual = residual
+            residual = self.get_ik_residual(joint_positions, target_position)
+            if abs(last_residual - residual) < self.residual_tolerance:
+                break
+        if self.couple_simulation:
+            for i in range(len(self.torque_controller.joint_pos)):
+                p.resetJointState(self.robot_id, i, self.torque_controller.joint_pos[i], self.torque_controller.joint_vel[i])
+
+        self.ik_iterations.append(iterations)
+        self.ik_residuals.append(residual)
+        return joint_positions
+
+
+    def get_ik_residual(self, joint_positions, target_position):
+        """
+            Sets robot to joint angles and returns largest distance between leg end (dummy joint link) and its target. The robot state is the start of the next PyBullet iteration block.
+
+            :param joint_positions: Joint angles.
+            :type joint_positions: list[float].
+            :param target_position: Target positions of leg ends (FL, FR, BL, BR).
+            :type target_position: ndarray (4,3).
+            :return: Residual in m.
+            :rtype: float.
+        """
+        for i in range(len(joint_positions)):
+            p.resetJointState(self.robot_id, i, joint_positions[i])
+        link_states = p.getLinkStates(self.robot_id, self.dummy_joints, computeForwardKinematics = 1)
+        link_positions = np.array([link_state[4] for link_state in link_states])
+        return float(np.linalg.norm(link_positions - target_position, axis=1).max())
 
-        # calculate ball joint positions on platform
-        rot_matrix = self.get_rotation_matrix(platform_orn)
-        ball_joint_pos.append(rot_matrix.dot(joint_pos_platform))
-        ball_joint_pos.append(rot_matrix.dot(joint_pos_platform * np.array([1, -1, 1])))
-        ball_joint_pos.append(rot_matrix.dot(joint_pos_platform * np.array([-1, 1, 1])))
-        ball_joint_pos.append(rot_matrix.dot(joint_pos_platform * np.array([-1, -1, 1])))
 
-        for ball_joint in ball_joint_pos:
-            target_pos.append(platform_pos + ball_joint)
+    def save_ik_report(self):
+        """
+            Stores iterations and residual of each sample in csv file.
 
-        return target_pos
+            :return: None.
+            :rtype: None.
+        """
+        f = open(GLOBAL_AUTOGENERATED_DIRECTORY + IK_REPORT_FILE_NAME, 'w')
+        writer = csv.writer(f)
+        writer.writerow(['sample', 'iterations', 'residual'])
+        writer.writerows(zip(range(len(self.ik_iterations)), self.ik_iterations, self.ik_residuals))
+        f.close()
 
 
-    def get_rotation_matrix(self, orientation):
+    def print_ik_report(self):
         """
-            Returns rotation matrix calculated with orientation value.
+            Prints iterations, residual, and time per sample of warm-started inverse kinematics. Iterations are counted in blocks, PyBullet may stop earlier within the last block.
 
-            :param orientation: Orientation of platform.
-            :type orientation: list[float].
-            :return: Retuns rotation matrix.
-            :rtype:: ndarray.
+            :return: None.
+            :rtype: None.
         """
-        if len(orientation) == 3:
-            r_mat = R.from_euler('xyz', orientation, degrees=False).as_matrix() 
-            return r_mat
-        elif len(orientation) == 4:
-            r_mat = R.from_quat(orientation).as_matrix()
-            return r_mat
-        else:
-            print('Wrong input for orientation.')
-            exit()
+        if not self.ik_iterations:
+            return
+        iterations = np.array(self.ik_iterations)
+        residuals = np.array(self.ik_residuals)
+        print("Inverse kinematics: %d samples, iterations (blocks of %d) mean: %.1f, max: %d, residual mean: %.2e m, max: %.2e m, samples above threshold: %d, %.1f us per sample" % (
+            len(iterations), self.block_iterations, iterations.mean(), iterations.max(), residuals.mean(), residuals.max(),
+            np.count_nonzero(residuals >= self.residual_threshold), self.ik_time / len(iterations) * 1e6))
 
 
     def read_from_csv(self, header = False):
@@ -294,4 +359,55 @@ class PybulletIKClass():
 
 
 if __name__ == '__main__':
-    PybulletIKClass()
+
+    parser = argparse.ArgumentParser(description='Calculate joint angles of the auto-generated platform trajectory with PyBullet Inverse Kinematics.')
+    parser.add_argument('-e',
+                        '--robot-environment',
+                        type=str,
+                        default='',
+                        help='Robot environment the joint angles are generated for (pybullet or solo)')
+    parser.add_argument('-w',
+                        '--warm-start',
+                        action='store_true',
+                        help='Start each sample from the previous solution and stop on convergence')
+    parser.add_argument('-r',
+                        '--residual-threshold',
+                        type=float,
+                        default=IK_RESIDUAL_THRESHOLD,
+                        help='Residual in m at which PyBullet stops iterating')
+    parser.add_argument('-t',
+                        '--residual-tolerance',
+                        type=float,
+                        default=IK_RESIDUAL_TOLERANCE,
+                        help='Change of residual in m between blocks at which warm-started inverse kinematics has converged')
+    parser.add_argument('-k',
+                        '--block-iterations',
+                        type=int,
+                        default=IK_BLOCK_ITERATIONS,
+                        help='Iterations per PyBullet call of warm-started inverse kinematics')
+    parser.add_argument('-d',
+                        '--joint-damping',
+                        type=float,
+                        default=IK_JOINT_DAMPING,
+                        help='Joint damping of warm-started inverse kinematics')
+    parser.add_argument('-i',
+                        '--max-iterations',
+                        type=int,
+                        default=IK_MAX_ITERATIONS,
+                        help='Maximum iterations per sample')
+    parser.add_argument('-n',
+                        '--no-simulation',
+                        action='store_true',
+                        help='Do not apply solutions with torque controller and simulation step (joint angles only)')
+    args = parser.parse_args()
+
+    PybulletIKClass(
+        robot_environment = args.robot_environment,
+        warm_start = args.warm_start,
+        residual_threshold = args.residual_threshold,
+        residual_tolerance = args.residual_tolerance,
+        block_iterations = args.block_iterations,
+        joint_damping = args.joint_damping,
+        max_iterations = args.max_iterations,
+        couple_simulation = not args.no_simulation,
+    )
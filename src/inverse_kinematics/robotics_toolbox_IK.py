@@ -3,12 +3,12 @@ from matplotlib import pyplot as plt
 import numpy as np
 import roboticstoolbox as rtb
 from roboticstoolbox.robot.ERobot import ERobot
-from scipy.spatial.transform import Rotation as R
-from scipy.interpolate import interp1d
 from os import getcwd, chdir
 import sys
 sys.path.append('./')
 from config import *
+from inverse_kinematics.platform_kinematics import transform_platform_to_robot_batch
+from platform_trajectory_generation.transition_trajectory import get_transition_trajectory
 from spatialmath import SE3
 
 class RoboticsToolboxIKClass():
@@ -52,18 +52,12 @@ class RoboticsToolboxIKClass():
         initial_joint_pos = [-0.03720331288427462,0.829007129122855,-1.6202734972969408,0.0,0.034261802256937444,-0.8275962751091314,1.617652654183728,0.0,0.03734524762342967,-0.8291123597545643,1.6206753705804764,0.0,-0.03441818042258571,0.8276649022998361,-1.6178770197057506,0.0]
         last_joint_pos = initial_joint_pos
         temp = 0
-        target_positions = []
-
-        for pos, orn in zip(self.positions, self.orientations):
-            target_positions.append(self.transform_platform_to_robot(pos, orn))
-
-        target_positions = np.array(target_positions)
+        target_positions = transform_platform_to_robot_batch(np.hstack([self.positions, self.orientations]))
 
         start_pos = np.array([181.65, 117.69, 354.8])/1000
         interp = np.arange(0, 1, .001)
 
-        f = interp1d([0, 1], [start_pos, target_positions[0, 0]], axis=0)
-        traj_dummy = f(interp)
+        traj_dummy = get_transition_trajectory(start_pos, target_positions[0, 0], interp)
 
 
         '''
@@ -144,33 +138,6 @@ class RoboticsToolboxIKClass():
         f.close()
         print('Saving data to csv...done')
 
-    def transform_platform_to_robot(self, platform_pos, platform_orn):
-        target_pos = []
-        ball_joint_pos = []
-        joint_pos_platform = np.array([181.65, 118.89, 6.73])/1000   # relative Position of ball joint to origin
-
-        # calculate ball joint positions on platform
-        rot_matrix = self.get_rotation_matrix(platform_orn)
-        ball_joint_pos.append(rot_matrix.dot(joint_pos_platform))
-        ball_joint_pos.append(rot_matrix.dot(joint_pos_platform * np.array([1, -1, 1])))
-        ball_joint_pos.append(rot_matrix.dot(joint_pos_platform * np.array([-1, 1, 1])))
-        ball_joint_pos.append(rot_matrix.dot(joint_pos_platform * np.array([-1, -1, 1])))
-
-        for ball_joint in ball_joint_pos:
-            target_pos.append(platform_pos + ball_joint)
-
-        return target_pos
-
-    def get_rotation_matrix(self, orientation):
-        # Euler
-        if len(orientation) == 3:
-            return R.from_euler('xyz', orientation, degrees=False).as_matrix()
-        elif len(orientation) == 4:
-            return R.from_quat(orientation).as_matrix()
-        else:
-            print('wrong input for orientation.')
-            exit()
-
 
 class Solo(ERobot):
 
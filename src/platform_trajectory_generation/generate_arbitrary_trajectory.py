@@ -4,9 +4,9 @@
 
 import csv
 import numpy as np 
-from scipy.interpolate import interp1d
 import math
 from config import *
+from platform_trajectory_generation.transition_trajectory import *
 
 class GenerateArbitraryTrajectory_CSV_Class():
 
@@ -331,11 +331,7 @@ class GenerateArbitraryTrajectoryClass():
             :return: Returns linear interpolated points.
             :rtype: list[]
         """
-        yx = np.arange(0, 2)
-        y = [start, end]
-        f = interp1d(yx, y, kind='linear', axis=0)
-        x = np.arange(0, 1, step=1/(self.interpolate_time*self.trajectory_frequency), dtype=float)
-        return f(x)
+        return get_transition_trajectory(start, end, get_transition_steps(self.interpolate_time*self.trajectory_frequency))
 
 
 if __name__ == '__main__':
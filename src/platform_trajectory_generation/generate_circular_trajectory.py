@@ -6,9 +6,9 @@ import math
 from webbrowser import get 
 import matplotlib.pyplot as plt
 import numpy as np
-from scipy.interpolate import interp1d
 import csv
 from config import *
+from platform_trajectory_generation.transition_trajectory import *
 
 class GenerateCircularTrajectoryClass():
 
@@ -102,11 +102,7 @@ class GenerateCircularTrajectoryClass():
             :return: Returns linear interpolated points.
             :rtype: list[]
         """
-        yx = np.arange(0, 2)
-        y = [start, end]
-        f = interp1d(yx, y, kind='linear', axis=0)
-        x = np.arange(0, 1, step=1/(1*self.env_frequency), dtype=float)
-        return np.array([f(x)]).T
+        return np.array([get_transition_trajectory(start, end, get_transition_steps(1*self.env_frequency))]).T
 
 
     def write_output(self, data):
@@ -4,11 +4,11 @@
 
 import csv
 import numpy as np 
-from scipy.interpolate import interp1d
 import math
 from matplotlib import pyplot as plt
 
 from config import *
+from platform_trajectory_generation.transition_trajectory import *
 
 class GenerateSineTrajectoryClass():
 
@@ -366,11 +366,7 @@ class GenerateSineTrajectoryClass():
             :return: Returns linear interpolated points.
             :rtype: list[]
         """
-        yx = np.arange(0, 2)
-        y = [start, end]
-        f = interp1d(yx, y, kind='linear', axis=0)
-        x = np.arange(0, 1, step=1/(time_t*self.frequency), dtype=float)
-        return f(x)
+        return get_transition_trajectory(start, end, get_transition_steps(time_t*self.frequency))
 
 '''
 if __name__ == '__main__':
@@ -0,0 +1,113 @@
+"""
+    Closed-form transition trajectories between two positions
+"""
+
+import math
+import numpy as np
+
+TRANSITION_PROFILES = ('linear', 'cubic', 'quintic') # quintic is the minimum jerk profile
+
+
+def get_blend(s, profile='linear'):
+    """
+        Returns blend factor of transition profile. All profiles go from 0 at s=0 to 1 at s=1. Cubic has zero velocity, quintic zero velocity and acceleration at both ends.
+
+        :param s: Normalized time in [0, 1].
+        :type s: float or ndarray.
+        :param profile: 'linear', 'cubic' or 'quintic'.
+        :type profile: str.
+        :return: Blend factor.
+        :rtype: float or ndarray.
+    """
+    if profile == 'linear':
+        return s
+    elif profile == 'cubic':
+        return s * s * (3 - 2 * s)
+    elif profile == 'quintic':
+        return s * s * s * (10 + s * (-15 + 6 * s))
+    print("Transition profile", profile, "not defined. Use one of", TRANSITION_PROFILES, ". Exiting!")
+    exit(-1)
+
+
+def get_transition_steps(n_steps):
+    """
+        Returns normalized time of transition with n_steps samples, the end point is not included.
+
+        :param n_steps: Number of samples (transition time * frequency).
+        :type n_steps: float.
+        :return: Normalized time.
+        :rtype: ndarray (n_steps,).
+    """
+    return np.arange(0, 1, step=1/n_steps, dtype=float)
+
+
+def get_transition_trajectory(start, end, s, profile='linear'):
+    """
+        Evaluates transition between start and end at all normalized times at once.
+
+        :param start: Start position.
+        :type start: float or list[float].
+        :param end: End position.
+        :type end: float or list[float].
+        :param s: Normalized time in [0, 1].
+        :type s: ndarray (N,).
+        :param profile: 'linear', 'cubic' or 'quintic'.
+        :type profile: str.
+        :return: Transition trajectory.
+        :rtype: ndarray (N,) for scalar positions, else (N,k).
+    """
+    start = np.asarray(start, dtype=float)
+    delta = np.asarray(end, dtype=float) - start
+    return np.multiply.outer(get_blend(np.asarray(s, dtype=float), profile), delta) + start
+
+
+class TransitionTrajectoryClass():
+
+    def __init__(self,
+        start,
+        end,
+        n_steps,
+        profile = 'linear',
+    ):
+        """
+            Transition between two positions that is evaluated on demand per sample, so no transition array is allocated.
+            Samples are the same as get_transition_trajectory(start, end, get_transition_steps(n_steps), profile).
+
+            :param start: Start position.
+            :type start: list[float].
+            :param end: End position.
+            :type end: list[float].
+            :param n_steps: Number of samples (transition time * frequency).
+            :type n_steps: int.
+            :param profile: 'linear', 'cubic' or 'quintic'.
+            :type profile: str.
+        """
+        get_blend(0.0, profile) # checks profile
+        self.start = np.array(start, dtype=float)
+        self.end = np.array(end, dtype=float)
+        self.delta = self.end - self.start
+        self.profile = profile
+        self.step = 1/n_steps
+        self.n_samples = math.ceil(1 / self.step) # same length as get_transition_steps(n_steps)
+
+
+    def __len__(self):
+        return self.n_samples
+
+
+    def __getitem__(self, index):
+        """
+            Returns sample of transition.
+
+            :param index: Sample index.
+            :type index: int.
+            :return: Position.
+            :rtype: ndarray (k,).
+        """
+        if index < 0:
+            index += self.n_samples
+        if index < 0 or index >= self.n_samples:
+            raise IndexError('transition index out of range')
+        if index == 0:
+            return self.start.copy()
+        return self.delta * get_blend(index * self.step, self.profile) + self.start
@@ -8,6 +8,7 @@ from scipy import signal
 from scipy.signal import savgol_filter
 
 import sys, os
+import time
 sys.path.append('./')
 from config import *
 from post_processing.data_preview import DataPreviewClass
@@ -23,7 +24,8 @@ class DataProcessClass():
         external_output_file_name = "", # specify if you do not want to use config output directory
         save_data = True,
         save_history = True,
-        update_data = False
+        update_data = False,
+        derivative_scheme = 'backward', # backward / central / savgol
     ):
         self.name_of_data_csv = name_of_data_csv 
         self.robot_env = robot_env
@@ -33,6 +35,11 @@ class DataProcessClass():
         self.save_data = save_data
         self.save_history = save_history
         self.update_data = update_data
+        self.derivative_scheme = derivative_scheme
+        self.savgol_window_length = 11
+        self.savgol_polyorder = 3
+        self.use_sos_filter = False
+        self.filter_coefficients = {} # (fc, fs, order, use_sos_filter) -> filter coefficients
 
         if self.robot_env == '':
             print("Robot env not specified. Exiting!")
@@ -347,7 +354,7 @@ class DataProcessClass():
             :return: Normalized vector.
             :rtype: ndarray.
         """
-        return vec / np.linalg.norm(vec)
+        return vec / np.linalg.norm(vec, axis=-1, keepdims=True)
 
     
     def calculate_platform_vel_acc(self): 
@@ -364,35 +371,9 @@ class DataProcessClass():
         self.vec_u_leg = rotMatrix.dot(self.vec_u_leg)
         self.vec_l_leg = rotMatrix.dot(self.vec_l_leg)
 
-        progress = 0
-        print('Calculating positions and orientations...', progress, '%', end='\r')
+        print('Calculating positions and orientations...', end='\r')
         # calculation of platform position
-        for ti, current_motor_pos in enumerate(self.curr_jointAngles):
-            progress = math.floor(ti/len(self.curr_jointAngles) * 100)
-            print('Calculating positions and orientations...', progress, '%', end='\r')
-            points = []
-            points.append(self.calculateBallJointPosition([6,9,8], 'left_front', current_motor_pos))
-            points.append(self.calculateBallJointPosition([7,11,10], 'right_front', current_motor_pos))
-            points.append(self.calculateBallJointPosition([0,3,2], 'left_back', current_motor_pos))
-            points.append(self.calculateBallJointPosition([1,5,4], 'right_back', current_motor_pos))
-            
-            vcross1 = points[3] - points[0]
-            vcross2 = points[2] - points[1]
-
-            vx = self.normalizeVector(points[0] - points[2])
-            vy = self.normalizeVector(points[0] - points[1])
-            vz = self.normalizeVector(np.cross(vcross2, vcross1))
-
-            # calculate acceleration
-            self.platform_curr_pos = points[0] + vcross1/2 - np.array([0, 0, 6.73])/1000 # assumed that the middle point is also the middle of the platform
-            rotMatrix = Rotation.align_vectors([[1, 0, 0], [0, 1, 0], [0, 0, 1]], [vx, vy, vz])[0].as_matrix()
-            rotMatrix = rotMatrix.transpose()
-            
-            self.platform_curr_ang = Rotation.from_matrix(rotMatrix).as_euler('xyz', degrees=False)
-            self.platform_curr_pos = np.array(self.platform_curr_pos) + rotMatrix.dot(self.point_on_platform)
-        
-            self.platform_pos_calc.append(self.platform_curr_pos)
-            self.platform_ang_calc.append(self.platform_curr_ang)
+        self.platform_pos_calc, self.platform_ang_calc = self.calculate_platform_pose_batch(self.curr_jointAngles)
         
         if not self.update_data:
             self.platform_pos.append(self.platform_target[:, :3])
@@ -408,89 +389,48 @@ class DataProcessClass():
         self.platform_pos_calc_raw = self.platform_pos_calc
         self.platform_ang_calc_raw = self.platform_ang_calc
 
-        # filter position data
-        print('Filtering position data...', end='\r')
+        # filter position and orientation data
+        print('Filtering position and orientation data...', end='\r')
         # self.find_cutoff_frequency(self.platform_pos_calc)
-        self.platform_pos_calc = self.filter_data(self.platform_pos_calc)
-        fc_lin = self.fc
-        print('Filtering position data...done (cutoff frequency:', fc_lin, 'Hz)')
-
-        print('Filtering orientation data...', end='\r')
-        # self.find_cutoff_frequency(self.platform_ang_calc)
-        self.platform_ang_calc = self.filter_data(self.platform_ang_calc)
-        fc_ang = self.fc
-        print('Filtering orientation data...done (cutoff frequency:', fc_ang, 'Hz)')
+        self.platform_pos_calc, self.platform_ang_calc = self.filter_channels(self.platform_pos_calc, self.platform_ang_calc)
+        print('Filtering position and orientation data...done (cutoff frequency:', self.fc, 'Hz)')
         # calculation of platform velocity
-        for i in range(len(self.platform_pos_calc)):
-            if i == 0:
-                self.platform_curr_lin_vel = np.array([0,0,0])
-                self.platform_curr_ang_vel = np.array([0,0,0])
-                if not self.update_data:
-                    self.platform_lin_vel.append(np.array([0,0,0]))
-                    self.platform_ang_vel.append(np.array([0,0,0]))
-                else:
-                    self.platform_lin_vel = self.platform_target[:, 6:9]
-                    self.platform_ang_vel = self.platform_target[:, 9:12]
-
-            else:
-                self.platform_curr_lin_vel = self.xyz_derivative(self.platform_pos_calc[i - 1], self.platform_pos_calc[i], self.dt)
-                self.platform_curr_ang_vel = self.xyz_derivative(self.platform_ang_calc[i - 1], self.platform_ang_calc[i], self.dt)
-                if not self.update_data:
-                    self.platform_lin_vel.append(self.xyz_derivative(self.platform_pos[i - 1], self.platform_pos[i], self.dt))
-                    self.platform_ang_vel.append(self.xyz_derivative(self.platform_ang[i - 1], self.platform_ang[i], self.dt))
-            
-            self.platform_lin_vel_calc.append(self.platform_curr_lin_vel)          
-            self.platform_ang_vel_calc.append(self.platform_curr_ang_vel)          
+        # previous xyz_derivative calls passed (i - 1, i), which gives (x[i-1] - x[i]) / dt for velocity and acceleration
+        n_samples = len(self.platform_pos_calc)
+        self.platform_lin_vel_calc = self.differentiate(self.platform_pos_calc, self.dt, reverse=True)
+        self.platform_ang_vel_calc = self.differentiate(self.platform_ang_calc, self.dt, reverse=True)
+        if not self.update_data:
+            self.platform_lin_vel = self.differentiate(self.platform_pos[:n_samples], self.dt, reverse=True)
+            self.platform_ang_vel = self.differentiate(self.platform_ang[:n_samples], self.dt, reverse=True)
+        else:
+            self.platform_lin_vel = self.platform_target[:, 6:9]
+            self.platform_ang_vel = self.platform_target[:, 9:12]
 
         self.platform_lin_vel_calc_raw = self.platform_lin_vel_calc
         self.platform_ang_vel_calc_raw = self.platform_ang_vel_calc
         
         # filter velocity data
-        print('Filtering linear velocity data...', end='\r')
-        self.fc = fc_lin
-        self.platform_lin_vel_calc = self.filter_data(self.platform_lin_vel_calc)
-        print('Filtering linear velocity data...done')
-
-        print('Filtering angular velocity data...', end='\r')
-        self.fc = fc_ang
-        self.platform_ang_vel_calc = self.filter_data(self.platform_ang_vel_calc)
-        print('Filtering angular velocity data...done')        
+        print('Filtering velocity data...', end='\r')
+        self.platform_lin_vel_calc, self.platform_ang_vel_calc = self.filter_channels(self.platform_lin_vel_calc, self.platform_ang_vel_calc)
+        print('Filtering velocity data...done')
             
         # calculation of platform acceleration
-        for i in range(len(self.platform_lin_vel_calc)):
-            if i == 0 or i == 1:
-                self.platform_curr_lin_acc = np.array([0,0,0])
-                self.platform_curr_ang_acc = np.array([0,0,0])
-                if not self.update_data:
-                    self.platform_lin_acc.append(np.array([0,0,0]))
-                    self.platform_ang_acc.append(np.array([0,0,0]))
-                else:
-                    self.platform_lin_acc = self.platform_target[:, 12:15]
-                    self.platform_ang_acc = self.platform_target[:, 15:18]
-        
-            else:
-                self.platform_curr_lin_acc = self.xyz_derivative(self.platform_lin_vel_calc[i - 1], self.platform_lin_vel_calc[i], self.dt)
-                self.platform_curr_ang_acc = self.xyz_derivative(self.platform_ang_vel_calc[i - 1], self.platform_ang_vel_calc[i], self.dt)
-                if not self.update_data:
-                    self.platform_lin_acc.append(self.xyz_derivative(self.platform_lin_vel[i - 1], self.platform_lin_vel[i], self.dt))
-                    self.platform_ang_acc.append(self.xyz_derivative(self.platform_ang_vel[i - 1], self.platform_ang_vel[i], self.dt))
-
-            self.platform_lin_acc_calc.append(self.platform_curr_lin_acc)          
-            self.platform_ang_acc_calc.append(self.platform_curr_ang_acc)          
+        self.platform_lin_acc_calc = self.differentiate(self.platform_lin_vel_calc, self.dt, leading_zeros=2, reverse=True)
+        self.platform_ang_acc_calc = self.differentiate(self.platform_ang_vel_calc, self.dt, leading_zeros=2, reverse=True)
+        if not self.update_data:
+            self.platform_lin_acc = self.differentiate(self.platform_lin_vel, self.dt, leading_zeros=2, reverse=True)
+            self.platform_ang_acc = self.differentiate(self.platform_ang_vel, self.dt, leading_zeros=2, reverse=True)
+        else:
+            self.platform_lin_acc = self.platform_target[:, 12:15]
+            self.platform_ang_acc = self.platform_target[:, 15:18]
 
         self.platform_lin_acc_calc_raw = self.platform_lin_acc_calc
         self.platform_ang_acc_calc_raw = self.platform_ang_acc_calc
 
         # filter acceleration data
-        print('Filtering linear acceleration data...', end='\r')
-        self.fc = fc_lin
-        self.platform_lin_acc_calc = self.filter_data(self.platform_lin_acc_calc)
-        print('Filtering linear acceleration data...done')
-
-        print('Filtering angular acceleration data...', end='\r')
-        self.fc = fc_ang
-        self.platform_ang_acc_calc = self.filter_data(self.platform_ang_acc_calc)
-        print('Filtering angular acceleration data...done')
+        print('Filtering acceleration data...', end='\r')
+        self.platform_lin_acc_calc, self.platform_ang_acc_calc = self.filter_channels(self.platform_lin_acc_calc, self.platform_ang_acc_calc)
+        print('Filtering acceleration data...done')
 
         self.platform_sys_time = self.time_data
 
@@ -499,6 +439,133 @@ class DataProcessClass():
         self.platform_lin_acc_calc_raw = np.array(self.platform_lin_acc_calc_raw)
 
 
+    def calculate_platform_pose_per_sample(self, motor_positions):
+        """
+            Calculates platform position and orientation sample by sample using forward kinematics. Reference for calculate_platform_pose_batch.
+
+            :param motor_positions: Motor positions, one row per sample. 
+            :type motor_positions: ndarray.
+            :return: Platform positions and xyz euler angles.
+            :rtype: ndarray (N,3), ndarray (N,3).
+        """
+        platform_pos_calc = []
+        platform_ang_calc = []
+        for current_motor_pos in motor_positions:
+            points = []
+            points.append(self.calculateBallJointPosition([6,9,8], 'left_front', current_motor_pos))
+            points.append(self.calculateBallJointPosition([7,11,10], 'right_front', current_motor_pos))
+            points.append(self.calculateBallJointPosition([0,3,2], 'left_back', current_motor_pos))
+            points.append(self.calculateBallJointPosition([1,5,4], 'right_back', current_motor_pos))
+            
+            vcross1 = points[3] - points[0]
+            vcross2 = points[2] - points[1]
+
+            vx = self.normalizeVector(points[0] - points[2])
+            vy = self.normalizeVector(points[0] - points[1])
+            vz = self.normalizeVector(np.cross(vcross2, vcross1))
+
+            # calculate acceleration
+            platform_curr_pos = points[0] + vcross1/2 - np.array([0, 0, 6.73])/1000 # assumed that the middle point is also the middle of the platform
+            rotMatrix = Rotation.align_vectors([[1, 0, 0], [0, 1, 0], [0, 0, 1]], [vx, vy, vz])[0].as_matrix()
+            rotMatrix = rotMatrix.transpose()
+            
+            platform_curr_ang = Rotation.from_matrix(rotMatrix).as_euler('xyz', degrees=False)
+            platform_curr_pos = np.array(platform_curr_pos) + rotMatrix.dot(self.point_on_platform)
+        
+            platform_pos_calc.append(platform_curr_pos)
+            platform_ang_calc.append(platform_curr_ang)
+
+        return np.array(platform_pos_calc), np.array(platform_ang_calc)
+
+
+    def calculate_platform_pose_batch(self, motor_positions):
+        """
+            Calculates platform position and orientation for all samples at once using forward kinematics. 
+
+            :param motor_positions: Motor positions, one row per sample. 
+            :type motor_positions: ndarray.
+            :return: Platform positions and xyz euler angles.
+            :rtype: ndarray (N,3), ndarray (N,3).
+        """
+        points = self.calculate_ball_joint_positions_batch(motor_positions) # FL, FR, BL, BR
+
+        vcross1 = points[:, 3] - points[:, 0]
+        vcross2 = points[:, 2] - points[:, 1]
+
+        vx = self.normalizeVector(points[:, 0] - points[:, 2])
+        vy = self.normalizeVector(points[:, 0] - points[:, 1])
+        vz = self.normalizeVector(np.cross(vcross2, vcross1))
+
+        # Kabsch solution of Rotation.align_vectors(unit axes, [vx, vy, vz]) for all samples
+        u, _, vh = np.linalg.svd(np.stack([vx, vy, vz], axis=1))
+        u[:, :, -1] *= np.sign(np.linalg.det(u @ vh))[:, None]
+        rotMatrix = np.transpose(u @ vh, (0, 2, 1))
+
+        platform_pos = points[:, 0] + vcross1/2 - np.array([0, 0, 6.73])/1000 # assumed that the middle point is also the middle of the platform
+        platform_ang = Rotation.from_matrix(rotMatrix).as_euler('xyz', degrees=False)
+        platform_pos = platform_pos + rotMatrix @ np.asarray(self.point_on_platform, dtype=float)
+
+        return platform_pos, platform_ang
+
+
+    def calculate_ball_joint_positions_batch(self, motor_positions):
+        """
+            Calculates ball joint positions of all legs for all samples at once. 
+
+            :param motor_positions: Motor positions, one row per sample. 
+            :type motor_positions: ndarray.
+            :return: Vectors pointing from base of SOLO robot to dummy foot link end-effector for FL, FR, BL, BR legs.
+            :rtype: ndarray (N,4,3).
+        """
+        motor_positions = np.asarray(motor_positions, dtype=float)
+        indices = np.array([[6,9,8], [7,11,10], [0,3,2], [1,5,4]]) # hip, upper, lower motor of FL, FR, BL, BR
+        position = np.array([[1, 1, 1], [1, -1, 1], [-1, 1, 1], [-1, -1, 1]])
+        sign = np.array([1, -1, 1, -1])[None, :, None]
+
+        angles = motor_positions[:, indices] * sign # (N,4,3)
+        if self.robot_env == 'solo': # account for motor gearing
+            angles = angles / 9
+        cos_a, sin_a = np.cos(angles), np.sin(angles)
+        c_hip, s_hip = cos_a[..., 0], sin_a[..., 0]
+        c_u, s_u = cos_a[..., 1], sin_a[..., 1]
+        c_l, s_l = cos_a[..., 2], sin_a[..., 2]
+
+        def rot_x_t(v, c, s): # Rx(angle)^T v
+            return np.stack([v[..., 0], c * v[..., 1] + s * v[..., 2], -s * v[..., 1] + c * v[..., 2]], axis=-1)
+
+        def rot_y_t(v, c, s): # Ry(angle)^T v
+            return np.stack([c * v[..., 0] - s * v[..., 2], v[..., 1], s * v[..., 0] + c * v[..., 2]], axis=-1)
+
+        vec_base = self.vec_base * position
+        vec_hip = rot_x_t(np.broadcast_to(self.vec_hip * position, angles.shape), c_hip, s_hip)
+        vec_u_leg = rot_x_t(rot_y_t(np.broadcast_to(self.vec_u_leg * position, angles.shape), c_u, s_u), c_hip, s_hip)
+        vec_l_leg = rot_x_t(rot_y_t(rot_y_t(np.broadcast_to(self.vec_l_leg * position, angles.shape), c_l, s_l), c_u, s_u), c_hip, s_hip)
+
+        return vec_base + vec_hip + vec_u_leg + vec_l_leg
+
+
+    def compare_platform_pose_calculation(self):
+        """
+            Compares batch and per sample forward kinematics and prints maximum difference and speedup. 
+
+            :return: None.
+            :rtype: None.
+        """
+        t_start = time.perf_counter()
+        pos_ref, ang_ref = self.calculate_platform_pose_per_sample(self.curr_jointAngles)
+        t_per_sample = time.perf_counter() - t_start
+
+        t_start = time.perf_counter()
+        pos_batch, ang_batch = self.calculate_platform_pose_batch(self.curr_jointAngles)
+        t_batch = time.perf_counter() - t_start
+
+        print('---')
+        print('Forward kinematics for', len(pos_ref), 'samples')
+        print('Per sample: %.3f s, batch: %.3f s, speedup: %.1fx' % (t_per_sample, t_batch, t_per_sample / t_batch))
+        print('Max difference position:', np.max(np.abs(pos_batch - pos_ref)), 'm, orientation:', np.max(np.abs(ang_batch - ang_ref)), 'rad')
+        print('---')
+
+
     def calculateBallJointPosition(self, indices, leg, motor_positions):
         """
             Calculates ball joint position. 
@@ -563,20 +630,46 @@ class DataProcessClass():
         return vec_base + vec_hip + vec_u_leg + vec_l_leg
 
 
-    def xyz_derivative(self, curr, prev, dt):
+    def differentiate(self, data, dt, scheme=None, leading_zeros=1, reverse=False):
         """
-            Calculates derivative in xyz. 
+            Differentiates all channels of data along the time axis at once. 
 
-            :param curr: List of current xyz. 
-            :type curr: List[Float].
-            :param prev: List of previous xyz. 
-            :type prev: List[Float].
-            :param dt: Change in time from previous to current. 
+            :param data: Data to differentiate, one row per sample.
+            :type data: ndarray (N,k).
+            :param dt: Change in time between two samples. 
             :type dt: Float.
-            :return: List of derivatives in xyz.
-            :rtype: list[Float].
+            :param scheme: 'backward', 'central', or 'savgol' (Savitzky-Golay derivative). Uses derivative_scheme of class if None.
+            :type scheme: str or None.
+            :param leading_zeros: Number of first rows that are set to 0.
+            :type leading_zeros: int.
+            :param reverse: Returns negative derivative, i.e. (x[i-1] - x[i]) / dt for backward scheme.
+            :type reverse: Bool.
+            :return: Derivative with the same shape as data.
+            :rtype: ndarray.
         """
-        return [float((curr[0]-prev[0])/dt), float((curr[1]-prev[1])/dt), float((curr[2]-prev[2])/dt)] 
+        if scheme is None:
+            scheme = self.derivative_scheme
+        data = np.asarray(data, dtype=float)
+        derivative = np.empty_like(data)
+
+        if scheme == 'backward':
+            if reverse:
+                np.subtract(data[:-1], data[1:], out=derivative[1:])
+            else:
+                np.subtract(data[1:], data[:-1], out=derivative[1:])
+            derivative[1:] /= dt
+        elif scheme == 'central':
+            derivative[:] = np.gradient(data, dt, axis=0)
+        elif scheme == 'savgol':
+            derivative[:] = savgol_filter(data, self.savgol_window_length, self.savgol_polyorder, deriv=1, delta=dt, axis=0)
+        else:
+            print("Derivative scheme", scheme, "not defined. Exiting!")
+            exit(-1)
+
+        if reverse and scheme != 'backward':
+            np.negative(derivative, out=derivative)
+        derivative[:leading_zeros] = 0.0
+        return derivative
         
 
     def get_skew_symmetric(self, v):
@@ -595,7 +688,7 @@ class DataProcessClass():
 
     def butter_lowpass(self, fc, fs, order = 2):
         """
-            Butter lowpass filter. 
+            Butter lowpass filter. Coefficients are cached per (fc, fs, order) and filter type. 
 
             :param fc: Cutoff frequency.
             :type fc: int.
@@ -603,17 +696,22 @@ class DataProcessClass():
             :type fs: int. 
             :param order: Order of polynomial.
             :type order: int.
-            :return: Numerator (b) and denominator (a) polynomials of the IIR filter.
-            :rtype: ndarray, ndarray. 
-        """
-        wn = fc/(fs/2)
-        b, a = signal.butter(order, wn, btype='low', analog=False)
-        return b, a
+            :return: Numerator (b) and denominator (a) polynomials of the IIR filter, or second-order sections if use_sos_filter is set.
+            :rtype: ndarray, ndarray or ndarray. 
+        """
+        key = (fc, fs, order, self.use_sos_filter)
+        if key not in self.filter_coefficients:
+            wn = fc/(fs/2)
+            if self.use_sos_filter:
+                self.filter_coefficients[key] = signal.butter(order, wn, btype='low', analog=False, output='sos')
+            else:
+                self.filter_coefficients[key] = signal.butter(order, wn, btype='low', analog=False)
+        return self.filter_coefficients[key]
 
 
-    def butter_lowpass_filtfilt(self, data, cutoff, fs, order = 2):
+    def butter_lowpass_filtfilt(self, data, cutoff, fs, order = 2, axis = 0):
         """
-            Applies butter lowpass filter forward and backward to signal. 
+            Applies butter lowpass filter forward and backward to all channels of signal. 
 
             :param data: Data to filter.
             :type data: ndarray.
@@ -623,11 +721,17 @@ class DataProcessClass():
             :type fs: int. 
             :param order: Order of polynomial.
             :type order: int.
+            :param axis: Time axis of data.
+            :type axis: int.
             :return: The filtered output with the same shape as data.
             :rtype: ndarray. 
         """
-        b, a = self.butter_lowpass(cutoff, fs, order=order)
-        y = signal.filtfilt(b, a, data)
+        if self.use_sos_filter:
+            sos = self.butter_lowpass(cutoff, fs, order=order)
+            y = signal.sosfiltfilt(sos, data, axis=axis)
+        else:
+            b, a = self.butter_lowpass(cutoff, fs, order=order)
+            y = signal.filtfilt(b, a, data, axis=axis)
         return y
 
     
@@ -652,34 +756,31 @@ class DataProcessClass():
         """
             Returns filtered data. 
 
-            :param data: Data to filter.
-            :type data: ndarray.
-            :return: Filtered data from applied filter in xyz.
-            :rtype: List(List[Float]). 
+            :param data: Data to filter, one row per sample.
+            :type data: ndarray (N,k).
+            :return: Filtered data for all k channels.
+            :rtype: ndarray (N,k). 
         """
-        result = []
-        data = np.array(data)
-        xvals = data[:, 0]
-        yvals = data[:, 1]
-        zvals = data[:, 2]
-
         self.fs = 1000
         self.fc = 50
 
-        xvals = self.butter_lowpass_filtfilt(xvals, self.fc, self.fs)
-        yvals = self.butter_lowpass_filtfilt(yvals, self.fc, self.fs)
-        zvals = self.butter_lowpass_filtfilt(zvals, self.fc, self.fs)
+        return self.butter_lowpass_filtfilt(np.asarray(data, dtype=float), self.fc, self.fs, axis=0)
 
-        # print(self.fc)
+        # return self.filter_savgol(data, self.fc, 3)
 
-        # xvals = self.filter_savgol(xvals, self.fc, 3)
-        # yvals = self.filter_savgol(yvals, self.fc, 3)
-        # zvals = self.filter_savgol(zvals, self.fc, 3)
 
-        for i in range(len(xvals)):
-            result.append([xvals[i], yvals[i], zvals[i]])
+    def filter_channels(self, *data):
+        """
+            Filters several arrays with one batched filter call. 
 
-        return result
+            :param data: Arrays to filter, one row per sample and the same number of rows each.
+            :type data: ndarray (N,k_i).
+            :return: Filtered arrays in the same order and shapes as the input.
+            :rtype: list[ndarray]. 
+        """
+        data = [np.asarray(d, dtype=float) for d in data]
+        filtered = self.filter_data(np.hstack(data))
+        return np.split(filtered, np.cumsum([d.shape[1] for d in data])[:-1], axis=1)
 
 
     def init_params_for_calculations(self):
@@ -753,13 +854,7 @@ class DataProcessClass():
             :return: None.
             :rtype: None.
         """
-        t_imu_calc_angular_acceleration = []
-        for i in range(len(self.imu_data)):
-            if i == 0:
-                t_imu_calc_angular_acceleration.append([0.0,0.0,0.0])
-            else:
-                t_imu_calc_angular_acceleration.append(self.xyz_derivative(self.imu_data[i, 3:6], self.imu_data[i-1, 3:6], 1/1000))
-
+        t_imu_calc_angular_acceleration = self.differentiate(self.imu_data[:, 3:6], 1/1000)
         self.imu_calc_angular_acceleration = np.array(self.filter_data(t_imu_calc_angular_acceleration))
 
 
@@ -773,39 +868,18 @@ class DataProcessClass():
         vec_imu = [0,0,-0.0616] # m // -61.6 mm from center of platfrom to imu
         vec_center_of_plat = [0,0,0] # m
 
-        first_derivative = []
-        second_derivative = []
-        diff_array = []
-        transformed_linear_acc = []
-
         self.imu_data[:,:3] = self.filter_data(self.imu_data[:,:3])
 
         diff_vec = np.array(vec_imu) - np.array(vec_center_of_plat) # m
 
-        for i in range(len(self.imu_data)):
-            platform_orn = self.platform_ang_calc[i]
-            alpha, beta, gamma = platform_orn # roll, pitch, yaw of platfrom  
-            rotation_matrix = list(Rotation.from_euler('xyz', [alpha, beta, gamma], degrees=False).as_matrix())
-            vec = np.dot(rotation_matrix, diff_vec)
-            diff_array.append(vec)
-            if i == 0:
-                first_derivative.append([0.0,0.0,0.0])
-            else:
-                first_derivative.append(self.xyz_derivative(diff_array[i], diff_array[i-1], float(1/1000)))
-
-        first_derivative = self.filter_data(first_derivative)
-
-        for i in range(len(self.imu_data)):
-            if i == 0:
-                second_derivative.append([0.0,0.0,0.0])
-            else:
-                second_derivative.append(self.xyz_derivative(first_derivative[i], first_derivative[i-1], float(1/1000)))
+        # roll, pitch, yaw of platfrom
+        rotation_matrix = Rotation.from_euler('xyz', self.platform_ang_calc[:len(self.imu_data)], degrees=False).as_matrix()
+        diff_array = rotation_matrix @ diff_vec
 
-        second_derivative = self.filter_data(second_derivative)
+        first_derivative = self.filter_data(self.differentiate(diff_array, float(1/1000)))
+        second_derivative = self.filter_data(self.differentiate(first_derivative, float(1/1000)))
 
-        for i in range(len(self.imu_data)):
-            raw_linear_acc = self.imu_data[i,:3] # m/s2 
-            transformed_linear_acc.append(np.array(raw_linear_acc) + np.array(second_derivative[i])) # substracting the additional accelereration vector from center of platform to imu
+        transformed_linear_acc = self.imu_data[:,:3] + second_derivative # substracting the additional accelereration vector from center of platform to imu
         
         self.transformted_lin_acc_imu_data = np.array(self.filter_data(transformed_linear_acc))
 
@@ -819,11 +893,18 @@ if __name__ == "__main__":
                     '--plots',
                     action='store_true',
                     help='show all plots')
+    parser.add_argument('-cfk',
+                    '--compare-fk',
+                    action='store_true',
+                    help='compare batch and per sample forward kinematics')
 
     ctrl_data = DataProcessClass(data_env[0], 
                             data_env[2], 
                             [0,0,0])
 
+    if parser.parse_args().compare_fk:
+        ctrl_data.compare_platform_pose_calculation()
+
     '''
         Calling data preview class after data processing is completed.
     '''
@@ -23,6 +23,8 @@ class SoloProgram():
         solo_calibration_phase_0=True,
         solo_calibration_phase_1=False,
         solo_calibration_phase_2=False,
+        use_simulator=False,
+        realtime=REALTIME_PROFILE,
     ):
         if not skip_sequence:
             ''' Pybullet Trajectory Generation '''
@@ -70,7 +72,9 @@ class SoloProgram():
             SoloControlClass(
                 phase_0_calibration = solo_calibration_phase_0,
                 phase_1_calibration = solo_calibration_phase_1,
-                phase_2_calibration = solo_calibration_phase_2
+                phase_2_calibration = solo_calibration_phase_2,
+                use_simulator = use_simulator,
+                realtime = realtime
             )
         else:
             print("Use pybullet_program.py to use pybullet control. Exiting solo program.")
@@ -13,8 +13,14 @@ class StartProgramClass():
         inverse_kinematics_tool = None,
         control_platform = None, 
         calibration_phase = None,  
+        use_simulator = False,
+        realtime = REALTIME_PROFILE,
     ):
         print("---")
+        self.use_simulator = use_simulator
+        self.realtime = realtime
+        if self.use_simulator:
+            print("Using masterboard simulator instead of robot.")
         if control_platform == "PyBullet Simulation Control":
             """
                 If Start Program Class instance is initialized with in-line flags for Pybullet Simulation Control.
@@ -138,6 +144,8 @@ class StartProgramClass():
                 solo_calibration_phase_0 = True if self.selected_calibration_phase == self.calibration_phases_array[1] else False,
                 solo_calibration_phase_1 = True if self.selected_calibration_phase == self.calibration_phases_array[2] else False,
                 solo_calibration_phase_2 = True if self.selected_calibration_phase == self.calibration_phases_array[3] else False,
+                use_simulator = self.use_simulator,
+                realtime = self.realtime,
             )
 
         print("\n---\n")
@@ -227,6 +235,8 @@ class StartProgramClass():
                 solo_calibration_phase_0 = True if calibration_phase == self.calibration_phases_array[1] else False,
                 solo_calibration_phase_1 = True if calibration_phase == self.calibration_phases_array[2] else False,
                 solo_calibration_phase_2 = True if calibration_phase == self.calibration_phases_array[3] else False,
+                use_simulator = self.use_simulator,
+                realtime = self.realtime,
             )
 
 
@@ -304,8 +314,18 @@ if __name__ == '__main__':
                         action='store_true',
                         help='Use calibration phase 2')
 
+    parser.add_argument('-sim',
+                        '--use-masterboard-simulator',
+                        action='store_true',
+                        help='Use in-process masterboard simulator instead of robot')
+
+    parser.add_argument('-rt',
+                        '--use-realtime-profile',
+                        action='store_true',
+                        help='Pin control thread to isolated CPUs, use SCHED_FIFO and mlockall, no garbage collection during the sequence')
+
     if parser.parse_args().use_free_control_env:
-        FreeSoloProgram()
+        FreeSoloProgram(use_simulator=parser.parse_args().use_masterboard_simulator, realtime=parser.parse_args().use_realtime_profile or REALTIME_PROFILE)
 
     else:
         sequence_types_options = ["Use Pre-existing Sequence File", "Arbitrary Sequence", "Sine Sequence", "Circular Trajectory", "Step Func"]
@@ -319,7 +339,7 @@ if __name__ == '__main__':
         calibration_phase_mask = [parser.parse_args().already_calibrated, parser.parse_args().use_phase0_calibration, parser.parse_args().use_phase1_calibration, parser.parse_args().use_phase2_calibration]
 
         if not any(sequence_type_mask) or not any(ik_type_mask) or not any(ik_type_mask):
-            StartProgramClass()
+            StartProgramClass(use_simulator=parser.parse_args().use_masterboard_simulator, realtime=parser.parse_args().use_realtime_profile or REALTIME_PROFILE)
 
         elif control_types_mask[0]:
             StartProgramClass(
@@ -334,5 +354,7 @@ if __name__ == '__main__':
                 sequence_type = sequence_types_options[[i for i, x in enumerate(sequence_type_mask) if x == True][0]],
                 inverse_kinematics_tool = ik_types_array[[i for i, x in enumerate(ik_type_mask) if x == True][0]],
                 control_platform = control_types_array[[i for i, x in enumerate(control_types_mask) if x == True][0]],
-                calibration_phase = calibration_phases_array[[i for i, x in enumerate(calibration_phase_mask) if x == True][0]]
+                calibration_phase = calibration_phases_array[[i for i, x in enumerate(calibration_phase_mask) if x == True][0]],
+                use_simulator = parser.parse_args().use_masterboard_simulator,
+                realtime = parser.parse_args().use_realtime_profile or REALTIME_PROFILE
             )